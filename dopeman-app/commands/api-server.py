@@ -4,38 +4,329 @@ DopeMAN API Server
 提供 HTTP API 讓 Dashboard 可以觸發後端任務
 """
 
+import time
+
+STARTED_AT = time.time()  # 啟動時間量測起點（其餘 import 之前）
+
 import os
 import sys
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 
+from item_query import DEFAULT_LIMIT as DEFAULT_ITEM_LIMIT, ItemIndex
+from job_manager import ACTIVE_STATES, DEFAULT_JOB_WORKERS, DEFAULT_PRIORITY, PRIORITIES, JobManager, JobRejected
+import metrics
+from metrics import timed_run
+from single_flight import SingleFlight
+from startup_timing import StartupTimer
+from static_files import StaticFiles
+from status_cache import StatusCache, last_scan_age
+from task_runner import TaskRunner
+
+# ?wait= 最多等待的秒數（超過則回傳 202 與 job id）
+MAX_WAIT_SECONDS = 300
+
+# GET /api/health-check 為相容舊用法，預設等待結果
+HEALTH_CHECK_WAIT = 35
+
+# 指標中保留原樣的路由（其餘 /api/* 合併為 /api/other，靜態檔案為 static）
+API_ROUTES = frozenset({
+    '/api/health-check', '/api/ready', '/api/status', '/api/jobs', '/api/items', '/metrics',
+    '/api/fix', '/api/reload', '/api/scan', '/api/update-data',
+    '/api/install-official', '/api/uninstall-official', '/api/update-official',
+})
+
+HTTP_REQUESTS = metrics.counter('dopeman_http_requests_total', 'HTTP 請求數', ('method', 'route', 'code'))
+HTTP_REQUEST_SECONDS = metrics.histogram('dopeman_http_request_seconds', 'HTTP 請求處理時間（秒）',
+                                         ('method', 'route'))
+
+
+def route_label(path):
+    """指標用的路由名稱（job id、類別等路徑參數合併，避免標籤數量無上限）"""
+    if path.startswith('/api/jobs/'):
+        return '/api/jobs/:id/cancel' if path.endswith('/cancel') else '/api/jobs/:id'
+    if path.startswith('/api/items/'):
+        return '/api/items/:category'
+    if path in API_ROUTES:
+        return path
+    if path.startswith('/api/'):
+        return '/api/other'
+    return 'static'
+
+
+def health_check_job(runner, cancel=None):
+    """執行健康檢查（程式內執行時直接取得報告，子程序執行時讀取報告檔）"""
+    result = runner.run('health-check', cancel=cancel)
+    if 'report' not in result:
+        report_file = Path.home() / '.claude' / 'memory' / 'dopeman' / 'health-check-report.json'
+        if report_file.exists():
+            with open(report_file, 'r', encoding='utf-8') as f:
+                result['report'] = json.load(f)
+        else:
+            result['report'] = {'error': 'Report file not found'}
+    return result
+
+
+def fix_job(runner, cancel=None):
+    """執行自動修復"""
+    result = runner.run('fix', cancel=cancel)
+    result['message'] = '修復完成' if result['success'] else '修復失敗'
+    return result
+
+
+def reload_job(runner, cancel=None):
+    """執行重載檢查"""
+    result = runner.run('reload', cancel=cancel)
+    return {
+        'success': True,
+        'stdout': result['stdout'],
+        'message': 'Skills 環境健康，可以重載'
+    }
+
+
+def scan_job(runner, cancel=None):
+    """重新掃描資料"""
+    result = runner.run('scan', cancel=cancel)
+    result['message'] = '掃描完成' if result['success'] else '掃描失敗'
+    return result
+
+
+def update_data_job(runner, cancel=None):
+    """更新資訊匯流資料"""
+    result = runner.run('update-data', cancel=cancel)
+    result['message'] = '資料更新完成' if result['success'] else '資料更新失敗'
+    return result
+
+
+def warm_model(server):
+    """建立狀態快照與項目索引（讀取掃描結果），第一個 /api/status、/api/items 不需等待"""
+    server.status.get()
+    server.items.summary()
+
+
+def warm_up(server):
+    """背景預熱：各工具模組、掃描模型"""
+    server.startup.warm('tasks', server.tasks.warm_up)
+    server.startup.warm('model', warm_model, server)
+
+
+def install_official_job(skill_id, item_config, target_path):
+    """安裝官方 Skill/Team（git clone 或 sparse-checkout）"""
+    try:
+        # 建立父目錄
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 執行安裝
+        repo_url = item_config['repo']
+        subpath = item_config.get('subpath')
+
+        install_log = []
+
+        if subpath:
+            # 使用 sparse-checkout（Anthropic skills）
+            install_log.append(f"📦 使用 sparse-checkout 安裝 {skill_id}")
+            install_log.append(f"📂 目標路徑: {target_path}")
+            install_log.append(f"🔗 Repository: {repo_url}")
+            install_log.append(f"📁 Subpath: {subpath}")
+
+            # 初始化 git repo
+            timed_run(['git', 'init'], cwd=target_path.parent, check=True, capture_output=True)
+            timed_run(['git', 'init', str(target_path)], check=True, capture_output=True)
+
+            # 設定 remote
+            timed_run(
+                ['git', 'remote', 'add', 'origin', repo_url],
+                cwd=target_path,
+                check=True,
+                capture_output=True
+            )
+
+            # 啟用 sparse-checkout
+            timed_run(
+                ['git', 'config', 'core.sparseCheckout', 'true'],
+                cwd=target_path,
+                check=True,
+                capture_output=True
+            )
+
+            # 寫入 sparse-checkout 配置
+            sparse_checkout_file = target_path / '.git' / 'info' / 'sparse-checkout'
+            sparse_checkout_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(sparse_checkout_file, 'w') as f:
+                f.write(f"{subpath}/*\n")
+
+            # Pull 指定的 subpath
+            result = timed_run(
+                ['git', 'pull', 'origin', 'main'],
+                cwd=target_path,
+                capture_output=True,
+                text=True,
+                timeout=120
+            )
+
+            if result.returncode != 0:
+                # 嘗試 master 分支
+                result = timed_run(
+                    ['git', 'pull', 'origin', 'master'],
+                    cwd=target_path,
+                    capture_output=True,
+                    text=True,
+                    timeout=120
+                )
+
+            # 移動 subpath 內容到根目錄
+            subpath_dir = target_path / subpath
+            if subpath_dir.exists():
+                import shutil
+                for item in subpath_dir.iterdir():
+                    shutil.move(str(item), str(target_path))
+
+                # 刪除空的 subpath 目錄結構
+                shutil.rmtree(target_path / subpath.split('/')[0])
+
+            install_log.append("✅ Sparse-checkout 完成")
+
+        else:
+            # 一般 git clone
+            install_log.append(f"📦 使用 git clone 安裝 {skill_id}")
+            install_log.append(f"📂 目標路徑: {target_path}")
+            install_log.append(f"🔗 Repository: {repo_url}")
+
+            result = timed_run(
+                ['git', 'clone', repo_url, str(target_path)],
+                capture_output=True,
+                text=True,
+                timeout=120
+            )
+
+            if result.returncode != 0:
+                raise Exception(f"Git clone 失敗: {result.stderr}")
+
+            install_log.append("✅ Git clone 完成")
+
+        # 檢查安裝結果
+        if item_config['type'] == 'skill':
+            skill_md = target_path / 'SKILL.md'
+            if not skill_md.exists():
+                raise Exception(f"安裝失敗：找不到 SKILL.md 於 {target_path}")
+            install_log.append(f"✅ 驗證成功：SKILL.md 存在")
+        else:  # team
+            claude_md = target_path / 'CLAUDE.md'
+            if not claude_md.exists():
+                raise Exception(f"安裝失敗：找不到 CLAUDE.md 於 {target_path}")
+            install_log.append(f"✅ 驗證成功：CLAUDE.md 存在")
+
+        return {
+            'success': True,
+            'message': f'✅ {skill_id} 安裝成功',
+            'path': str(target_path),
+            'log': '\n'.join(install_log)
+        }
+
+    except subprocess.TimeoutExpired:
+        error = '安裝超時（120秒），可能網路較慢或 repository 太大'
+    except Exception as e:
+        error = str(e)
+
+    # 如果失敗，清理已建立的目錄
+    if target_path.exists():
+        import shutil
+        shutil.rmtree(target_path, ignore_errors=True)
+
+    return {
+        'success': False,
+        'error': error
+    }
+
+
+def update_official_job(skill_id, skill_path):
+    """git pull 更新官方 Skill/Team"""
+    result = timed_run(
+        ['git', 'pull'],
+        cwd=skill_path,
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+
+    return {
+        'success': result.returncode == 0,
+        'stdout': result.stdout,
+        'stderr': result.stderr,
+        'message': f'✅ {skill_id} 更新成功' if result.returncode == 0 else f'❌ {skill_id} 更新失敗'
+    }
+
+
 class DopeMAN_API_Handler(SimpleHTTPRequestHandler):
     """處理 API 請求的 Handler"""
 
+    def handle_one_request(self):
+        """處理單一請求並記錄延遲（method / route / 狀態碼）"""
+        self.request_started = None
+        self.status_code = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.request_started is not None and self.status_code is not None:
+                method = self.command or '-'
+                route = route_label(urlparse(self.path).path)
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - self.request_started, method=method, route=route)
+                HTTP_REQUESTS.inc(method=method, route=route, code=self.status_code)
+
+    def parse_request(self):
+        # 從讀到請求行開始計時（不含等待客戶端送出請求的時間）
+        self.request_started = time.perf_counter()
+        return super().parse_request()
+
+    def log_request(self, code='-', size='-'):
+        self.status_code = str(int(code)) if isinstance(code, int) else str(code)
+        super().log_request(code, size)
+
     def do_GET(self):
         """處理 GET 請求"""
         parsed_path = urlparse(self.path)
         path = parsed_path.path
 
         if path == '/api/health-check':
-            self.handle_health_check()
+            self.handle_health_check(default_wait=HEALTH_CHECK_WAIT)
+        elif path == '/api/ready':
+            self.handle_ready()
+        elif path == '/metrics':
+            self.handle_metrics()
         elif path == '/api/status':
             self.handle_status()
-        else:
-            # 其他請求交給預設處理（靜態檔案）
+        elif path == '/api/jobs':
+            self.handle_jobs()
+        elif path.startswith('/api/jobs/'):
+            self.handle_job(path[len('/api/jobs/'):])
+        elif path == '/api/items':
+            self.handle_items()
+        elif path.startswith('/api/items/'):
+            self.handle_item_query(path[len('/api/items/'):])
+        elif not self.server.static.serve(self):
+            # 目錄或找不到的檔案交給預設處理
             super().do_GET()
 
+    def do_HEAD(self):
+        """處理 HEAD 請求（靜態檔案）"""
+        if not self.server.static.serve(self, head=True):
+            super().do_HEAD()
+
     def do_POST(self):
         """處理 POST 請求"""
         parsed_path = urlparse(self.path)
         path = parsed_path.path
 
-        if path == '/api/fix':
+        if path == '/api/health-check':
+            self.handle_health_check()
+        elif path.startswith('/api/jobs/') and path.endswith('/cancel'):
+            self.handle_cancel_job(path[len('/api/jobs/'):-len('/cancel')])
+        elif path == '/api/fix':
             self.handle_fix()
         elif path == '/api/reload':
             self.handle_reload()
@@ -62,180 +353,223 @@ class DopeMAN_API_Handler(SimpleHTTPRequestHandler):
         """發送 CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
 
-    def send_json_response(self, data, status=200):
+    def send_json_response(self, data, status=200, headers=None):
         """發送 JSON 回應"""
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.send_cors_headers()
         self.end_headers()
         self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
 
-    def handle_health_check(self):
-        """執行健康檢查"""
+    def wait_seconds(self, default=0):
+        """?wait=<秒數>：等待工作結束再回應（0 表示立即回傳 job id）"""
+        query = parse_qs(urlparse(self.path).query)
         try:
-            # 執行 health-check.py
-            result = subprocess.run(
-                ['python3', 'health-check.py'],
-                cwd=Path(__file__).parent,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            # 讀取報告
-            report_file = Path.home() / '.claude' / 'memory' / 'dopeman' / 'health-check-report.json'
-            if report_file.exists():
-                with open(report_file, 'r', encoding='utf-8') as f:
-                    report = json.load(f)
-            else:
-                report = {'error': 'Report file not found'}
-
-            self.send_json_response({
-                'success': result.returncode == 0,
-                'report': report,
-                'stdout': result.stdout,
-                'stderr': result.stderr
-            })
-
-        except Exception as e:
+            wait = float(query.get('wait', [default])[0])
+        except ValueError:
+            wait = default
+        return max(0, min(wait, MAX_WAIT_SECONDS))
+
+    def submit_job(self, job_type, func, *args, default_wait=0, key=None, cancellable=False):
+        """送出背景工作：回傳 202 與 job id，或在 ?wait 內完成時直接回傳結果
+
+        ?priority=interactive / normal / background 決定排隊順序。
+        啟用 single-flight 的操作已在執行時，直接掛上進行中的工作（回應含 coalesced）；
+        相同 key 的工作已在排隊時直接沿用（回應含 deduplicated）
+        """
+        jobs = self.server.jobs
+        priority = parse_qs(urlparse(self.path).query).get('priority', [DEFAULT_PRIORITY])[0]
+        if priority not in PRIORITIES:
             self.send_json_response({
                 'success': False,
-                'error': str(e)
-            }, status=500)
-
-    def handle_fix(self):
-        """執行自動修復"""
+                'error': f"未知優先順序: {priority}（可用: {', '.join(PRIORITIES)}）"
+            }, status=400)
+            return
         try:
-            # 執行 fix.py
-            result = subprocess.run(
-                ['python3', 'fix.py'],
-                cwd=Path(__file__).parent,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-
-            self.send_json_response({
-                'success': result.returncode == 0,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'message': '修復完成' if result.returncode == 0 else '修復失敗'
-            })
-
-        except Exception as e:
+            job = jobs.submit(job_type, func, *args, coalesce=self.server.tasks.coalesces(job_type),
+                              priority=priority, key=job_type if key is None else key, cancellable=cancellable)
+        except JobRejected as e:
             self.send_json_response({
                 'success': False,
-                'error': str(e)
-            }, status=500)
-
-    def handle_reload(self):
-        """觸發重載提示"""
-        try:
-            # 執行 reload-skills.py
-            result = subprocess.run(
-                ['python3', 'reload-skills.py'],
-                cwd=Path(__file__).parent,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
+                'error': str(e),
+                'active_jobs': e.active
+            }, status=429)
+            return
+
+        coalesced = job.get('coalesced', False)
+        deduplicated = job.get('deduplicated', False)
+        wait = self.wait_seconds(default_wait)
+        if wait:
+            job = jobs.wait(job['id'], wait)
+
+        if job['state'] in ACTIVE_STATES:
             self.send_json_response({
                 'success': True,
-                'stdout': result.stdout,
-                'message': 'Skills 環境健康，可以重載'
-            })
-
-        except Exception as e:
+                'job_id': job['id'],
+                'job': job,
+                'coalesced': coalesced,
+                'deduplicated': deduplicated,
+                'status_url': f"/api/jobs/{job['id']}",
+                'cancel_url': f"/api/jobs/{job['id']}/cancel" if job['cancellable'] else None
+            }, status=202)
+        elif job['result'] is None:
             self.send_json_response({
                 'success': False,
-                'error': str(e)
+                'job_id': job['id'],
+                'error': job['error']
             }, status=500)
+        else:
+            self.send_json_response(dict(job['result'], job_id=job['id'], coalesced=coalesced,
+                                         deduplicated=deduplicated))
+
+    def handle_jobs(self):
+        """列出保留中的工作"""
+        self.send_json_response({
+            'success': True,
+            'jobs': self.server.jobs.list(),
+            'stats': self.server.jobs.stats()
+        })
+
+    def handle_job(self, job_id):
+        """查詢單一工作的狀態、耗時與結果"""
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            self.send_json_response({
+                'success': False,
+                'error': f'找不到工作 {job_id}'
+            }, status=404)
+            return
 
-    def handle_scan(self):
-        """重新掃描資料"""
-        try:
-            # 執行 scan-real-data.py
-            result = subprocess.run(
-                ['python3', 'scan-real-data.py'],
-                cwd=Path(__file__).parent,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+        self.send_json_response({'success': True, 'job': job})
 
+    def handle_cancel_job(self, job_id):
+        """取消工作：排隊中的立即取消，執行中的結束子程序（202，結束後狀態為 cancelled）"""
+        job = self.server.jobs.cancel(job_id)
+        if job is None:
             self.send_json_response({
-                'success': result.returncode == 0,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'message': '掃描完成' if result.returncode == 0 else '掃描失敗'
-            })
-
-        except Exception as e:
+                'success': False,
+                'error': f'找不到工作 {job_id}'
+            }, status=404)
+        elif job['state'] not in ACTIVE_STATES + ('cancelled',):
             self.send_json_response({
                 'success': False,
-                'error': str(e)
-            }, status=500)
+                'error': f"工作已結束（{job['state']}）",
+                'job': job
+            }, status=409)
+        elif job['state'] == 'running' and not job['cancel_requested']:
+            self.send_json_response({
+                'success': False,
+                'error': f'工作 {job_id} 無法取消',
+                'job': job
+            }, status=409)
+        else:
+            self.send_json_response({'success': True, 'job': job},
+                                    status=202 if job['state'] == 'running' else 200)
 
-    def handle_update_data(self):
-        """更新個人資訊匯流資料"""
+    def handle_items(self):
+        """各類別項目數"""
+        self.send_json_response(dict(self.server.items.summary(), success=True))
+
+    def handle_item_query(self, category):
+        """分頁查詢單一類別：?q=&type=&project=&dirty=&offset=&limit=&sort=&facets=0"""
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
         try:
-            # 執行 fetch-ptt-stocks-v2.py
-            result = subprocess.run(
-                ['python3', 'fetch-ptt-stocks-v2.py'],
-                cwd=Path(__file__).parent,
-                capture_output=True,
-                text=True,
-                timeout=120
+            offset = int(query.pop('offset', 0))
+            limit = int(query.pop('limit', DEFAULT_ITEM_LIMIT))
+            result = self.server.items.query(
+                category,
+                q=query.pop('q', ''),
+                offset=offset,
+                limit=limit,
+                sort=query.pop('sort', None),
+                facets=query.pop('facets', '1') != '0',
+                **query
             )
-
+        except KeyError:
             self.send_json_response({
-                'success': result.returncode == 0,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'message': '資料更新完成' if result.returncode == 0 else '資料更新失敗'
-            })
-
-        except Exception as e:
+                'success': False,
+                'error': f'找不到類別 {category}'
+            }, status=404)
+            return
+        except ValueError as e:  # 含 QueryError 與 offset / limit 格式錯誤
             self.send_json_response({
                 'success': False,
                 'error': str(e)
-            }, status=500)
+            }, status=400)
+            return
 
-    def handle_status(self):
-        """獲取系統狀態"""
-        try:
-            home = Path.home()
-            skills_dir = home / '.claude' / 'skills'
+        self.send_json_response(dict(result, success=True))
 
-            # 統計 skills 數量
-            skills_count = 0
-            broken_count = 0
+    def handle_health_check(self, default_wait=0):
+        """執行健康檢查"""
+        self.submit_job('health-check', health_check_job, self.server.tasks, default_wait=default_wait,
+                        cancellable=True)
 
-            if skills_dir.exists():
-                for item in skills_dir.iterdir():
-                    if item.is_symlink():
-                        skills_count += 1
-                        if not item.resolve().exists():
-                            broken_count += 1
+    def handle_fix(self):
+        """執行自動修復"""
+        self.submit_job('fix', fix_job, self.server.tasks, cancellable=True)
 
-            self.send_json_response({
-                'success': True,
-                'status': {
-                    'skills_count': skills_count,
-                    'broken_count': broken_count,
-                    'healthy': broken_count == 0,
-                    'timestamp': datetime.now().isoformat()
-                }
-            })
+    def handle_reload(self):
+        """觸發重載提示"""
+        self.submit_job('reload', reload_job, self.server.tasks, cancellable=True)
+
+    def handle_scan(self):
+        """重新掃描資料"""
+        self.submit_job('scan', scan_job, self.server.tasks, cancellable=True)
+
+    def handle_update_data(self):
+        """更新個人資訊匯流資料"""
+        self.submit_job('update-data', update_data_job, self.server.tasks, cancellable=True)
+
+    def handle_ready(self):
+        """就緒狀態與啟動時間分解（?warm=1 時預熱完成前回 503）"""
+        report = self.server.startup.report()
+        want_warm = parse_qs(urlparse(self.path).query).get('warm', ['0'])[0] in ('1', 'true')
+        status = 503 if want_warm and not report['warm'] else 200
+        self.send_json_response(dict(report, success=status == 200), status=status,
+                                headers={'Cache-Control': 'no-store'})
+
+    def handle_metrics(self):
+        """Prometheus 文字格式的指標"""
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', metrics.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
 
+    def handle_status(self):
+        """獲取系統狀態（快取快照；If-None-Match 相符時回 304）"""
+        try:
+            status, etag = self.server.status.get()
         except Exception as e:
             self.send_json_response({
                 'success': False,
                 'error': str(e)
             }, status=500)
+            return
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_cors_headers()
+            self.end_headers()
+            return
+
+        # last_scan_age_seconds 每次都不同，不列入 ETag（304 時由 last_scan 自行計算）
+        self.send_json_response({
+            'success': True,
+            'status': dict(status,
+                           last_scan_age_seconds=last_scan_age(status['last_scan']),
+                           timestamp=datetime.now().isoformat())
+        }, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
 
     def handle_install_official(self):
         """安裝官方 Skill/Team - 方案 B：直接實作安裝邏輯"""
@@ -292,127 +626,10 @@ class DopeMAN_API_Handler(SimpleHTTPRequestHandler):
                 }, status=409)
                 return
 
-            # 建立父目錄
-            target_path.parent.mkdir(parents=True, exist_ok=True)
+            self.submit_job('install-official', install_official_job, skill_id, item_config, target_path,
+                            key=skill_id)
 
-            # 執行安裝
-            repo_url = item_config['repo']
-            subpath = item_config.get('subpath')
-
-            install_log = []
-
-            if subpath:
-                # 使用 sparse-checkout（Anthropic skills）
-                install_log.append(f"📦 使用 sparse-checkout 安裝 {skill_id}")
-                install_log.append(f"📂 目標路徑: {target_path}")
-                install_log.append(f"🔗 Repository: {repo_url}")
-                install_log.append(f"📁 Subpath: {subpath}")
-
-                # 初始化 git repo
-                subprocess.run(['git', 'init'], cwd=target_path.parent, check=True, capture_output=True)
-                subprocess.run(['git', 'init', str(target_path)], check=True, capture_output=True)
-
-                # 設定 remote
-                subprocess.run(
-                    ['git', 'remote', 'add', 'origin', repo_url],
-                    cwd=target_path,
-                    check=True,
-                    capture_output=True
-                )
-
-                # 啟用 sparse-checkout
-                subprocess.run(
-                    ['git', 'config', 'core.sparseCheckout', 'true'],
-                    cwd=target_path,
-                    check=True,
-                    capture_output=True
-                )
-
-                # 寫入 sparse-checkout 配置
-                sparse_checkout_file = target_path / '.git' / 'info' / 'sparse-checkout'
-                sparse_checkout_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(sparse_checkout_file, 'w') as f:
-                    f.write(f"{subpath}/*\n")
-
-                # Pull 指定的 subpath
-                result = subprocess.run(
-                    ['git', 'pull', 'origin', 'main'],
-                    cwd=target_path,
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
-
-                if result.returncode != 0:
-                    # 嘗試 master 分支
-                    result = subprocess.run(
-                        ['git', 'pull', 'origin', 'master'],
-                        cwd=target_path,
-                        capture_output=True,
-                        text=True,
-                        timeout=120
-                    )
-
-                # 移動 subpath 內容到根目錄
-                subpath_dir = target_path / subpath
-                if subpath_dir.exists():
-                    import shutil
-                    for item in subpath_dir.iterdir():
-                        shutil.move(str(item), str(target_path))
-
-                    # 刪除空的 subpath 目錄結構
-                    shutil.rmtree(target_path / subpath.split('/')[0])
-
-                install_log.append("✅ Sparse-checkout 完成")
-
-            else:
-                # 一般 git clone
-                install_log.append(f"📦 使用 git clone 安裝 {skill_id}")
-                install_log.append(f"📂 目標路徑: {target_path}")
-                install_log.append(f"🔗 Repository: {repo_url}")
-
-                result = subprocess.run(
-                    ['git', 'clone', repo_url, str(target_path)],
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
-
-                if result.returncode != 0:
-                    raise Exception(f"Git clone 失敗: {result.stderr}")
-
-                install_log.append("✅ Git clone 完成")
-
-            # 檢查安裝結果
-            if item_config['type'] == 'skill':
-                skill_md = target_path / 'SKILL.md'
-                if not skill_md.exists():
-                    raise Exception(f"安裝失敗：找不到 SKILL.md 於 {target_path}")
-                install_log.append(f"✅ 驗證成功：SKILL.md 存在")
-            else:  # team
-                claude_md = target_path / 'CLAUDE.md'
-                if not claude_md.exists():
-                    raise Exception(f"安裝失敗：找不到 CLAUDE.md 於 {target_path}")
-                install_log.append(f"✅ 驗證成功：CLAUDE.md 存在")
-
-            self.send_json_response({
-                'success': True,
-                'message': f'✅ {skill_id} 安裝成功',
-                'path': str(target_path),
-                'log': '\n'.join(install_log)
-            })
-
-        except subprocess.TimeoutExpired:
-            self.send_json_response({
-                'success': False,
-                'error': '安裝超時（120秒），可能網路較慢或 repository 太大'
-            }, status=500)
         except Exception as e:
-            # 如果失敗，清理已建立的目錄
-            if 'target_path' in locals() and target_path.exists():
-                import shutil
-                shutil.rmtree(target_path, ignore_errors=True)
-
             self.send_json_response({
                 'success': False,
                 'error': str(e)
@@ -513,21 +730,7 @@ class DopeMAN_API_Handler(SimpleHTTPRequestHandler):
                 }, status=400)
                 return
 
-            # 執行 git pull
-            result = subprocess.run(
-                ['git', 'pull'],
-                cwd=skill_path,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            self.send_json_response({
-                'success': result.returncode == 0,
-                'stdout': result.stdout,
-                'stderr': result.stderr,
-                'message': f'✅ {skill_id} 更新成功' if result.returncode == 0 else f'❌ {skill_id} 更新失敗'
-            })
+            self.submit_job('update-official', update_official_job, skill_id, skill_path, key=skill_id)
 
         except Exception as e:
             self.send_json_response({
@@ -535,16 +738,40 @@ class DopeMAN_API_Handler(SimpleHTTPRequestHandler):
                 'error': str(e)
             }, status=500)
 
-def run_server(port=8891):
-    """啟動伺服器"""
+def run_server(port=8891, job_workers=DEFAULT_JOB_WORKERS, in_process=True, single_flight=True,
+               ready_fd=None):
+    """啟動伺服器（每個請求一個執行緒，長時間操作交給背景工作）"""
+    startup = StartupTimer('api-server', STARTED_AT)
     server_address = ('', port)
-    httpd = HTTPServer(server_address, DopeMAN_API_Handler)
+    httpd = ThreadingHTTPServer(server_address, DopeMAN_API_Handler)
+    httpd.daemon_threads = True
+    startup.mark('bind')
+    httpd.startup = startup
+    httpd.jobs = JobManager(max_workers=job_workers)
+    httpd.tasks = TaskRunner(in_process=in_process, flights=SingleFlight() if single_flight else None)
+    httpd.status = StatusCache()
+    httpd.static = StaticFiles()
+    httpd.items = ItemIndex()
+    startup.mark('init')
+
+    # 已可接受連線；工具模組與掃描模型在背景預熱，第一個請求不需等待 import
+    startup.warming('tasks', 'model')
+    startup.set_ready(ready_fd, port=port)
+    threading.Thread(target=warm_up, args=(httpd,), daemon=True).start()
 
     print(f"🚀 DopeMAN API Server 已啟動")
     print(f"📍 位址: http://localhost:{port}")
     print(f"📡 API 端點:")
-    print(f"   GET  /api/health-check       - 執行健康檢查")
-    print(f"   GET  /api/status             - 獲取系統狀態")
+    print(f"   GET  /api/health-check       - 執行健康檢查（等待結果）")
+    print(f"   GET  /api/ready              - 就緒狀態與啟動時間分解（?warm=1 等待預熱）")
+    print(f"   GET  /api/status             - 獲取系統狀態（ETag / 304）")
+    print(f"   GET  /metrics                - Prometheus 指標")
+    print(f"   GET  /api/items              - 各類別項目數")
+    print(f"   GET  /api/items/<類別>       - 分頁查詢（q / type / project / dirty / offset / limit / sort）")
+    print(f"   GET  /api/jobs               - 列出背景工作")
+    print(f"   GET  /api/jobs/<id>          - 查詢背景工作狀態、排隊位置與結果")
+    print(f"   POST /api/jobs/<id>/cancel   - 取消排隊中或執行中的背景工作")
+    print(f"   POST /api/health-check       - 執行健康檢查")
     print(f"   POST /api/fix                - 執行自動修復")
     print(f"   POST /api/reload             - 觸發重載提示")
     print(f"   POST /api/scan               - 重新掃描資料")
@@ -552,6 +779,9 @@ def run_server(port=8891):
     print(f"   POST /api/install-official   - 安裝官方 Skill/Team")
     print(f"   POST /api/uninstall-official - 移除官方 Skill/Team")
     print(f"   POST /api/update-official    - 更新官方 Skill/Team")
+    print(f"   （POST 立即回傳 202 與 job id；加上 ?wait=<秒數> 可等待結果、?priority={'/'.join(PRIORITIES)} 決定排隊順序）")
+    print(f"📄 靜態檔案: ETag / 304、gzip / br、Range")
+    print(startup.describe())
     print(f"\n按 Ctrl+C 停止伺服器\n")
 
     try:
@@ -559,10 +789,23 @@ def run_server(port=8891):
     except KeyboardInterrupt:
         print("\n\n⏹️  伺服器已停止")
         httpd.shutdown()
+        httpd.jobs.shutdown()
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN API Server')
+    parser.add_argument('--port', type=int, default=8891, help='HTTP 端口 (預設: 8891)')
+    parser.add_argument('--job-workers', type=int, default=DEFAULT_JOB_WORKERS,
+                        help=f'背景工作並行數 (預設: {DEFAULT_JOB_WORKERS})')
+    parser.add_argument('--subprocess', action='store_true', help='每個任務啟動獨立的 python3（不在 process 內執行）')
+    parser.add_argument('--no-single-flight', action='store_true', help='不合併重複的任務請求')
+    parser.add_argument('--ready-fd', type=int, help='就緒時寫入一行 JSON（含啟動時間分解）到此 fd 後關閉')
+    args = parser.parse_args()
+
     # 切換到 commands 目錄
     os.chdir(Path(__file__).parent)
 
     # 啟動伺服器
-    run_server()
+    run_server(args.port, job_workers=args.job_workers, in_process=not args.subprocess,
+               single_flight=not args.no_single_flight, ready_fd=args.ready_fd)
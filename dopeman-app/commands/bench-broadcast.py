@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Broadcast Benchmark
+量測大量 WebSocket 客戶端（其中一部分完成握手後完全不讀取，模擬卡住的分頁）對任務吞吐量的影響：
+依序執行 N 個任務，比較沒有其他客戶端與有 200 個客戶端時每個任務從送出到收到 task_completed 的時間
+"""
+
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+import websockets
+
+COMMANDS_DIR = Path(__file__).parent
+
+READY_TIMEOUT = 30.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def stalled_client(port: int) -> socket.socket:
+    """完成 WebSocket 握手後不再讀取的連線（接收緩衝很小，伺服器很快就寫不出去）"""
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("localhost", port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET / HTTP/1.1\r\nHost: localhost:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    return sock
+
+
+async def _read_all(port: int, clients: int, counter):
+    async def reader():
+        try:
+            async with websockets.connect(f"ws://localhost:{port}", max_queue=None) as ws:
+                async for _ in ws:
+                    with counter.get_lock():
+                        counter.value += 1
+        except (OSError, websockets.exceptions.ConnectionClosed):
+            pass
+
+    await asyncio.gather(*(reader() for _ in range(clients)))
+
+
+def run_readers(port: int, clients: int, counter):
+    """正常讀取的客戶端（獨立 process，與量測任務時間的客戶端分開）：計算收到的訊息數"""
+    asyncio.run(_read_all(port, clients, counter))
+
+
+def slow_disconnects(port: int) -> int:
+    """伺服器 /metrics 中因送出過慢而中斷的客戶端數"""
+    try:
+        with urllib.request.urlopen(f"http://localhost:{port}/metrics", timeout=2) as response:
+            text = response.read().decode()
+    except OSError:
+        return 0
+    return int(sum(float(v) for v in re.findall(r"^dopeman_websocket_slow_disconnects_total\{.*\} (\S+)$",
+                                                  text, re.MULTILINE)))
+
+
+class BroadcastBenchmark:
+    """任務吞吐量在大量客戶端（含卡住的客戶端）下的變化"""
+
+    def __init__(self, task: str, tasks: int, clients: int, stalled: int, unified: bool, server_args: List[str]):
+        self.task = task
+        self.tasks = tasks
+        self.clients = clients
+        self.stalled = stalled
+        self.unified = unified
+        self.server_args = server_args
+
+    def spawn(self, port: int) -> subprocess.Popen:
+        script = "dopeman-server.py" if self.unified else "websocket-server.py"
+        # 每次都實際執行任務（不沿用剛完成的結果），才有持續的 progress 廣播
+        args = [sys.executable, script, "--port", str(port), "--no-watch", "--no-single-flight", *self.server_args]
+        return subprocess.Popen(args, cwd=COMMANDS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    async def wait_ready(self, port: int):
+        started = time.monotonic()
+        while time.monotonic() - started < READY_TIMEOUT:
+            try:
+                async with websockets.connect(f"ws://localhost:{port}", open_timeout=1):
+                    return
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.InvalidHandshake):
+                await asyncio.sleep(0.05)
+        raise RuntimeError(f"伺服器 {READY_TIMEOUT:.0f} 秒內未就緒")
+
+    async def run_tasks(self, port: int) -> List[float]:
+        """依序執行任務，回傳每個任務從送出到收到 task_completed 的秒數"""
+        durations = []
+        async with websockets.connect(f"ws://localhost:{port}", max_queue=None) as ws:
+            await ws.recv()  # current_tasks
+            for _ in range(self.tasks):
+                started = time.monotonic()
+                await ws.send(json.dumps({"command": "start_task", "task_type": self.task}))
+                while True:
+                    message = json.loads(await ws.recv())
+                    if message["type"] in ("task_completed", "task_failed"):
+                        break
+                durations.append(time.monotonic() - started)
+        return durations
+
+    async def measure(self, clients: int) -> Dict[str, float]:
+        port = free_port()
+        process = self.spawn(port)
+        stalled, readers = [], None
+        counter = multiprocessing.Value("l", 0)
+        reader_count = clients - min(self.stalled, clients)
+        try:
+            await self.wait_ready(port)
+            stalled = [stalled_client(port) for _ in range(clients - reader_count)]
+            if reader_count:
+                readers = multiprocessing.Process(target=run_readers, args=(port, reader_count, counter), daemon=True)
+                readers.start()
+            await asyncio.sleep(1.0)  # 等待所有客戶端完成握手
+
+            started = time.monotonic()
+            durations = await self.run_tasks(port)
+            total = time.monotonic() - started
+            return {
+                "median": statistics.median(durations),
+                "max": max(durations),
+                "throughput": len(durations) / total,
+                "messages": counter.value / max(reader_count, 1),
+                "disconnects": slow_disconnects(port),
+            }
+        finally:
+            if readers:
+                readers.terminate()
+                readers.join()
+            for sock in stalled:
+                sock.close()
+            process.terminate()
+            process.wait()
+
+    async def run(self):
+        print(f"⏱️  {self.tasks} 個 {self.task} 任務（依序），{'dopeman-server' if self.unified else 'websocket-server'}")
+        results = {}
+        for clients in (0, self.clients):
+            r = results[clients] = await self.measure(clients)
+            label = f"{clients} 個客戶端" + (f"（{min(self.stalled, clients)} 個不讀取）" if clients else "")
+            print(f"  {label:24s} 中位數 {r['median'] * 1000:7.1f} ms  最慢 {r['max'] * 1000:7.1f} ms  "
+                  f"{r['throughput']:6.1f} 任務/秒  每客戶端收到 {r['messages']:6.1f} 則  "
+                  f"中斷慢速客戶端 {r['disconnects']}")
+        baseline, loaded = results[0], results[self.clients]
+        print(f"\n📉 吞吐量 {loaded['throughput'] / baseline['throughput'] * 100:.0f}%（相對於沒有其他客戶端）")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Broadcast Benchmark')
+    parser.add_argument('--task', default='scan', help='執行的任務類型 (預設: scan)')
+    parser.add_argument('--tasks', type=int, default=20, help='依序執行的任務數 (預設: 20)')
+    parser.add_argument('--clients', type=int, default=200, help='模擬的客戶端數 (預設: 200)')
+    parser.add_argument('--stalled', type=int, default=20, help='其中完全不讀取的客戶端數 (預設: 20)')
+    parser.add_argument('--unified', action='store_true', help='量測 dopeman-server.py（預設 websocket-server.py）')
+    parser.add_argument('server_args', nargs='*', help='傳給伺服器的其他參數（放在 -- 之後）')
+    args = parser.parse_args()
+
+    asyncio.run(BroadcastBenchmark(args.task, args.tasks, args.clients, args.stalled, args.unified,
+                                   args.server_args).run())
+
+
+if __name__ == "__main__":
+    main()
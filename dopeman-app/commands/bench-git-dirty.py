@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Dirty Detection Benchmark
+建立一個大型暫存 repo，比較 git status --porcelain 與 GitCollector dirty 探測（index 比對）的耗時
+"""
+
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from git_collector import GitCollector
+
+FILES_PER_DIR = 100
+
+
+class DirtyBenchmark:
+    """dirty 判斷效能比較"""
+
+    def __init__(self, files: int, rounds: int, index_version: int):
+        self.files = files
+        self.rounds = rounds
+        self.index_version = index_version
+        self.repo_dir = Path(tempfile.mkdtemp(prefix="dopeman-bench-"))
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.repo_dir, check=True, capture_output=True)
+
+    def setup(self):
+        print(f"📦 建立測試 repo（{self.files} 個檔案，index v{self.index_version}）: {self.repo_dir}")
+        self.git("init", "-q")
+        self.git("config", "user.email", "bench@dopeman.local")
+        self.git("config", "user.name", "bench")
+        self.git("config", "index.version", str(self.index_version))
+        for i in range(self.files):
+            sub = self.repo_dir / f"d{i // FILES_PER_DIR:04d}"
+            sub.mkdir(exist_ok=True)
+            (sub / f"f{i:06d}.txt").write_text(f"file {i}\n")
+        self.git("add", "-A")
+        self.git("commit", "-qm", "bench")
+        self.git("status")  # 更新 index 的 stat 資料，避免 racy 判斷
+
+    def time_cli(self, untracked: bool) -> float:
+        args = ["git", "status", "--porcelain"] + ([] if untracked else ["--untracked-files=no"])
+        started = time.perf_counter()
+        subprocess.run(args, cwd=self.repo_dir, capture_output=True, check=True)
+        return time.perf_counter() - started
+
+    def time_collector(self, untracked: bool) -> float:
+        """GitCollector 的 dirty 探測（process 內比對，必要時改用 git CLI）"""
+        collector = GitCollector(max_workers=1, repo_timeout=60.0,
+                                 check_untracked=untracked, untracked_budget=60.0)
+        started = time.perf_counter()
+        collector.collect([self.repo_dir], ("dirty",))
+        return time.perf_counter() - started
+
+    def measure(self, label: str):
+        print(f"\n⏱️  {label}")
+        for untracked in (False, True):
+            cli = [self.time_cli(untracked) for _ in range(self.rounds)]
+            ours = [self.time_collector(untracked) for _ in range(self.rounds)]
+            mode = "含 untracked" if untracked else "僅 tracked "
+            print(f"  {mode}  git CLI: {statistics.median(cli) * 1000:8.1f} ms   "
+                  f"collector: {statistics.median(ours) * 1000:8.1f} ms")
+
+    def run(self):
+        try:
+            self.setup()
+            self.measure("乾淨的 repo（需檢查全部檔案）")
+
+            # 修改第一個檔案：in-process 在第一個不同處即停止
+            first = self.repo_dir / "d0000" / "f000000.txt"
+            first.write_text("modified!\n")
+            self.measure("第一個檔案已修改（提早結束）")
+        finally:
+            shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Dirty Detection Benchmark')
+    parser.add_argument('--files', type=int, default=50000, help='測試 repo 的檔案數 (預設: 50000)')
+    parser.add_argument('--rounds', type=int, default=5, help='每種情境量測次數 (預設: 5)')
+    parser.add_argument('--index-version', type=int, default=2, choices=(2, 3, 4),
+                        help='測試 repo 的 index 版本 (預設: 2)')
+    args = parser.parse_args()
+
+    DirtyBenchmark(args.files, args.rounds, args.index_version).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Item Query Benchmark
+以合成的大型掃描結果量測 /api/items 查詢耗時（索引建立、篩選、搜尋、排序、facet）
+"""
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from item_query import ItemIndex
+from scan_output import ScanDataSource, write_shards
+
+
+def synthetic_data(count: int) -> dict:
+    """產生各類別 count 筆項目的掃描結果"""
+    rng = random.Random(42)
+    projects = [f"project-{i}" for i in range(max(1, count // 50))]
+    words = ["review", "deploy", "test", "refactor", "docs", "api", "data", "agent", "sync", "build"]
+
+    def phrase():
+        return " ".join(rng.sample(words, 3))
+
+    categories = {
+        "agents": [{
+            "name": f"agent-{i}-{rng.choice(words)}",
+            "path": f"/home/u/DEV/{rng.choice(projects)}/.claude/agents/agent-{i}.md",
+            "type": rng.choice(["coordinator", "worker"]),
+            "group": rng.choice(words),
+            "depth": rng.randint(0, 3),
+            "belongs_to_project": rng.choice(projects),
+        } for i in range(count)],
+        "commands": [{
+            "name": f"cmd-{i}",
+            "full_command": f"/cmd-{i}",
+            "entry_skill": rng.choice(words),
+            "description": phrase(),
+        } for i in range(count)],
+        "dev_projects": [{
+            "name": f"{rng.choice(projects)}-{i}",
+            "path": f"/home/u/DEV/p{i}",
+            "type": rng.choice(["git", "plain"]),
+            "summary": phrase(),
+            "is_dirty": rng.random() < 0.3,
+            "last_commit_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        } for i in range(count)],
+    }
+    return {
+        "last_scan": "2026-01-01T00:00:00",
+        "categories": {name: {"count": len(items), "items": items} for name, items in categories.items()},
+    }
+
+
+QUERIES = [
+    ("agents", {}),
+    ("agents", {"type": "worker"}),
+    ("agents", {"q": "review"}),
+    ("agents", {"q": "agent-12", "sort": "name"}),
+    ("agents", {"project": "project-3", "sort": "-name", "offset": 50}),
+    ("commands", {"q": "deploy docs", "sort": "name"}),
+    ("dev_projects", {"dirty": "true", "sort": "-last_commit_date"}),
+]
+
+
+class ItemQueryBenchmark:
+    """分頁查詢效能量測"""
+
+    def __init__(self, count: int, rounds: int):
+        self.count = count
+        self.rounds = rounds
+
+    def run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = write_shards(synthetic_data(self.count), Path(tmp))
+            size = sum(entry["bytes"] for entry in manifest["shards"].values())
+            print(f"📦 合成資料: 每類別 {self.count} 筆，{size / 1024 / 1024:.1f} MB")
+
+            index = ItemIndex(ScanDataSource(shard_dir=Path(tmp)))
+            started = time.perf_counter()
+            index.summary()
+            print(f"🏗️  載入並建立索引: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+            print(f"\n⏱️  中位數（{self.rounds} 次，第一次含排序快取建立）")
+            for category, params in QUERIES:
+                timings = []
+                for _ in range(self.rounds):
+                    started = time.perf_counter()
+                    result = index.query(category, **params)
+                    timings.append(time.perf_counter() - started)
+                label = f"{category} {params}"
+                print(f"  {label:70s} {statistics.median(timings) * 1000:7.2f} ms  "
+                      f"(首次 {timings[0] * 1000:.2f} ms, 符合 {result['matched']})")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Item Query Benchmark')
+    parser.add_argument('--count', type=int, default=5000, help='每類別項目數 (預設: 5000)')
+    parser.add_argument('--rounds', type=int, default=20, help='每個查詢量測次數 (預設: 20)')
+    args = parser.parse_args()
+
+    ItemQueryBenchmark(args.count, args.rounds).run()
+
+
+if __name__ == "__main__":
+    main()
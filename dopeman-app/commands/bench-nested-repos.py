@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Nested Repository Benchmark
+以合成的 repo 路徑比較舊版 O(n²) 字串前綴過濾與 split_nested 的耗時，並確認兩者結果一致
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from scan_walker import split_nested
+
+
+class NestedRepoBenchmark:
+    """巢狀 repo 過濾效能比較"""
+
+    def __init__(self, count: int, seed: int):
+        self.count = count
+        self.random = random.Random(seed)
+
+    def make_paths(self):
+        """產生 monorepo / vendored submodule 風格的 repo 路徑"""
+        root = Path("/home/bench/DEV")
+        paths = []
+        while len(paths) < self.count:
+            project = root / f"project-{len(paths):05d}"
+            paths.append(project)
+            # 約三成專案內有巢狀 repo（packages/*、vendor/*，偶爾再多一層）
+            if self.random.random() < 0.3:
+                for i in range(self.random.randint(1, 8)):
+                    child = project / self.random.choice(["packages", "libs", "third_party"]) / f"mod-{i}"
+                    paths.append(child)
+                    if self.random.random() < 0.2:
+                        paths.append(child / "deps" / "inner")
+        self.random.shuffle(paths)
+        return paths[:self.count]
+
+    @staticmethod
+    def legacy_filter(project_dirs):
+        """舊版 scan_dev_projects 的兩兩比對"""
+        top_level = []
+        for project_dir in sorted(project_dirs):
+            is_nested = False
+            for other_project_dir in project_dirs:
+                if project_dir != other_project_dir and str(project_dir).startswith(str(other_project_dir) + "/"):
+                    is_nested = True
+                    break
+            if not is_nested:
+                top_level.append(project_dir)
+        return top_level
+
+    def run(self):
+        paths = self.make_paths()
+        print(f"📦 合成 repo 路徑: {len(paths)} 個")
+
+        started = time.perf_counter()
+        legacy = self.legacy_filter(paths)
+        legacy_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        top_level, nested = split_nested(paths)
+        split_seconds = time.perf_counter() - started
+
+        nested_count = sum(len(children) for children in nested.values())
+        print(f"  最上層: {len(top_level)}  巢狀: {nested_count}")
+        print(f"  舊版 O(n²):    {legacy_seconds * 1000:10.1f} ms")
+        print(f"  split_nested: {split_seconds * 1000:10.1f} ms")
+
+        if legacy != top_level or len(top_level) + nested_count != len(set(paths)):
+            print("❌ 結果不一致")
+            return False
+        print("✅ 結果一致")
+        return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Nested Repository Benchmark')
+    parser.add_argument('--count', type=int, default=10000, help='合成 repo 路徑數 (預設: 10000)')
+    parser.add_argument('--seed', type=int, default=42, help='亂數種子 (預設: 42)')
+    args = parser.parse_args()
+
+    ok = NestedRepoBenchmark(args.count, args.seed).run()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Scan Delta Benchmark
+以合成的大型掃描結果量測每次增量更新推送給客戶端的資料量：
+重新載入完整文件、送出整個變動分類、只送變動項目（scan_delta patches）三者比較，並量測比較耗時
+"""
+
+import copy
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from scan_watcher import diff_items, patch_size
+
+
+def synthetic_data(count: int) -> dict:
+    """產生各類別 count 筆項目的掃描結果"""
+    rng = random.Random(42)
+    words = ["review", "deploy", "test", "refactor", "docs", "api", "data", "agent", "sync", "build"]
+
+    def phrase():
+        return " ".join(rng.sample(words, 3))
+
+    categories = {
+        "global_skills": [{
+            "id": f"skill-{i}",
+            "name": f"skill-{i}",
+            "path": f".claude/skills/skill-{i}",
+            "type": rng.choice(["single", "suite"]),
+            "description": phrase(),
+        } for i in range(count)],
+        "agents": [{
+            "name": f"agent-{i}",
+            "path": f"/home/u/DEV/p{i % 50}/.claude/agents/agent-{i}.md",
+            "type": rng.choice(["coordinator", "worker"]),
+            "description": phrase(),
+        } for i in range(count)],
+        "dev_projects": [{
+            "name": f"p{i}",
+            "path": f"/home/u/DEV/p{i}",
+            "summary": phrase(),
+            "is_dirty": rng.random() < 0.3,
+        } for i in range(count)],
+    }
+    return {
+        "last_scan": "2026-01-01T00:00:00",
+        "categories": {name: {"count": len(items), "items": items} for name, items in categories.items()},
+    }
+
+
+def mutate(items: list, changes: int, rng: random.Random) -> list:
+    """修改、刪除、新增各約 changes / 3 個項目"""
+    items = copy.deepcopy(items)
+    for item in rng.sample(items, changes // 3 + changes % 3):
+        item["description" if "description" in item else "summary"] += " (edited)"
+    for item in rng.sample(items, changes // 3):
+        items.remove(item)
+    template = items[0]
+    for i in range(changes // 3):
+        item = dict(template)
+        for field in ("id", "name", "path"):
+            if field in item:
+                item[field] = f"{item[field]}-new-{i}"
+        items.append(item)
+    return items
+
+
+def size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+class ScanDeltaBenchmark:
+    """增量更新的推送量與比較耗時"""
+
+    def __init__(self, count: int, changes: int, rounds: int):
+        self.count = count
+        self.changes = changes
+        self.rounds = rounds
+
+    def run(self):
+        data = synthetic_data(self.count)
+        document = size(data)
+        print(f"📦 合成資料: 每類別 {self.count} 筆，完整文件 {document / 1024:.0f} KB")
+        print(f"✏️  每次更新變動一個類別中的 {self.changes} 個項目（修改 / 刪除 / 新增）\n")
+
+        rng = random.Random(7)
+        for category, entry in data["categories"].items():
+            after = mutate(entry["items"], self.changes, rng)
+            timings = []
+            for _ in range(self.rounds):
+                started = time.perf_counter()
+                patch = diff_items(category, entry["items"], after)
+                timings.append(time.perf_counter() - started)
+            whole = size({"count": len(after), "items": after})
+            delta = size(dict(patch, count=len(after)))
+            print(f"  {category:14s} 完整文件 {document / 1024:8.1f} KB  整個分類 {whole / 1024:8.1f} KB  "
+                  f"變動項目 {delta / 1024:6.1f} KB（{patch_size(patch)} 項，{document / delta:5.0f}x）  "
+                  f"比較 {statistics.median(timings) * 1000:6.2f} ms")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Scan Delta Benchmark')
+    parser.add_argument('--count', type=int, default=5000, help='每類別項目數 (預設: 5000)')
+    parser.add_argument('--changes', type=int, default=6, help='每次更新變動的項目數 (預設: 6)')
+    parser.add_argument('--rounds', type=int, default=10, help='比較耗時的量測次數 (預設: 10)')
+    args = parser.parse_args()
+
+    ScanDeltaBenchmark(args.count, args.changes, args.rounds).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Server Startup Benchmark
+比較單一 process 的 dopeman-server.py 與分開的 api-server.py + websocket-server.py：
+冷啟動時間（啟動到 /api/status 回應且 WebSocket 握手成功）與穩定後的 RSS 總和；
+--history 列出各伺服器最近的啟動時間分解（startup-history.jsonl）
+"""
+
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from websockets.sync.client import connect
+
+from startup_timing import load_history
+
+COMMANDS_DIR = Path(__file__).parent
+
+READY_TIMEOUT = 30.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid: int) -> int:
+    """常駐記憶體（KB）：Linux 讀 /proc，其他平台使用 ps"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+    return int(output.strip() or 0)
+
+
+def http_ready(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://localhost:{port}/api/status", timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def ws_ready(port: int) -> bool:
+    try:
+        with connect(f"ws://localhost:{port}", open_timeout=1) as ws:
+            return json.loads(ws.recv(timeout=1)).get("type") == "current_tasks"
+    except Exception:  # 尚未啟動（連線被拒、握手失敗、逾時）
+        return False
+
+
+class ServerStartupBenchmark:
+    """冷啟動與 RSS 量測"""
+
+    def __init__(self, rounds: int, settle: float, extra_args: List[str]):
+        self.rounds = rounds
+        self.settle = settle
+        self.extra_args = extra_args
+
+    def spawn(self, mode: str):
+        """啟動伺服器，回傳 (processes, http_port, ws_port)"""
+        def start(script, port, *args):
+            return subprocess.Popen([sys.executable, script, "--port", str(port), *args],
+                                    cwd=COMMANDS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        if mode == "unified":
+            port = free_port()
+            return [start("dopeman-server.py", port, *self.extra_args)], port, port
+        http_port, ws_port = free_port(), free_port()
+        return [start("api-server.py", http_port), start("websocket-server.py", ws_port, *self.extra_args)], \
+            http_port, ws_port
+
+    def measure(self, mode: str) -> Optional[Dict[str, float]]:
+        started = time.monotonic()
+        processes, http_port, ws_port = self.spawn(mode)
+        try:
+            http_done = ws_done = None
+            while time.monotonic() - started < READY_TIMEOUT:
+                if http_done is None and http_ready(http_port):
+                    http_done = time.monotonic() - started
+                if ws_done is None and ws_ready(ws_port):
+                    ws_done = time.monotonic() - started
+                if http_done is not None and ws_done is not None:
+                    break
+                time.sleep(0.01)
+            else:
+                return None
+
+            # 等待預先載入 / 初次掃描完成，並各使用一次 API 後量測
+            time.sleep(self.settle)
+            urllib.request.urlopen(f"http://localhost:{http_port}/api/items").read()
+            ws_ready(ws_port)
+            return {
+                "ready": max(http_done, ws_done),
+                "http": http_done,
+                "ws": ws_done,
+                "rss_mb": sum(rss_kb(p.pid) for p in processes) / 1024,
+                "processes": len(processes),
+            }
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+    def run(self):
+        results = {}
+        for mode in ("split", "unified"):
+            samples = [s for s in (self.measure(mode) for _ in range(self.rounds)) if s]
+            if not samples:
+                print(f"❌ {mode}: {READY_TIMEOUT:.0f} 秒內未就緒")
+                continue
+            results[mode] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+        print(f"\n⏱️  中位數（{self.rounds} 次，穩定 {self.settle}s 後量測 RSS）")
+        labels = {"split": "api-server + websocket-server", "unified": "dopeman-server"}
+        for mode, r in results.items():
+            print(f"  {labels[mode]:32s} {int(r['processes'])} process  就緒 {r['ready'] * 1000:7.0f} ms "
+                  f"(HTTP {r['http'] * 1000:.0f} / WS {r['ws'] * 1000:.0f})  RSS {r['rss_mb']:6.1f} MB")
+        if len(results) == 2:
+            split, unified = results["split"], results["unified"]
+            print(f"\n📉 RSS 節省 {split['rss_mb'] - unified['rss_mb']:.1f} MB "
+                  f"({(1 - unified['rss_mb'] / split['rss_mb']) * 100:.0f}%)，"
+                  f"冷啟動縮短 {(split['ready'] - unified['ready']) * 1000:.0f} ms")
+
+
+def print_history(count: int):
+    """各伺服器最近 count 次的啟動時間分解"""
+    entries = load_history()
+    if not entries:
+        print("📭 尚無啟動歷史")
+        return
+    for server in sorted({e["server"] for e in entries}):
+        print(f"\n📈 {server}（最近 {count} 次）")
+        for entry in [e for e in entries if e["server"] == server][-count:]:
+            phases = " / ".join(f"{name} {ms:.0f}" for name, ms in entry["phases_ms"].items())
+            warm = " / ".join(f"{name} {ms:.0f}" for name, ms in entry["warm_phases_ms"].items())
+            print(f"  {entry['at'][:19]}  就緒 {entry['ready_ms']:6.0f} ms  預熱完成 {entry['warm_ms']:6.0f} ms  "
+                  f"({phases}；預熱 {warm})")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Server Startup Benchmark')
+    parser.add_argument('--rounds', type=int, default=5, help='每種模式量測次數 (預設: 5)')
+    parser.add_argument('--settle', type=float, default=3.0, help='就緒後等待幾秒再量測 RSS (預設: 3)')
+    parser.add_argument('--no-watch', action='store_true', help='兩種模式都不啟動即時監看')
+    parser.add_argument('--history', type=int, metavar='N', help='只列出最近 N 次的啟動歷史，不量測')
+    args = parser.parse_args()
+
+    if args.history:
+        print_history(args.history)
+        return
+    ServerStartupBenchmark(args.rounds, args.settle, ["--no-watch"] if args.no_watch else []).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Task Latency Benchmark
+比較每次啟動 python3 子程序與 process 內（模組已預先載入）執行各任務的端對端耗時
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from task_runner import TaskRunner
+
+# 不修改環境的任務（fix 會寫入備份，update-data 需要網路，不列入預設）
+DEFAULT_TASKS = ["health-check", "check", "reload", "scan"]
+
+
+class TaskBenchmark:
+    """任務執行方式效能比較"""
+
+    def __init__(self, tasks, rounds: int):
+        self.tasks = tasks
+        self.rounds = rounds
+
+    @staticmethod
+    def measure(runner: TaskRunner, task: str) -> float:
+        started = time.perf_counter()
+        runner.run(task)
+        return time.perf_counter() - started
+
+    def run(self):
+        spawn = TaskRunner(in_process=False)
+        warm = TaskRunner(in_process=True)
+
+        started = time.perf_counter()
+        timings = warm.warm_up(self.tasks)
+        print(f"🔥 預先載入 {len(timings)} 個任務模組: {(time.perf_counter() - started) * 1000:.1f} ms")
+        for task, reason in warm.unavailable.items():
+            print(f"  ⚠️  {task} 無法在 process 內執行（{reason}），以子程序計時")
+
+        print(f"\n⏱️  中位數（{self.rounds} 次）")
+        for task in self.tasks:
+            spawned = [self.measure(spawn, task) for _ in range(self.rounds)]
+            in_process = [self.measure(warm, task) for _ in range(self.rounds)]
+            print(f"  {task:14s} 子程序: {statistics.median(spawned) * 1000:8.1f} ms   "
+                  f"process 內: {statistics.median(in_process) * 1000:8.1f} ms")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Task Latency Benchmark')
+    parser.add_argument('--tasks', nargs='+', default=DEFAULT_TASKS, help=f'要量測的任務 (預設: {" ".join(DEFAULT_TASKS)})')
+    parser.add_argument('--rounds', type=int, default=5, help='每種方式量測次數 (預設: 5)')
+    args = parser.parse_args()
+
+    TaskBenchmark(args.tasks, args.rounds).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -168,7 +168,11 @@ class EnvironmentChecker:
         """檢查資料檔案"""
         print_info("\n檢查資料檔案...")
 
-        data_file = self.project_dir / 'dopeman-app' / 'commands' / 'control-center-real-data.json'
+        commands_dir = self.project_dir / 'dopeman-app' / 'commands'
+        # 分片輸出的 manifest，沒有時檢查舊版單一檔案
+        data_file = commands_dir / 'scan-data' / 'manifest.json'
+        if not data_file.exists():
+            data_file = commands_dir / 'control-center-real-data.json'
 
         if not data_file.exists():
             print_warning(f"資料檔案不存在: {data_file.name}")
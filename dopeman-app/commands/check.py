@@ -367,6 +367,23 @@ class IntegrityChecker:
                     self.report["commands"]["ok"] += 1
                     self.report["summary"]["ok"] += 1
 
+    def run(self, check_type: str = "all") -> Dict[str, Any]:
+        """執行指定類型的檢查並更新摘要，回傳報告"""
+        if check_type in ['skills', 'all']:
+            self.check_skills()
+
+        if check_type in ['rules', 'all']:
+            self.check_rules()
+
+        if check_type in ['agents', 'all']:
+            self.check_agents()
+
+        if check_type in ['commands', 'all']:
+            self.check_commands()
+
+        self.update_summary()
+        return self.report
+
     def update_summary(self):
         """更新摘要"""
         self.report["summary"]["total_items"] = (
@@ -481,20 +498,7 @@ def main():
     checker = IntegrityChecker()
 
     # 執行檢查
-    if args.type in ['skills', 'all']:
-        checker.check_skills()
-
-    if args.type in ['rules', 'all']:
-        checker.check_rules()
-
-    if args.type in ['agents', 'all']:
-        checker.check_agents()
-
-    if args.type in ['commands', 'all']:
-        checker.check_commands()
-
-    # 更新摘要
-    checker.update_summary()
+    checker.run(args.type)
 
     # 列印報告
     checker.print_report(verbose=args.verbose)
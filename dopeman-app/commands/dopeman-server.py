@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+DopeMAN Server
+單一 process、單一 port 的伺服器：REST API、WebSocket 與靜態檔案由同一個 asyncio event loop 接收連線，
+共用同一個 JobManager / TaskRunner 與 LiveScan 的記憶體掃描模型。
+取代 api-server.py + websocket-server.py 兩個 process（兩者仍可單獨執行）：
+
+- 接受連線後以 MSG_PEEK 窺看請求標頭（不取出資料）
+- Upgrade: websocket → websockets 的 sans-I/O 協定 + asyncio streams，沿用 websocket-server.py 的 handle_client
+- 其餘 HTTP 請求 → 每個連線一個執行緒執行 api-server.py 的 DopeMAN_API_Handler（與 ThreadingHTTPServer 相同）
+- WebSocket 任務與 /api/* 工作都送進同一個 JobManager（同時執行上限、排隊順序、去重與取消共用），
+  /api/jobs 可看到所有任務
+- /api/status、/api/items 直接讀取 LiveScan 的快照，不需重讀分片檔
+"""
+
+import time
+
+STARTED_AT = time.time()  # 啟動時間量測起點（其餘 import 之前）
+
+import argparse
+import asyncio
+import functools
+import os
+import re
+import socket
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+from websockets.exceptions import InvalidState
+from websockets.frames import Opcode
+from websockets.http11 import Request
+from websockets.protocol import State
+from websockets.server import ServerProtocol
+
+from item_query import ItemIndex
+from job_manager import DEFAULT_JOB_WORKERS, JobManager
+from scan_output import DEFAULT_OUTPUT_FORMAT, LEGACY_FILE, OUTPUT_FORMATS
+from scan_watcher import DEFAULT_POLL_INTERVAL, LiveScan, LiveScanSource
+from send_queue import DEFAULT_MAX_QUEUE, DEFAULT_PROGRESS_RATE, DEFAULT_SLOW_TIMEOUT, Broadcaster
+from single_flight import SingleFlight
+from startup_timing import StartupTimer
+from static_files import StaticFiles
+from status_cache import StatusCache
+from task_log import DEFAULT_CAPACITY, LOG_FILE, TaskLog
+from task_runner import COMMANDS_DIR, TaskRunner, load_script
+
+DEFAULT_PORT = 8891
+
+# 請求標頭上限與等待時間（瀏覽器預先建立但不送出請求的連線會在逾時後關閉）
+MAX_HEADER_BYTES = 65536
+HEADER_TIMEOUT = 30.0
+# 標頭尚未收完時重新窺看的間隔（窺看不取出資料，socket 會一直保持可讀）
+PEEK_RETRY = 0.005
+
+WS_MAX_MESSAGE = 1024 * 1024
+WS_READ_SIZE = 65536
+
+UPGRADE_WEBSOCKET = re.compile(rb"^upgrade:[ \t]*websocket[ \t]*\r?$", re.IGNORECASE | re.MULTILINE)
+
+
+async def wait_readable(loop: asyncio.AbstractEventLoop, sock: socket.socket):
+    future = loop.create_future()
+    loop.add_reader(sock.fileno(), lambda: future.done() or future.set_result(None))
+    try:
+        await future
+    finally:
+        loop.remove_reader(sock.fileno())
+
+
+async def peek_head(loop: asyncio.AbstractEventLoop, sock: socket.socket) -> bytes:
+    """窺看請求標頭（資料留在 socket 中，交給 HTTP handler 時可從頭讀取）；連線關閉時回傳 b\"\" """
+    while True:
+        await wait_readable(loop, sock)
+        head = sock.recv(MAX_HEADER_BYTES, socket.MSG_PEEK)
+        if not head:
+            return b""
+        end = head.find(b"\r\n\r\n")
+        if end >= 0:
+            return head[:end]
+        if len(head) >= MAX_HEADER_BYTES:
+            return head
+        await asyncio.sleep(PEEK_RETRY)
+
+
+class WebSocketConnection:
+    """websockets sans-I/O 協定的連線：提供與 websockets 連線物件相同的 send()、async for、request 與 remote_address，
+    websocket-server.py 的 handle_client / broadcast_message 可直接使用"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, protocol: ServerProtocol):
+        self.reader = reader
+        self.writer = writer
+        self.protocol = protocol
+        self.remote_address = writer.get_extra_info("peername")
+        self.request: Optional[Request] = None  # 握手完成後設定（handle_client 讀取 ?since=）
+
+    @property
+    def transport(self) -> asyncio.Transport:
+        """底層 transport（送出佇列中斷慢速客戶端時 abort）"""
+        return self.writer.transport
+
+    async def send(self, message: str):
+        self.protocol.send_text(message.encode("utf-8"))
+        await self.flush()
+
+    async def flush(self):
+        for data in self.protocol.data_to_send():
+            if data:
+                self.writer.write(data)
+            elif self.writer.can_write_eof():
+                self.writer.write_eof()
+        await self.writer.drain()
+
+    def __aiter__(self):
+        return self.messages()
+
+    async def messages(self):
+        """收到的文字 / 二進位訊息（分段訊息組合後才回傳）；ping / close 由協定自動回應"""
+        fragments = []
+        while self.protocol.state is not State.CLOSED:
+            data = await self.reader.read(WS_READ_SIZE)
+            if data:
+                self.protocol.receive_data(data)
+            else:
+                self.protocol.receive_eof()
+            for frame in self.protocol.events_received():
+                if frame.opcode in (Opcode.TEXT, Opcode.BINARY):
+                    fragments = [frame]
+                elif frame.opcode is Opcode.CONT and fragments:
+                    fragments.append(frame)
+                else:
+                    continue
+                if frame.fin:
+                    payload = b"".join(f.data for f in fragments)
+                    text = fragments[0].opcode is Opcode.TEXT
+                    fragments = []
+                    yield payload.decode("utf-8") if text else payload
+            await self.flush()
+            if not data:
+                return
+
+
+class DopeMANServer:
+    """單一 port 的 HTTP / WebSocket 伺服器
+
+    用法：
+        server = DopeMANServer(port=8891)
+        await server.serve()
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, host: str = "", watch: bool = True, watch_poll: bool = False,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, job_workers: int = DEFAULT_JOB_WORKERS,
+                 in_process: bool = True, single_flight: bool = True,
+                 output_format: str = DEFAULT_OUTPUT_FORMAT, ready_fd: Optional[int] = None,
+                 progress_rate: float = DEFAULT_PROGRESS_RATE, client_queue: int = DEFAULT_MAX_QUEUE,
+                 slow_timeout: float = DEFAULT_SLOW_TIMEOUT, task_log_file: Optional[Path] = LOG_FILE,
+                 task_history: int = DEFAULT_CAPACITY):
+        self.ws = load_script("websocket-server.py")
+        self.api = load_script("api-server.py")
+        # imports 階段包含上面兩個腳本（websockets、http.server 等）
+        self.startup = StartupTimer("dopeman-server", STARTED_AT)
+        self.port = port
+        self.host = host
+        self.ready_fd = ready_fd
+
+        self.live: Optional[LiveScan] = None
+        overrides = {}
+        if watch:
+            self.live = LiveScan(LEGACY_FILE, on_delta=self.ws.broadcast_message, force_polling=watch_poll,
+                                 poll_interval=poll_interval, output_format=output_format)
+            # 掃描任務直接更新記憶體模型，不另建一個掃描器重掃
+            overrides["scan"] = self.live.rescan_threadsafe
+            source = LiveScanSource(self.live)
+        else:
+            source = None
+
+        # HTTP handler 透過 self.server 取得的共用狀態（與 api-server.py 的 httpd 屬性相同）
+        self.state = SimpleNamespace(
+            startup=self.startup,
+            jobs=JobManager(max_workers=job_workers),
+            tasks=TaskRunner(in_process=in_process, flights=SingleFlight() if single_flight else None,
+                             overrides=overrides),
+            status=StatusCache(source=source),
+            static=StaticFiles(),
+            items=ItemIndex(source),
+        )
+        self.handler = functools.partial(self.api.DopeMAN_API_Handler, directory=str(COMMANDS_DIR))
+
+        # WebSocket 任務改送進共用的 JobManager（serve() 中 attach_jobs）
+        self.ws.task_runner = self.state.tasks
+        self.ws.broadcaster = Broadcaster(progress_rate=progress_rate, max_queue=client_queue,
+                                          slow_timeout=slow_timeout)
+        self.ws.task_log = TaskLog(task_log_file, capacity=task_history)
+        self.ws.task_log.load()
+        self.ws.live_scan = self.live
+
+        self.connections: set = set()
+        self.counts = {"http": 0, "websocket": 0, "dropped": 0}
+        self.startup.mark("init")
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        listener = socket.create_server((self.host, self.port), backlog=128)
+        listener.setblocking(False)
+        self.ws.attach_jobs(self.state.jobs)
+        self.startup.mark("bind")
+        self.startup.warming("tasks", "model")
+        self.startup.set_ready(self.ready_fd, port=self.port)
+
+        # 背景預先載入各工具模組、建立記憶體模型，不延後接受連線
+        loop.run_in_executor(None, self.startup.warm, "tasks", self.state.tasks.warm_up)
+        if self.live:
+            asyncio.create_task(self.warm_live())
+        else:
+            loop.run_in_executor(None, self.startup.warm, "model", self.api.warm_model, self.state)
+
+        self.print_banner()
+        try:
+            while True:
+                sock, address = await loop.sock_accept(listener)
+                task = asyncio.create_task(self.dispatch(sock, address))
+                self.connections.add(task)
+                task.add_done_callback(self.connections.discard)
+        finally:
+            listener.close()
+            if self.live:
+                await self.live.stop()
+            self.state.jobs.shutdown()
+            self.ws.task_log.close()
+
+    async def warm_live(self):
+        started = time.time()
+        try:
+            await self.live.start()
+        finally:
+            self.startup.warmed("model", time.time() - started)
+
+    async def dispatch(self, sock: socket.socket, address):
+        """依請求標頭分派到 WebSocket 或 HTTP handler"""
+        loop = asyncio.get_running_loop()
+        try:
+            head = await asyncio.wait_for(peek_head(loop, sock), HEADER_TIMEOUT)
+        except (asyncio.TimeoutError, OSError):
+            head = b""
+        if not head:
+            self.counts["dropped"] += 1
+            sock.close()
+            return
+
+        if UPGRADE_WEBSOCKET.search(head):
+            self.counts["websocket"] += 1
+            await self.serve_websocket(sock)
+        else:
+            self.counts["http"] += 1
+            threading.Thread(target=self.serve_http, args=(sock, address), daemon=True).start()
+
+    def serve_http(self, sock: socket.socket, address):
+        """在執行緒中以阻塞 socket 執行 DopeMAN_API_Handler（處理完即關閉連線）"""
+        sock.setblocking(True)
+        try:
+            self.handler(sock, address, self.state)
+        except Exception as e:
+            print(f"⚠️  HTTP 請求處理失敗 ({address[0]}): {e}")
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+            sock.close()
+
+    async def serve_websocket(self, sock: socket.socket):
+        reader, writer = await asyncio.open_connection(sock=sock)
+        protocol = ServerProtocol(max_size=WS_MAX_MESSAGE)
+        connection = WebSocketConnection(reader, writer, protocol)
+        try:
+            # 握手：收到完整的 HTTP 請求後回應 101
+            request = None
+            while request is None:
+                data = await reader.read(WS_READ_SIZE)
+                if not data:
+                    return
+                protocol.receive_data(data)
+                request = next((e for e in protocol.events_received() if isinstance(e, Request)), None)
+            connection.request = request
+            response = protocol.accept(request)
+            protocol.send_response(response)
+            await connection.flush()
+            if response.status_code != 101:
+                return
+            await self.ws.handle_client(connection)
+        except (ConnectionError, InvalidState):
+            pass
+        finally:
+            if protocol.state is State.OPEN:
+                protocol.send_close()
+                try:
+                    await connection.flush()
+                except ConnectionError:
+                    pass
+            writer.close()
+
+    def print_banner(self):
+        print("🚀 DopeMAN Server")
+        print("=" * 60)
+        print(f"📍 HTTP:      http://localhost:{self.port}")
+        print(f"📍 WebSocket: ws://localhost:{self.port}")
+        print("📡 REST API 與 api-server.py 相同，WebSocket 指令與 websocket-server.py 相同")
+        print(f"👀 即時監看: {'啟用（記憶體模型）' if self.live else '停用'}")
+        print(self.startup.describe())
+        print("\n按 Ctrl+C 停止伺服器\n", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DopeMAN Server（單一 port：REST API、WebSocket、靜態檔案）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'端口 (預設: {DEFAULT_PORT})')
+    parser.add_argument('--host', default='', help='綁定位址 (預設: 所有介面，與 api-server.py 相同)')
+    parser.add_argument('--job-workers', type=int, default=DEFAULT_JOB_WORKERS,
+                        help=f'背景工作並行數 (預設: {DEFAULT_JOB_WORKERS})')
+    parser.add_argument('--no-watch', action='store_true', help='不監看檔案系統（不推送 scan_delta）')
+    parser.add_argument('--watch-poll', action='store_true', help='以輪詢取代 inotify 監看')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'輪詢間隔秒數 (預設: {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--subprocess', action='store_true', help='每個任務啟動獨立的 python3（不在 process 內執行）')
+    parser.add_argument('--no-single-flight', action='store_true', help='不合併重複的任務請求')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT,
+                        help=f'即時監看的掃描結果輸出格式 (預設: {DEFAULT_OUTPUT_FORMAT})')
+    parser.add_argument('--ready-fd', type=int, help='就緒時寫入一行 JSON（含啟動時間分解）到此 fd 後關閉')
+    parser.add_argument('--progress-rate', type=float, default=DEFAULT_PROGRESS_RATE,
+                        help=f'每個任務每秒最多送出幾則 progress，0 為不限制 (預設: {DEFAULT_PROGRESS_RATE:g})')
+    parser.add_argument('--client-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f'每個客戶端的送出佇列上限 (預設: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--slow-timeout', type=float, default=DEFAULT_SLOW_TIMEOUT,
+                        help=f'佇列持續滿載或送出卡住幾秒後中斷該客戶端 (預設: {DEFAULT_SLOW_TIMEOUT:g})')
+    parser.add_argument('--task-log', type=Path, default=LOG_FILE, help=f'任務事件記錄檔 (預設: {LOG_FILE})')
+    parser.add_argument('--no-task-log', action='store_true', help='任務事件只保留在記憶體中（不寫入記錄檔）')
+    parser.add_argument('--task-history', type=int, default=DEFAULT_CAPACITY,
+                        help=f'保留幾則任務事件供重新連線的客戶端接續 (預設: {DEFAULT_CAPACITY})')
+    args = parser.parse_args()
+
+    # 靜態檔案與相對路徑以 commands 目錄為準
+    os.chdir(COMMANDS_DIR)
+
+    server = DopeMANServer(args.port, host=args.host, watch=not args.no_watch, watch_poll=args.watch_poll,
+                           poll_interval=args.poll_interval, job_workers=args.job_workers,
+                           in_process=not args.subprocess, single_flight=not args.no_single_flight,
+                           output_format=args.output_format, ready_fd=args.ready_fd,
+                           progress_rate=args.progress_rate, client_queue=args.client_queue,
+                           slow_timeout=args.slow_timeout,
+                           task_log_file=None if args.no_task_log else args.task_log,
+                           task_history=args.task_history)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n\n⏹️  伺服器已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,12 @@ import time
 import yfinance as yf
 import pandas as pd
 
+import metrics
+import progress
+
+# 各資料來源的抓取時間（在伺服器內以 load_script 執行時會出現在 /metrics）
+FETCH_SECONDS = metrics.histogram("dopeman_info_stream_fetch_seconds", "資訊匯流各來源抓取時間（秒）", ("source",))
+
 # PTT 基本設定
 PTT_BASE_URL = "https://www.ptt.cc"
 PTT_OVER18_COOKIE = {"over18": "1"}
@@ -164,7 +170,9 @@ def fetch_tw_stock_data_yfinance(symbols, limit=30):
         # 使用 yfinance 批次下載
         tickers = yf.Tickers(' '.join(tw_symbols))
 
-        for symbol in symbols:
+        reporter = progress.current()
+        for done, symbol in enumerate(symbols, 1):
+            reporter.items(done, len(symbols), symbol)
             try:
                 ticker_symbol = f"{symbol}.TW"
                 ticker = yf.Ticker(ticker_symbol)
@@ -366,28 +374,33 @@ def save_to_json(data, filename='info-stream-data.json'):
         print(f"❌ 儲存失敗: {e}")
 
 
-def main():
-    """主程式"""
-    print("=" * 60)
-    print("🚀 DopeMAN Info Stream - PTT + 台股爬蟲 v2 (yfinance)")
-    print("=" * 60)
-    print()
+def collect_info_stream():
+    """爬取 PTT 與台股資料，回傳資訊匯流資料（不寫檔）"""
+    reporter = progress.current()
+    # 漲跌榜各逐檔取得熱門股票資料，佔大部分時間
+    reporter.plan(["ptt_gossiping", "tw_gainers", "tw_losers", "tw_indices"],
+                  weights={"ptt_gossiping": 2, "tw_gainers": 10, "tw_losers": 10, "tw_indices": 1})
 
     # 1. 爬取 PTT
-    ptt_gossiping = fetch_ptt_hot_articles(board="Gossiping", limit=10)
+    with reporter.phase("ptt_gossiping", "爬取 PTT 熱門文章"), FETCH_SECONDS.time(source="ptt_gossiping"):
+        ptt_gossiping = fetch_ptt_hot_articles(board="Gossiping", limit=10)
     time.sleep(2)  # 避免太頻繁請求
 
     # 2. 取得台股資料（使用 yfinance）
-    tw_gainers = fetch_tw_stock_top_gainers(limit=30)
+    with reporter.phase("tw_gainers", "取得台股漲幅資料"), FETCH_SECONDS.time(source="tw_gainers"):
+        tw_gainers = fetch_tw_stock_top_gainers(limit=30)
     time.sleep(1)
 
-    tw_losers = fetch_tw_stock_top_losers(limit=30)
+    with reporter.phase("tw_losers", "取得台股跌幅資料"), FETCH_SECONDS.time(source="tw_losers"):
+        tw_losers = fetch_tw_stock_top_losers(limit=30)
     time.sleep(1)
 
-    tw_indices = fetch_tw_stock_indices()
+    with reporter.phase("tw_indices", "取得加權指數"), FETCH_SECONDS.time(source="tw_indices"):
+        tw_indices = fetch_tw_stock_indices()
+    reporter.finish()
 
     # 3. 組裝資料
-    data = {
+    return {
         'metadata': {
             'generated_at': datetime.now().isoformat(),
             'version': '2.0.0',
@@ -410,20 +423,30 @@ def main():
         }
     }
 
+
+def main():
+    """主程式"""
+    print("=" * 60)
+    print("🚀 DopeMAN Info Stream - PTT + 台股爬蟲 v2 (yfinance)")
+    print("=" * 60)
+    print()
+
+    data = collect_info_stream()
+
     # 4. 儲存到 JSON
     save_to_json(data)
 
+    tw = data['stocks']['tw']
     print()
     print("=" * 60)
     print("✅ 爬蟲執行完成！")
     print("=" * 60)
     print(f"📊 統計：")
-    print(f"   PTT 八卦板熱門: {len(ptt_gossiping)} 篇")
-    print(f"   台股漲幅榜: {len(tw_gainers)} 檔")
-    print(f"   台股跌幅榜: {len(tw_losers)} 檔")
-    print(f"   指數: 加權指數 {tw_indices['taiex']['value']}")
+    print(f"   PTT 八卦板熱門: {data['social']['ptt']['gossiping']['count']} 篇")
+    print(f"   台股漲幅榜: {len(tw['top_gainers'])} 檔")
+    print(f"   台股跌幅榜: {len(tw['top_losers'])} 檔")
+    print(f"   指數: 加權指數 {tw['indices']['taiex']['value']}")
     print()
 
-
 if __name__ == '__main__':
     main()
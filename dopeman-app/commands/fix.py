@@ -13,6 +13,9 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 import yaml
 
+import progress
+from location_index import agent_project_skill_dirs
+
 # 路徑配置
 HOME = Path.home()
 CLAUDE_DIR = HOME / ".claude"
@@ -28,6 +31,7 @@ class AutoFixer:
     def __init__(self, dry_run: bool = False):
         self.dry_run = dry_run
         self.backup_dir = None
+        self.agent_skills = None  # 有損壞的 symlink 時才列出 AgentProjects 的 skills
         self.fix_history = {
             "version": "1.0.0",
             "fix_time": datetime.now().isoformat(),
@@ -136,52 +140,25 @@ class AutoFixer:
                 # symlink 損壞
                 self.fix_history["fixes"]["total_fixes"] += 1
 
-                # 嘗試尋找新位置
+                # 嘗試尋找新位置（查詢位置索引）
                 skill_name = item.name
-                found = False
-
-                # 搜尋 AgentProjects
-                if AGENT_PROJECTS_DIR.exists():
-                    for project_dir in AGENT_PROJECTS_DIR.iterdir():
-                        if not project_dir.is_dir():
-                            continue
-
-                        # 檢查專案根目錄
-                        if project_dir.name == skill_name and (project_dir / "SKILL.md").exists():
-                            if not self.dry_run:
-                                self.backup_file(item)
-                                item.unlink()
-                                item.symlink_to(project_dir)
-
-                            self.fix_history["fixes"]["symlinks_rebuilt"].append({
-                                "link": str(item),
-                                "old_target": "unknown",
-                                "new_target": str(project_dir)
-                            })
-                            self.fix_history["summary"]["successful"] += 1
-                            print(f"   ✅ 重建: {skill_name} → {project_dir}")
-                            found = True
-                            break
-
-                        # 檢查 .claude/skills/
-                        skills_search = project_dir / ".claude" / "skills" / skill_name
-                        if skills_search.exists() and (skills_search / "SKILL.md").exists():
-                            if not self.dry_run:
-                                self.backup_file(item)
-                                item.unlink()
-                                item.symlink_to(skills_search)
-
-                            self.fix_history["fixes"]["symlinks_rebuilt"].append({
-                                "link": str(item),
-                                "old_target": "unknown",
-                                "new_target": str(skills_search)
-                            })
-                            self.fix_history["summary"]["successful"] += 1
-                            print(f"   ✅ 重建: {skill_name} → {skills_search}")
-                            found = True
-                            break
+                new_target = self.find_skill_location(skill_name)
+
+                if new_target is not None:
+                    if not self.dry_run:
+                        self.backup_file(item)
+                        item.unlink()
+                        item.symlink_to(new_target)
 
-                if not found:
+                    self.fix_history["fixes"]["symlinks_rebuilt"].append({
+                        "link": str(item),
+                        "old_target": "unknown",
+                        "new_target": str(new_target)
+                    })
+                    self.fix_history["summary"]["successful"] += 1
+                    print(f"   ✅ 重建: {skill_name} → {new_target}")
+
+                else:
                     # 找不到新位置，移除損壞的 symlink
                     if not self.dry_run:
                         self.backup_file(item)
@@ -194,6 +171,22 @@ class AutoFixer:
                     self.fix_history["summary"]["successful"] += 1
                     print(f"   ✅ 移除: {skill_name} (目標已不存在)")
 
+        self.agent_skills = None
+
+    def find_skill_location(self, skill_name: str) -> Optional[Path]:
+        """在 AgentProjects 中找 skill 的新位置：{project}/SKILL.md 優先，其次 {project}/.claude/skills/{skill}"""
+        if self.agent_skills is None:
+            self.agent_skills = agent_project_skill_dirs(AGENT_PROJECTS_DIR)
+
+        team_skill = None
+        for skill_dir in self.agent_skills:
+            parts = skill_dir.relative_to(AGENT_PROJECTS_DIR).parts
+            if parts == (skill_name,):
+                return skill_dir
+            if team_skill is None and len(parts) == 4 and parts[1:] == (".claude", "skills", skill_name):
+                team_skill = skill_dir
+        return team_skill
+
     def fix_missing_frontmatter(self):
         """修復缺少的 frontmatter"""
         print("\n📝 修復缺少的 YAML Frontmatter...")
@@ -374,6 +367,35 @@ class AutoFixer:
 
         return history_file
 
+    def run(self, save: bool = True) -> Dict[str, Any]:
+        """執行全部修復（備份 → symlinks → frontmatter → 權限），回傳修復紀錄"""
+        reporter = progress.current()
+        reporter.plan(["backup", "symlinks", "frontmatter", "permissions"])
+
+        # 建立備份
+        with reporter.phase("backup", "備份當前配置"):
+            self.create_backup()
+        print()
+
+        # 執行修復
+        with reporter.phase("symlinks", "修復 Symlinks"):
+            self.fix_broken_symlinks()
+        with reporter.phase("frontmatter", "修復 Frontmatter"):
+            self.fix_missing_frontmatter()
+        with reporter.phase("permissions", "修復 Command 權限"):
+            self.fix_command_permissions()
+        reporter.finish()
+
+        # 列印摘要
+        self.print_summary()
+
+        # 儲存歷史
+        if save:
+            history_file = self.save_history()
+            print(f"\n📄 修復歷史已儲存: {history_file}")
+
+        return self.fix_history
+
     def print_summary(self):
         """列印摘要"""
         print("\n" + "━" * 50)
@@ -410,23 +432,7 @@ def main():
         print()
 
     fixer = AutoFixer(dry_run=args.dry_run)
-
-    # 建立備份
-    fixer.create_backup()
-    print()
-
-    # 執行修復
-    fixer.fix_broken_symlinks()
-    fixer.fix_missing_frontmatter()
-    fixer.fix_command_permissions()
-
-    # 列印摘要
-    fixer.print_summary()
-
-    # 儲存歷史
-    if args.save or not args.dry_run:
-        history_file = fixer.save_history()
-        print(f"\n📄 修復歷史已儲存: {history_file}")
+    fixer.run(save=args.save or not args.dry_run)
 
     print()
     print("━" * 50)
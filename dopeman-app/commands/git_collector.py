@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Concurrent Git Collector
+以有上限的 thread pool 並行收集各 repo 的 git 狀態；
+每個 repo 有獨立的時間預算，超過即標記為 "stale"，不會拖住整個掃描。
+能由 git_reader 在 process 內讀取的資料不 fork git，無法解析時才改用 git CLI
+"""
+
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import metrics
+import progress
+from git_reader import GitReaderError, GitRepo, open_repo
+from git_status import DEFAULT_UNTRACKED_BUDGET, DirtyChecker, LargeIndexError
+from scan_cache import latest_mtime_ns
+
+# 預設並行數與每個 repo 的時間預算（秒）
+DEFAULT_WORKERS = 8
+DEFAULT_REPO_TIMEOUT = 10.0
+
+# 可用的探測項目
+PROBES = ("remote_url", "last_commit", "dirty", "unpushed")
+
+GIT_PROBES = metrics.counter("dopeman_git_probes_total", "git 探測次數（process 內讀取 / git CLI）", ("source",))
+GIT_PROBE_SECONDS = metrics.histogram("dopeman_git_probe_seconds", "單一 git 探測耗時（秒）", ("probe",))
+GIT_STALE = metrics.counter("dopeman_git_stale_repos_total", "超過時間預算而標記為 stale 的 repo 次數")
+
+# 探測失敗或逾時時使用的預設值
+PROBE_DEFAULTS = {
+    "remote_url": "",
+    "last_commit": ("", ""),
+    "dirty": False,
+    "unpushed": 0,
+}
+
+
+def repo_activity_ns(repo_dir: Path) -> int:
+    """repo 最近一次 git 活動（commit / checkout / add / fetch）的 mtime"""
+    repo = open_repo(repo_dir)
+    if repo is None:
+        return 0
+    try:
+        return latest_mtime_ns(repo.state_files())
+    except (GitReaderError, OSError):
+        return 0
+
+
+class GitCollector:
+    """並行 git 狀態收集器
+
+    同一次掃描中已探測過的 (repo, probe) 會直接沿用，
+    讓 scan_dev_skills 與 scan_dev_projects 不會重複執行相同的 git 指令。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 repo_timeout: float = DEFAULT_REPO_TIMEOUT,
+                 check_untracked: bool = True,
+                 untracked_budget: float = DEFAULT_UNTRACKED_BUDGET):
+        self.max_workers = max(1, max_workers)
+        self.repo_timeout = repo_timeout
+        # untracked 檔案走訪可關閉，並有獨立於 repo_timeout 的時間預算
+        self.check_untracked = check_untracked
+        self.untracked_budget = untracked_budget
+        self.untracked_timeouts = 0
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.wall_seconds = 0.0
+        # 探測來源統計：process 內讀取 vs fork git CLI
+        self.probe_counts = {"in_process": 0, "cli": 0}
+
+    def collect(self, repo_dirs: Iterable[Path],
+                probes: Tuple[str, ...] = PROBES) -> Dict[str, Dict[str, Any]]:
+        """並行探測多個 repo，回傳 {repo_path: result}"""
+        repo_dirs = list(dict.fromkeys(Path(d) for d in repo_dirs))
+
+        pending = []
+        for repo_dir in repo_dirs:
+            done = self.results.get(str(repo_dir), {})
+            missing = tuple(p for p in probes if p not in done.get("timings_ms", {}))
+            if missing and done.get("state") != "stale":
+                pending.append((repo_dir, missing))
+
+        if pending:
+            # 最近有動靜的 repo 先探測，dashboard 的 dirty 狀態在活躍處最快更新
+            pending.sort(key=lambda item: repo_activity_ns(item[0]), reverse=True)
+            started = time.monotonic()
+            reporter = progress.current()
+            workers = min(self.max_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="git-probe") as pool:
+                futures = [pool.submit(self._probe_repo, repo_dir, missing)
+                           for repo_dir, missing in pending]
+                for done, future in enumerate(as_completed(futures), 1):
+                    repo_dir, result = future.result()
+                    self._merge(repo_dir, result)
+                    reporter.items(done, len(pending), repo_dir)
+            self.wall_seconds += time.monotonic() - started
+
+        return {str(d): self.results.get(str(d), {"state": "ok", "timings_ms": {}})
+                for d in repo_dirs}
+
+    def invalidate(self, repo_dirs: Iterable[Path]):
+        """作廢指定 repo 的探測結果（含 stale 標記），下次 collect 會重新探測"""
+        with self.lock:
+            for repo_dir in repo_dirs:
+                self.results.pop(str(repo_dir), None)
+
+    def get(self, repo_dir: Path, probe: str) -> Any:
+        """取得單一探測結果（未探測、失敗或逾時時回傳預設值）"""
+        result = self.results.get(str(repo_dir), {})
+        return result.get(probe, PROBE_DEFAULTS[probe])
+
+    def _merge(self, repo_dir: Path, result: Dict[str, Any]):
+        with self.lock:
+            existing = self.results.setdefault(str(repo_dir), {"state": "ok", "timings_ms": {}, "elapsed_ms": 0.0})
+            existing["timings_ms"].update(result.pop("timings_ms"))
+            existing["elapsed_ms"] = round(existing["elapsed_ms"] + result.pop("elapsed_ms"), 1)
+            if result.pop("state") == "stale":
+                existing["state"] = "stale"
+            existing.update(result)
+
+    def _probe_repo(self, repo_dir: Path, probes: Tuple[str, ...]):
+        """在單一 worker 中依序執行一個 repo 的探測，共用同一個 deadline"""
+        started = time.monotonic()
+        deadline = started + self.repo_timeout
+        result: Dict[str, Any] = {"state": "ok", "timings_ms": {}}
+        repo = open_repo(repo_dir)
+
+        for probe in probes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result["state"] = "stale"
+                break
+
+            probe_started = time.monotonic()
+            try:
+                value = getattr(self, f"_probe_{probe}")(repo_dir, repo, remaining)
+            except subprocess.TimeoutExpired:
+                result["state"] = "stale"
+                break
+            elapsed = time.monotonic() - probe_started
+            GIT_PROBE_SECONDS.observe(elapsed, probe=probe)
+            result["timings_ms"][probe] = round(elapsed * 1000, 1)
+            if value is not None:
+                result[probe] = value
+
+        if result["state"] == "stale":
+            GIT_STALE.inc()
+        result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return repo_dir, result
+
+    def _count(self, source: str):
+        GIT_PROBES.inc(source=source)
+        with self.lock:
+            self.probe_counts[source] += 1
+
+    def _git(self, repo_dir: Path, args, timeout: float) -> Optional[subprocess.CompletedProcess]:
+        """執行 git 指令；TimeoutExpired 往上拋，其他錯誤回傳 None"""
+        self._count("cli")
+        try:
+            return metrics.timed_run(
+                ["git", *args],
+                cwd=repo_dir,
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise
+        except (OSError, ValueError):
+            return None
+
+    def _probe_remote_url(self, repo_dir: Path, repo: Optional[GitRepo], timeout: float) -> Optional[str]:
+        if repo is not None:
+            self._count("in_process")
+            return repo.origin_url()
+
+        result = self._git(repo_dir, ["remote", "get-url", "origin"], timeout)
+        if result and result.returncode == 0:
+            return result.stdout.strip()
+        return None
+
+    def _probe_last_commit(self, repo_dir: Path, repo: Optional[GitRepo],
+                           timeout: float) -> Optional[Tuple[str, str]]:
+        if repo is not None:
+            try:
+                value = repo.last_commit()
+                self._count("in_process")
+                return value if value[0] else None
+            except (GitReaderError, OSError, ValueError):
+                pass  # 無法解析的 pack 物件，改用 git CLI
+
+        result = self._git(repo_dir, ["log", "-1", "--format=%ci|||%s"], timeout)
+        if result and result.returncode == 0:
+            parts = result.stdout.strip().split("|||")
+            if len(parts) == 2:
+                return (parts[0], parts[1])
+        return None
+
+    def _probe_dirty(self, repo_dir: Path, repo: Optional[GitRepo], timeout: float) -> Optional[bool]:
+        started = time.monotonic()
+        checker = None
+        if repo is not None:
+            budget = min(self.untracked_budget, timeout) if self.check_untracked else None
+            try:
+                checker = DirtyChecker(repo)
+                status = checker.check(untracked_budget=budget)
+                self._count("in_process")
+                if budget is not None and not status["dirty"] and not status["untracked_checked"]:
+                    self._untracked_timeout()
+                return status["dirty"]
+            except LargeIndexError:
+                pass  # 大型 index：tracked 交給 git CLI，untracked 仍在 process 內依預算走訪
+            except (GitReaderError, OSError, ValueError, IndexError, struct.error):
+                checker = None  # split / sparse index 或需要 clean filter，全部改用 git CLI
+
+        untracked_in_process = checker is not None and self.check_untracked
+        args = ["status", "--porcelain"]
+        if not self.check_untracked or untracked_in_process:
+            args.append("--untracked-files=no")
+        result = self._git(repo_dir, args, timeout)
+        if result is None:
+            return None
+        if result.stdout.strip() or not untracked_in_process:
+            return bool(result.stdout.strip())
+
+        budget = min(self.untracked_budget, timeout - (time.monotonic() - started))
+        if budget <= 0:
+            self._untracked_timeout()
+            return False
+        try:
+            path, completed = checker.find_untracked(budget)
+        except (GitReaderError, OSError, ValueError, IndexError, struct.error):
+            result = self._git(repo_dir, ["status", "--porcelain"], timeout - (time.monotonic() - started))
+            return None if result is None else bool(result.stdout.strip())
+        self._count("in_process")
+        if not path and not completed:
+            self._untracked_timeout()
+        return bool(path)
+
+    def _untracked_timeout(self):
+        with self.lock:
+            self.untracked_timeouts += 1
+
+    def _probe_unpushed(self, repo_dir: Path, repo: Optional[GitRepo], timeout: float) -> Optional[int]:
+        if repo is not None:
+            try:
+                value = repo.ahead_count() if repo.has_remote() else 0
+                self._count("in_process")
+                return value
+            except (GitReaderError, OSError, ValueError):
+                pass  # 歷史過長或無法解析，改用 git CLI
+
+        started = time.monotonic()
+        result = self._git(repo_dir, ["remote"], timeout)
+        if result is None or not result.stdout.strip():
+            return 0  # 沒有 remote，不算 unpushed
+
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(["git", "rev-list"], timeout)
+
+        result = self._git(repo_dir, ["rev-list", "--count", "@{u}..HEAD"], remaining)
+        try:
+            return int(result.stdout.strip()) if result else 0
+        except ValueError:
+            return 0  # 沒有 upstream
+
+    def stats(self) -> Dict[str, Any]:
+        """收集統計（含最慢的 repo）"""
+        stale = [path for path, r in self.results.items() if r.get("state") == "stale"]
+        slowest = sorted(self.results.items(), key=lambda kv: kv[1].get("elapsed_ms", 0), reverse=True)[:5]
+        return {
+            "repos": len(self.results),
+            "stale": len(stale),
+            "workers": self.max_workers,
+            "repo_timeout": self.repo_timeout,
+            "seconds": round(self.wall_seconds, 3),
+            "probes": dict(self.probe_counts),
+            "untracked_timeouts": self.untracked_timeouts,
+            "slowest": [{"path": path, "elapsed_ms": r.get("elapsed_ms", 0)} for path, r in slowest],
+        }
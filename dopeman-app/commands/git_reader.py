@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Pure-Python Git Reader
+直接讀取 .git 目錄取得 remote URL、HEAD / branch、ref SHA、最後 commit 與 upstream 領先數，
+避免每次查詢都 fork 一個 git 行程；無法解析的情況拋出 GitReaderError，由呼叫端改用 git CLI
+"""
+
+import heapq
+import os
+import re
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 物件類型（pack 內的編號）
+OBJ_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+# 限制，超過就交給 git CLI
+MAX_DELTA_DEPTH = 64
+MAX_SYMREF_DEPTH = 5
+MAX_AHEAD_WALK = 2000
+
+
+class GitReaderError(Exception):
+    """無法在 process 內解析，需改用 git CLI"""
+
+
+def find_git_dir(repo_dir: Path) -> Optional[Path]:
+    """取得 repo 的 git 目錄（支援 .git 檔案形式的 worktree / submodule）"""
+    dot_git = Path(repo_dir) / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        try:
+            content = dot_git.read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+        if content.startswith("gitdir:"):
+            git_dir = Path(content[len("gitdir:"):].strip())
+            if not git_dir.is_absolute():
+                git_dir = (Path(repo_dir) / git_dir).resolve()
+            return git_dir if git_dir.is_dir() else None
+    return None
+
+
+class _PackIndex:
+    """pack .idx v2 查詢"""
+
+    def __init__(self, idx_path: Path):
+        self.idx_path = idx_path
+        self.pack_path = idx_path.with_suffix(".pack")
+        data = idx_path.read_bytes()
+        if data[:4] != b"\xfftOc" or struct.unpack(">I", data[4:8])[0] != 2:
+            raise GitReaderError(f"不支援的 pack index 版本: {idx_path}")
+
+        self.data = data
+        self.fanout = struct.unpack(">256I", data[8:8 + 1024])
+        self.count = self.fanout[255]
+        self.sha_off = 8 + 1024
+        self.offset_off = self.sha_off + 24 * self.count  # sha(20) + crc(4)
+        self.large_off = self.offset_off + 4 * self.count
+
+    def find(self, sha: bytes) -> Optional[int]:
+        """回傳物件在 pack 中的 offset"""
+        first = sha[0]
+        lo = self.fanout[first - 1] if first else 0
+        hi = self.fanout[first]
+        data = self.data
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.sha_off + 20 * mid
+            candidate = data[start:start + 20]
+            if candidate < sha:
+                lo = mid + 1
+            elif candidate > sha:
+                hi = mid
+            else:
+                pos = self.offset_off + 4 * mid
+                offset = struct.unpack(">I", data[pos:pos + 4])[0]
+                if offset & 0x80000000:
+                    pos = self.large_off + 8 * (offset & 0x7fffffff)
+                    offset = struct.unpack(">Q", data[pos:pos + 8])[0]
+                return offset
+        return None
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """套用 git delta 指令"""
+    pos = 0
+
+    def read_varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            c = delta[pos]
+            pos += 1
+            value |= (c & 0x7f) << shift
+            shift += 7
+            if not c & 0x80:
+                return value
+
+    src_size = read_varint()
+    dst_size = read_varint()
+    if src_size != len(base):
+        raise GitReaderError("delta 基底長度不符")
+
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            out += base[offset:offset + size]
+        elif op:
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise GitReaderError("無效的 delta 指令")
+
+    if len(out) != dst_size:
+        raise GitReaderError("delta 結果長度不符")
+    return bytes(out)
+
+
+def read_config(path: Path) -> Dict[str, Dict[str, str]]:
+    """解析 git config 檔，回傳 {'remote "origin"': {'url': ...}}（section 名稱轉小寫；不存在時為空）"""
+    config: Dict[str, Dict[str, str]] = {}
+    section = None
+    try:
+        lines = Path(path).read_text(encoding='utf-8', errors='replace').splitlines()
+    except OSError:
+        lines = []
+
+    for raw in lines:
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        match = re.match(r'^\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]', line)
+        if match:
+            name = match.group(1).lower()
+            if match.group(2) is not None:
+                section = f'{name} "{match.group(2)}"'
+            elif "." in name:
+                # 舊格式 [branch.main]
+                head, sub = name.split(".", 1)
+                section = f'{head} "{sub}"'
+            else:
+                section = name
+            config.setdefault(section, {})
+            continue
+        if section is None:
+            continue
+        if "=" in line:
+            key, value = line.split("=", 1)
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            config[section][key.strip().lower()] = value
+        else:
+            config[section][line.lower()] = "true"
+
+    return config
+
+
+def global_config() -> Dict[str, Dict[str, str]]:
+    """使用者層級的 git config（$XDG_CONFIG_HOME/git/config，再由 ~/.gitconfig 覆蓋）"""
+    xdg = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+    config: Dict[str, Dict[str, str]] = {}
+    for path in (Path(xdg) / "git" / "config", Path.home() / ".gitconfig"):
+        for section, values in read_config(path).items():
+            config.setdefault(section, {}).update(values)
+    return config
+
+
+class GitRepo:
+    """單一 repo 的唯讀存取"""
+
+    def __init__(self, repo_dir: Path):
+        self.repo_dir = Path(repo_dir)
+        git_dir = find_git_dir(self.repo_dir)
+        if git_dir is None:
+            raise GitReaderError(f"不是 git repo: {repo_dir}")
+        self.git_dir = git_dir
+
+        # worktree 的 refs / objects / config 位於 commondir
+        self.common_dir = git_dir
+        commondir_file = git_dir / "commondir"
+        if commondir_file.exists():
+            common = Path(commondir_file.read_text(encoding='utf-8').strip())
+            self.common_dir = common if common.is_absolute() else (git_dir / common).resolve()
+
+        self._config: Optional[Dict[str, Dict[str, str]]] = None
+        self._packed_refs: Optional[Dict[str, str]] = None
+        self._pack_indexes: Optional[List[_PackIndex]] = None
+
+    # ------------------------------------------------------------------
+    # config
+    # ------------------------------------------------------------------
+    def config(self) -> Dict[str, Dict[str, str]]:
+        """解析 config，回傳 {'remote "origin"': {'url': ...}}（section 名稱轉小寫）"""
+        if self._config is None:
+            self._config = read_config(self.common_dir / "config")
+        return self._config
+
+    def origin_url(self) -> str:
+        """origin 的 URL（沒有 origin 時回傳空字串）"""
+        return self.config().get('remote "origin"', {}).get("url", "")
+
+    def has_remote(self) -> bool:
+        return any(section.startswith('remote "') for section in self.config())
+
+    # ------------------------------------------------------------------
+    # refs
+    # ------------------------------------------------------------------
+    def packed_refs(self) -> Dict[str, str]:
+        if self._packed_refs is not None:
+            return self._packed_refs
+
+        refs = {}
+        try:
+            lines = (self.common_dir / "packed-refs").read_text(encoding='utf-8').splitlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            if not line or line[0] in "#^":
+                continue
+            parts = line.split(" ", 1)
+            if len(parts) == 2:
+                refs[parts[1].strip()] = parts[0]
+
+        self._packed_refs = refs
+        return refs
+
+    def _read_ref_file(self, ref: str) -> Optional[str]:
+        base = self.git_dir if ref == "HEAD" or not ref.startswith("refs/") else self.common_dir
+        try:
+            return (base / ref).read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+
+    def resolve_ref(self, ref: str) -> Optional[str]:
+        """ref → SHA（支援 symbolic ref 與 packed-refs）"""
+        for _ in range(MAX_SYMREF_DEPTH):
+            content = self._read_ref_file(ref)
+            if content is None:
+                return self.packed_refs().get(ref)
+            if content.startswith("ref:"):
+                ref = content[4:].strip()
+                continue
+            return content
+        raise GitReaderError(f"symbolic ref 層數過多: {ref}")
+
+    def head(self) -> Tuple[Optional[str], Optional[str]]:
+        """回傳 (HEAD 指向的 ref，detached 時為 None, HEAD SHA)"""
+        content = self._read_ref_file("HEAD")
+        if content is None:
+            raise GitReaderError("缺少 HEAD")
+        if content.startswith("ref:"):
+            ref = content[4:].strip()
+            return ref, self.resolve_ref(ref)
+        return None, content
+
+    def branch(self) -> Optional[str]:
+        ref, _ = self.head()
+        if ref and ref.startswith("refs/heads/"):
+            return ref[len("refs/heads/"):]
+        return None
+
+    def head_sha(self) -> Optional[str]:
+        return self.head()[1]
+
+    def upstream_ref(self) -> Optional[str]:
+        """目前分支的 tracking ref（如 refs/remotes/origin/main）"""
+        branch = self.branch()
+        if not branch:
+            return None
+        branch_config = self.config().get(f'branch "{branch}"', {})
+        remote = branch_config.get("remote")
+        merge = branch_config.get("merge")
+        if not remote or not merge:
+            return None
+        if remote == ".":
+            return merge
+        if merge.startswith("refs/heads/"):
+            merge = merge[len("refs/heads/"):]
+        return f"refs/remotes/{remote}/{merge}"
+
+    def state_files(self) -> List[Path]:
+        """commit / checkout / add / fetch / 設定變更時會更新的檔案與目錄（供指紋使用）
+
+        loose ref 更新是寫入 refs/heads/<branch>，不會改動 refs 目錄的 mtime，
+        因此額外列入目前分支與 upstream 的 ref 檔及 logs/HEAD。
+        """
+        files = [
+            self.git_dir / "HEAD",
+            self.git_dir / "index",
+            self.git_dir / "logs" / "HEAD",
+            self.common_dir / "packed-refs",
+            self.common_dir / "config",
+            self.common_dir / "FETCH_HEAD",
+            self.common_dir / "refs",
+            self.common_dir / "refs" / "heads",
+        ]
+        content = self._read_ref_file("HEAD") or ""
+        if content.startswith("ref:"):
+            files.append(self.common_dir / content[4:].strip())
+        upstream = self.upstream_ref()
+        if upstream:
+            files.append(self.common_dir / upstream)
+        return files
+
+    # ------------------------------------------------------------------
+    # objects
+    # ------------------------------------------------------------------
+    def _packs(self) -> List[_PackIndex]:
+        if self._pack_indexes is None:
+            pack_dir = self.common_dir / "objects" / "pack"
+            try:
+                self._pack_indexes = [_PackIndex(p) for p in sorted(pack_dir.glob("*.idx"))]
+            except OSError:
+                self._pack_indexes = []
+        return self._pack_indexes
+
+    def read_object(self, sha: str) -> Tuple[str, bytes]:
+        """讀取物件，回傳 (type, data)"""
+        loose = self.common_dir / "objects" / sha[:2] / sha[2:]
+        try:
+            raw = zlib.decompress(loose.read_bytes())
+        except FileNotFoundError:
+            return self._read_packed(bytes.fromhex(sha), 0)
+        except (OSError, zlib.error) as e:
+            raise GitReaderError(f"無法讀取物件 {sha}: {e}")
+
+        header, _, data = raw.partition(b"\0")
+        obj_type = header.split(b" ", 1)[0].decode()
+        return obj_type, data
+
+    def _read_packed(self, sha: bytes, depth: int) -> Tuple[str, bytes]:
+        for index in self._packs():
+            offset = index.find(sha)
+            if offset is not None:
+                return self._read_pack_entry(index, offset, depth)
+        raise GitReaderError(f"找不到物件 {sha.hex()}")
+
+    def _read_pack_entry(self, index: _PackIndex, offset: int, depth: int) -> Tuple[str, bytes]:
+        if depth > MAX_DELTA_DEPTH:
+            raise GitReaderError("delta chain 過深")
+
+        with open(index.pack_path, "rb") as f:
+            f.seek(offset)
+            c = f.read(1)[0]
+            obj_type = (c >> 4) & 7
+            size = c & 0x0f
+            shift = 4
+            while c & 0x80:
+                c = f.read(1)[0]
+                size |= (c & 0x7f) << shift
+                shift += 7
+
+            base_offset = base_sha = None
+            if obj_type == OBJ_OFS_DELTA:
+                c = f.read(1)[0]
+                rel = c & 0x7f
+                while c & 0x80:
+                    c = f.read(1)[0]
+                    rel = ((rel + 1) << 7) | (c & 0x7f)
+                base_offset = offset - rel
+            elif obj_type == OBJ_REF_DELTA:
+                base_sha = f.read(20)
+
+            decompressor = zlib.decompressobj()
+            data = b""
+            while not decompressor.eof:
+                chunk = f.read(max(4096, size))
+                if not chunk:
+                    break
+                data += decompressor.decompress(chunk)
+
+        if obj_type in OBJ_TYPES:
+            return OBJ_TYPES[obj_type], data
+        if obj_type == OBJ_OFS_DELTA:
+            base_type, base = self._read_pack_entry(index, base_offset, depth + 1)
+            return base_type, _apply_delta(base, data)
+        if obj_type == OBJ_REF_DELTA:
+            base_type, base = self._read_packed(base_sha, depth + 1)
+            return base_type, _apply_delta(base, data)
+        raise GitReaderError(f"不支援的 pack 物件類型: {obj_type}")
+
+    def read_commit(self, sha: str) -> Dict[str, object]:
+        """解析 commit：tree、parents、committer 時間（含時區）、subject"""
+        obj_type, data = self.read_object(sha)
+        if obj_type != "commit":
+            raise GitReaderError(f"{sha} 不是 commit")
+
+        header, _, message = data.partition(b"\n\n")
+        tree = ""
+        parents = []
+        committer_time = 0
+        tz_offset = "+0000"
+        for line in header.split(b"\n"):
+            if line.startswith(b"tree "):
+                tree = line[5:].decode()
+            elif line.startswith(b"parent "):
+                parents.append(line[7:].decode())
+            elif line.startswith(b"committer "):
+                parts = line.rsplit(b" ", 2)
+                committer_time = int(parts[1])
+                tz_offset = parts[2].decode()
+
+        # %s：第一段落，多行以空白連接
+        paragraph = message.decode('utf-8', errors='replace').strip().split("\n\n", 1)[0]
+        subject = " ".join(line.strip() for line in paragraph.splitlines())
+
+        return {
+            "tree": tree,
+            "parents": parents,
+            "time": committer_time,
+            "tz": tz_offset,
+            "subject": subject,
+        }
+
+    # ------------------------------------------------------------------
+    # 高階查詢
+    # ------------------------------------------------------------------
+    def last_commit(self) -> Tuple[str, str]:
+        """HEAD commit 的 (日期, subject)，日期格式同 git log --format=%ci"""
+        sha = self.head_sha()
+        if not sha:
+            return "", ""  # 尚無任何 commit
+        commit = self.read_commit(sha)
+        return format_commit_date(commit["time"], commit["tz"]), commit["subject"]
+
+    def ahead_count(self) -> int:
+        """HEAD 領先 upstream 的 commit 數（等同 git rev-list --count @{u}..HEAD）"""
+        upstream = self.upstream_ref()
+        if not upstream:
+            return 0  # 沒有 upstream
+        upstream_sha = self.resolve_ref(upstream)
+        head_sha = self.head_sha()
+        if not upstream_sha or not head_sha:
+            return 0
+        if upstream_sha == head_sha:
+            return 0
+        return self._count_exclusive(head_sha, upstream_sha)
+
+    def _count_exclusive(self, tip: str, exclude: str) -> int:
+        """依 commit 時間由新到舊同時走訪兩側，計算只可由 tip 到達的 commit 數"""
+        TIP, EXCLUDE = 1, 2
+        flags: Dict[str, int] = {tip: TIP, exclude: EXCLUDE}
+        times: Dict[str, int] = {}
+        queue: List[Tuple[int, str]] = []
+        processed = set()
+
+        def push(sha: str):
+            if sha not in times:
+                times[sha] = self.read_commit(sha)["time"]
+            heapq.heappush(queue, (-times[sha], sha))
+
+        push(tip)
+        push(exclude)
+
+        count = 0
+        walked = 0
+        while queue:
+            # 佇列中全部都是 upstream 可到達的 commit 時即可停止
+            if all(flags[sha] & EXCLUDE for _, sha in queue):
+                break
+
+            _, sha = heapq.heappop(queue)
+            if sha in processed:
+                continue
+            processed.add(sha)
+
+            walked += 1
+            if walked > MAX_AHEAD_WALK:
+                raise GitReaderError("歷史過長，改用 git CLI")
+
+            flag = flags[sha]
+            if flag == TIP:
+                count += 1
+
+            for parent in self.read_commit(sha)["parents"]:
+                if flags.get(parent, 0) | flag != flags.get(parent, 0):
+                    flags[parent] = flags.get(parent, 0) | flag
+                    push(parent)
+
+        return count
+
+
+def format_commit_date(timestamp: int, tz_offset: str) -> str:
+    """轉成 %ci 格式：2026-01-02 03:04:05 +0800"""
+    sign = -1 if tz_offset.startswith("-") else 1
+    hours, minutes = int(tz_offset[1:3]), int(tz_offset[3:5])
+    tz = timezone(sign * timedelta(hours=hours, minutes=minutes))
+    return datetime.fromtimestamp(timestamp, tz).strftime("%Y-%m-%d %H:%M:%S ") + tz_offset
+
+
+def open_repo(repo_dir: Path) -> Optional[GitRepo]:
+    """開啟 repo，不是 git repo 時回傳 None"""
+    try:
+        return GitRepo(repo_dir)
+    except (GitReaderError, OSError):
+        return None
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - In-Process Dirty Detection
+直接解析 .git/index（v2 / v3 / v4），以 stat 資料比對工作目錄，找到第一個變更就回傳；
+staged 變更以 cache-tree 或 HEAD tree 比對，untracked 檔案則是另外計時、可關閉的走訪。
+無法確定的情況（split / sparse index、需要 clean filter）拋出 GitReaderError，由呼叫端改用 git CLI
+"""
+
+import hashlib
+import os
+import re
+import stat
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from git_reader import GitReaderError, GitRepo, global_config
+from scan_walker import ScanWalker
+
+# 預設 untracked 走訪時間預算（秒）
+DEFAULT_UNTRACKED_BUDGET = 2.0
+
+# 超過此 entry 數的 index 只在 process 內比對前段（找到變更即提早結束），
+# tracked 的完整比對交給 git CLI（LargeIndexError）：乾淨 repo 約 1~2k 檔案以上，逐檔 lstat 的 Python 迴圈就比 fork git 慢；
+# untracked 仍可用 find_untracked 在 process 內以時間預算走訪
+LARGE_INDEX_ENTRIES = 1000
+
+# index 格式
+INDEX_SIGNATURE = b"DIRC"
+SUPPORTED_VERSIONS = (2, 3, 4)
+# split index / sparse index：entries 不完整，交給 git CLI
+UNSUPPORTED_EXTENSIONS = {b"link", b"sdir"}
+
+# ctime(2) mtime(2) dev ino mode uid gid size sha flags = 62 bytes
+_ENTRY = struct.Struct(">10I20sH")
+
+FLAG_ASSUME_VALID = 0x8000
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE_MASK = 0x3000
+FLAG_NAME_MASK = 0x0FFF
+EXT_SKIP_WORKTREE = 0x4000
+EXT_INTENT_TO_ADD = 0x2000
+
+MODE_TYPE_MASK = 0o170000
+MODE_REGULAR = 0o100000
+MODE_SYMLINK = 0o120000
+MODE_GITLINK = 0o160000
+
+
+class IndexEntry(NamedTuple):
+    path: bytes
+    ctime_s: int
+    ctime_ns: int
+    mtime_s: int
+    mtime_ns: int
+    ino: int
+    mode: int
+    uid: int
+    gid: int
+    size: int
+    sha: bytes
+    flags: int
+    ext_flags: int
+
+
+class LargeIndexError(GitReaderError):
+    """index 過大，tracked 檔案的完整比對改用 git CLI（untracked 仍可由 find_untracked 檢查）"""
+
+
+class GitIndex:
+    """.git/index 讀取器；entries() 走完後 extensions 才會填入"""
+
+    def __init__(self, index_path: Path):
+        self.index_path = Path(index_path)
+        with open(self.index_path, "rb") as f:
+            self.data = f.read()
+            self.stat = os.fstat(f.fileno())
+
+        if len(self.data) < 12 + 20 or self.data[:4] != INDEX_SIGNATURE:
+            raise GitReaderError(f"無效的 index: {index_path}")
+        self.version, self.count = struct.unpack(">II", self.data[4:12])
+        if self.version not in SUPPORTED_VERSIONS:
+            raise GitReaderError(f"不支援的 index 版本: {self.version}")
+        self.extensions: Dict[bytes, bytes] = {}
+
+    def entries(self) -> Iterator[IndexEntry]:
+        """依序產生 entries（可中途停止）"""
+        data = self.data
+        offset = 12
+        prev_path = b""
+        v4 = self.version == 4
+
+        for _ in range(self.count):
+            start = offset
+            fields = _ENTRY.unpack_from(data, offset)
+            flags = fields[11]
+            offset += _ENTRY.size
+
+            ext_flags = 0
+            if flags & FLAG_EXTENDED:
+                if self.version < 3:
+                    raise GitReaderError("v2 index 不應有 extended flag")
+                ext_flags = struct.unpack_from(">H", data, offset)[0]
+                offset += 2
+
+            if v4:
+                # 前綴壓縮：先移除上一個路徑尾端 N bytes，再接上本次的字尾
+                strip, offset = _read_offset_varint(data, offset)
+                end = data.index(b"\0", offset)
+                path = prev_path[:len(prev_path) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                name_len = flags & FLAG_NAME_MASK
+                if name_len == FLAG_NAME_MASK:
+                    end = data.index(b"\0", offset)
+                else:
+                    end = offset + name_len
+                path = data[offset:end]
+                # entry 長度補 NUL 到 8 的倍數（至少一個 NUL）
+                offset = start + ((end - start + 8) & ~7)
+
+            prev_path = path
+            yield IndexEntry(path, fields[0], fields[1], fields[2], fields[3], fields[5],
+                             fields[6], fields[7], fields[8], fields[9], fields[10],
+                             flags, ext_flags)
+
+        self._read_extensions(offset)
+
+    def _read_extensions(self, offset: int):
+        data = self.data
+        end = len(data) - 20  # 結尾是 SHA-1 checksum
+        while offset + 8 <= end:
+            signature = data[offset:offset + 4]
+            size = struct.unpack_from(">I", data, offset + 4)[0]
+            self.extensions[signature] = data[offset + 8:offset + 8 + size]
+            offset += 8 + size
+
+    def cache_tree_root(self) -> Optional[str]:
+        """TREE extension 中根目錄的 tree SHA（已失效時回傳 None）"""
+        tree = self.extensions.get(b"TREE")
+        if not tree:
+            return None
+        nul = tree.index(b"\0")
+        if tree[:nul] != b"":
+            return None
+        header_end = tree.index(b"\n", nul)
+        entry_count = int(tree[nul + 1:header_end].split(b" ")[0])
+        if entry_count < 0:
+            return None
+        return tree[header_end + 1:header_end + 21].hex()
+
+
+def _read_offset_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """index v4 / OFS_DELTA 使用的 varint"""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def _blob_sha(content: bytes) -> bytes:
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).digest()
+
+
+class GitIgnore:
+    """.gitignore 規則（core.excludesFile、info/exclude、各層 .gitignore），供 ScanWalker 的 ignore 使用"""
+
+    def __init__(self, repo: GitRepo):
+        self.repo_dir = repo.repo_dir
+        self._rules: Dict[str, List[Tuple[str, bool, bool, bool, "re.Pattern"]]] = {}
+        self._layers: Dict[str, list] = {}
+
+        base_rules = []
+        for source in (self.excludes_file(repo), repo.common_dir / "info" / "exclude"):
+            base_rules.extend(self._load(source, ""))
+        self._base = base_rules
+
+    @staticmethod
+    def excludes_file(repo: GitRepo) -> Path:
+        """全域 excludes：repo config 的 core.excludesFile，其次使用者 config 的，
+        都未設定時為 $XDG_CONFIG_HOME/git/ignore（與 git 相同）"""
+        excludes = (repo.config().get("core", {}).get("excludesfile")
+                    or global_config().get("core", {}).get("excludesfile"))
+        if excludes:
+            path = Path(os.path.expanduser(excludes))
+            return path if path.is_absolute() else repo.repo_dir / path
+        xdg = os.environ.get("XDG_CONFIG_HOME") or str(Path.home() / ".config")
+        return Path(xdg) / "git" / "ignore"
+
+    @staticmethod
+    def _load(path: Path, base: str):
+        try:
+            lines = path.read_text(encoding='utf-8', errors='replace').splitlines()
+        except OSError:
+            return []
+
+        rules = []
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            rules.append((base, negate, dir_only, anchored, _translate(line)))
+        return rules
+
+    def _dir_rules(self, rel_dir: str):
+        rules = self._rules.get(rel_dir)
+        if rules is None:
+            rules = self._load(self.repo_dir / rel_dir / ".gitignore", rel_dir)
+            self._rules[rel_dir] = rules
+        return rules
+
+    def __call__(self, rel_dir: str, name: str, is_dir: bool) -> bool:
+        """是否被忽略（後載入、越深層的規則優先）"""
+        layers = self._layers.get(rel_dir)
+        if layers is None:
+            layers = [self._base, self._dir_rules("")]
+            if rel_dir:
+                parts = rel_dir.split("/")
+                for i in range(1, len(parts) + 1):
+                    layers.append(self._dir_rules("/".join(parts[:i])))
+            layers = [rules for rules in layers if rules]
+            self._layers[rel_dir] = layers
+        if not layers:
+            return False
+
+        path = f"{rel_dir}/{name}" if rel_dir else name
+
+        ignored = False
+        for rules in layers:
+            for base, negate, dir_only, anchored, regex in rules:
+                if dir_only and not is_dir:
+                    continue
+                target = path[len(base) + 1:] if base else path
+                if regex.match(target if anchored else name):
+                    ignored = not negate
+        return ignored
+
+
+def _translate(pattern: str) -> "re.Pattern":
+    """gitignore glob 轉 regex（支援 * ? [...] 與 **）"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            close = pattern.find("]", i + 2)
+            if close == -1:
+                out.append(re.escape("["))
+                i += 1
+            else:
+                body = pattern[i + 1:close]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = close + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+class DirtyChecker:
+    """單一 repo 的 dirty 判斷
+
+    用法：
+        status = DirtyChecker(repo).check(untracked_budget=2.0)
+        status["dirty"], status["reason"]
+    """
+
+    def __init__(self, repo: GitRepo):
+        self.repo = repo
+        core = repo.config().get("core", {})
+        self.filemode = core.get("filemode", "true").lower() != "false"
+        self.trust_ctime = core.get("trustctime", "true").lower() != "false"
+        # 有 clean filter / 換行轉換時，內容 hash 不等於 blob SHA
+        self.has_filters = (core.get("autocrlf", "false").lower() != "false"
+                            or any(s.startswith('filter "') for s in repo.config())
+                            or (repo.repo_dir / ".gitattributes").exists())
+        self.index: Optional[GitIndex] = None
+        # 以 index 中的原始 bytes 路徑為 key
+        self.tracked: Dict[bytes, IndexEntry] = {}
+
+    def check(self, untracked_budget: Optional[float] = DEFAULT_UNTRACKED_BUDGET) -> Dict[str, object]:
+        """回傳 {"dirty", "reason", "path", "untracked_checked"}
+
+        untracked_budget 為 None 時不檢查 untracked 檔案；
+        超過預算時 untracked_checked 為 False（僅以 tracked 結果判斷）。
+        """
+        result = {"dirty": False, "reason": "", "path": "", "untracked_checked": False}
+
+        index_path = self.repo.git_dir / "index"
+        if index_path.exists():
+            self.index = GitIndex(index_path)
+            found = self._check_worktree()
+            if not found:
+                found = self._check_staged()
+        else:
+            # 尚未 add 過任何檔案：只有 HEAD 有內容時才是 dirty（全部刪除）
+            found = ("staged", "") if self.repo.head_sha() else None
+
+        if found:
+            result.update(dirty=True, reason=found[0], path=found[1])
+            return result
+
+        if untracked_budget is not None:
+            path, completed = self._find_untracked(time.monotonic() + untracked_budget)
+            result["untracked_checked"] = completed or bool(path)
+            if path:
+                result.update(dirty=True, reason="untracked", path=path)
+
+        return result
+
+    # ------------------------------------------------------------------
+    # tracked：index vs 工作目錄
+    # ------------------------------------------------------------------
+    def _check_worktree(self) -> Optional[Tuple[str, str]]:
+        index = self.index
+        # mtime 不早於 index 本身的 entry 可能是 racy clean，要比對內容
+        index_mtime = (index.stat.st_mtime_ns // 1_000_000_000, index.stat.st_mtime_ns % 1_000_000_000)
+        index_mtime_ns = index.stat.st_mtime_ns
+        repo_root = os.fsencode(self.repo.repo_dir) + b"/"
+        tracked = self.tracked
+        lstat = os.lstat
+        # 快速路徑比對 mode 的檔案類型與（core.filemode 時）執行位元
+        mode_mask = MODE_TYPE_MASK | (0o100 if self.filemode else 0)
+        check_ctime = self.trust_ctime
+        skip_flags = FLAG_ASSUME_VALID | FLAG_STAGE_MASK
+        limit = LARGE_INDEX_ENTRIES if index.count > LARGE_INDEX_ENTRIES else -1
+
+        for entry in index.entries():
+            if limit == 0:
+                raise LargeIndexError(f"index 有 {index.count} 個 entry，完整比對改用 git CLI")
+            limit -= 1
+            tracked[entry.path] = entry
+
+            if entry.flags & skip_flags or entry.ext_flags:
+                if entry.flags & FLAG_STAGE_MASK:
+                    return "conflict", os.fsdecode(entry.path)
+                if entry.ext_flags & EXT_INTENT_TO_ADD:
+                    return "staged", os.fsdecode(entry.path)
+                if entry.flags & FLAG_ASSUME_VALID or entry.ext_flags & EXT_SKIP_WORKTREE:
+                    continue
+
+            full_path = repo_root + entry.path
+
+            # 快速路徑：stat 完全相同且不是 racy entry
+            if entry.mtime_ns and entry.ctime_ns and entry.size:
+                try:
+                    st = lstat(full_path)
+                except OSError:
+                    st = None
+                if (st is not None
+                        and st.st_mtime_ns == entry.mtime_s * 1_000_000_000 + entry.mtime_ns
+                        and (not check_ctime or st.st_ctime_ns == entry.ctime_s * 1_000_000_000 + entry.ctime_ns)
+                        and st.st_size == entry.size
+                        and (st.st_ino & 0xFFFFFFFF) == entry.ino
+                        and (st.st_mode & mode_mask) == (entry.mode & mode_mask)
+                        and st.st_mtime_ns < index_mtime_ns):
+                    continue
+
+            if self._entry_changed(entry, full_path, index_mtime):
+                return "modified", os.fsdecode(entry.path)
+
+        return None
+
+    def _entry_changed(self, entry: IndexEntry, full_path: bytes, index_mtime: Tuple[int, int]) -> bool:
+        mode_type = entry.mode & MODE_TYPE_MASK
+        try:
+            st = os.lstat(full_path)
+        except FileNotFoundError:
+            return mode_type != MODE_GITLINK
+        except NotADirectoryError:
+            return True
+
+        if mode_type == MODE_GITLINK:
+            return False  # submodule 內容不在此判斷
+        if mode_type == MODE_SYMLINK:
+            if not stat.S_ISLNK(st.st_mode):
+                return True
+        elif not stat.S_ISREG(st.st_mode):
+            return True
+        elif self.filemode and bool(st.st_mode & 0o100) != bool(entry.mode & 0o100):
+            return True
+
+        # 索引中 size 為 0 可能是 racy smudge，不能直接判定
+        if entry.size and (st.st_size & 0xFFFFFFFF) != entry.size:
+            return True
+
+        mtime = (st.st_mtime_ns // 1_000_000_000, st.st_mtime_ns % 1_000_000_000)
+        ctime = (st.st_ctime_ns // 1_000_000_000, st.st_ctime_ns % 1_000_000_000)
+        stat_matches = (
+            _same_time(mtime, entry.mtime_s, entry.mtime_ns)
+            and (not self.trust_ctime or _same_time(ctime, entry.ctime_s, entry.ctime_ns))
+            and (st.st_ino & 0xFFFFFFFF) == entry.ino
+            and (st.st_size & 0xFFFFFFFF) == entry.size
+        )
+        racy = (entry.mtime_s, entry.mtime_ns) >= index_mtime
+        if stat_matches and not racy:
+            return False
+
+        # stat 不符或 racy：比對內容
+        if mode_type == MODE_SYMLINK:
+            content = os.fsencode(os.readlink(full_path))
+        else:
+            with open(full_path, "rb") as f:
+                content = f.read()
+        if _blob_sha(content) == entry.sha:
+            return False
+        if self.has_filters:
+            raise GitReaderError("需要 clean filter 才能比對內容，改用 git CLI")
+        return True
+
+    # ------------------------------------------------------------------
+    # staged：index vs HEAD
+    # ------------------------------------------------------------------
+    def _check_staged(self) -> Optional[Tuple[str, str]]:
+        index = self.index
+        if UNSUPPORTED_EXTENSIONS & set(index.extensions):
+            raise GitReaderError("split / sparse index，改用 git CLI")
+
+        head_sha = self.repo.head_sha()
+        if not head_sha:
+            return ("staged", os.fsdecode(next(iter(self.tracked)))) if self.tracked else None
+
+        head_tree = self.repo.read_commit(head_sha)["tree"]
+        if index.cache_tree_root() == head_tree:
+            return None
+
+        # cache-tree 已失效：展開 HEAD tree 逐一比對
+        seen = 0
+        for path, mode, sha in self._walk_tree(head_tree, b""):
+            entry = self.tracked.get(path)
+            if entry is None or entry.sha != sha or _normalize_mode(entry.mode) != mode:
+                return "staged", os.fsdecode(path)
+            seen += 1
+        if seen != len(self.tracked):
+            return "staged", ""  # index 有 HEAD 沒有的新檔案
+        return None
+
+    def _walk_tree(self, tree_sha: str, prefix: bytes) -> Iterator[Tuple[bytes, int, bytes]]:
+        obj_type, data = self.repo.read_object(tree_sha)
+        if obj_type != "tree":
+            raise GitReaderError(f"{tree_sha} 不是 tree")
+
+        offset = 0
+        while offset < len(data):
+            space = data.index(b" ", offset)
+            nul = data.index(b"\0", space)
+            mode = int(data[offset:space], 8)
+            sha = data[nul + 1:nul + 21]
+            path = prefix + data[space + 1:nul]
+            offset = nul + 21
+
+            if mode & MODE_TYPE_MASK == 0o040000:
+                yield from self._walk_tree(sha.hex(), path + b"/")
+            else:
+                yield path, mode, sha
+
+    # ------------------------------------------------------------------
+    # untracked：以 ScanWalker 走訪，只依 gitignore 剪枝（與 git status 相同）
+    # ------------------------------------------------------------------
+    def find_untracked(self, budget: float) -> Tuple[str, bool]:
+        """只檢查 untracked 檔案（tracked 已由 git CLI 判斷時使用），回傳 (第一個 untracked 檔案, 是否走訪完成)"""
+        index_path = self.repo.git_dir / "index"
+        if self.index is None and index_path.exists():
+            self.index = GitIndex(index_path)
+        if self.index is not None:
+            for entry in self.index.entries():
+                self.tracked[entry.path] = entry
+        return self._find_untracked(time.monotonic() + budget)
+
+    def _find_untracked(self, deadline: float) -> Tuple[str, bool]:
+        """回傳 (第一個 untracked 檔案, 是否走訪完成)"""
+        root = str(self.repo.repo_dir)
+        tracked = self.tracked
+        gitlinks = {os.fsdecode(p) for p, e in tracked.items() if e.mode & MODE_TYPE_MASK == MODE_GITLINK}
+        gitignore = GitIgnore(self.repo)
+        found: List[str] = []
+
+        # ignore hook 會看到每個項目：目錄套用 gitignore 剪枝，檔案順便比對是否 tracked
+        def visit(rel_dir: str, name: str, is_dir: bool) -> bool:
+            path = f"{rel_dir}/{name}" if rel_dir else name
+            if is_dir:
+                return path in gitlinks or gitignore(rel_dir, name, True)
+            if os.fsencode(path) in tracked or path == ".git":
+                return False
+            if not gitignore(rel_dir, name, False):
+                found.append(path)
+                walker.stop()
+            return True
+
+        # 不套用掃描用的 DEFAULT_PRUNE_DIRS：未被 gitignore 的 node_modules / vendor 內的檔案 git 也會列出
+        walker = ScanWalker([self.repo.repo_dir], prune_dirs=set(), ignore=visit)
+
+        def on_git_dir(path: Path):
+            # 非 submodule 的巢狀 repo，git status 會列為 untracked 目錄
+            rel = os.path.relpath(path.parent, root).replace(os.sep, "/")
+            if rel != "." and rel not in gitlinks:
+                found.append(rel + "/")
+                walker.stop()
+
+        walker.subscribe(".git", on_git_dir)
+        walker.walk(deadline=deadline)
+
+        return (found[0] if found else ""), not walker.timed_out
+
+
+def _same_time(actual: Tuple[int, int], seconds: int, nanos: int) -> bool:
+    # 沒有記錄奈秒的 index 只比對秒
+    if nanos == 0:
+        return actual[0] == seconds
+    return actual == (seconds, nanos)
+
+
+def _normalize_mode(mode: int) -> int:
+    if mode & MODE_TYPE_MASK == MODE_REGULAR:
+        return 0o100755 if mode & 0o100 else 0o100644
+    return mode
+
+
+def worktree_status(repo: GitRepo,
+                    untracked_budget: Optional[float] = DEFAULT_UNTRACKED_BUDGET) -> Dict[str, object]:
+    """便捷函式：回傳 DirtyChecker(repo).check() 的結果"""
+    return DirtyChecker(repo).check(untracked_budget=untracked_budget)
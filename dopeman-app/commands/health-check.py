@@ -10,6 +10,8 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+import progress
+
 # 顏色輸出
 class Colors:
     GREEN = '\033[92m'
@@ -52,6 +54,8 @@ class HealthChecker:
             'missing_frontmatter': 0,
             'duplicate_names': 0
         }
+        # 最近一次 save_report 的內容（程式內呼叫時直接取用，不需讀檔）
+        self.report = None
 
     def check_skills_directory(self):
         """檢查全域 skills 目錄"""
@@ -332,6 +336,8 @@ class HealthChecker:
             json.dump(report, f, ensure_ascii=False, indent=2)
 
         print(f"\n💾 報告已儲存: {report_file}")
+        self.report = report
+        return report
 
     def run(self):
         """執行完整健康檢查"""
@@ -342,29 +348,38 @@ class HealthChecker:
         print(Colors.END)
 
         all_passed = True
+        reporter = progress.current()
+        reporter.plan(["directory", "symlinks", "structure", "duplicates", "load", "report"])
 
         # 1. 檢查目錄
-        if not self.check_skills_directory():
-            return False
+        with reporter.phase("directory", "檢查 Skills 目錄"):
+            if not self.check_skills_directory():
+                return False
 
         # 2. 檢查 symlinks
-        if not self.check_symlinks():
-            all_passed = False
+        with reporter.phase("symlinks", "檢查 Symlinks"):
+            if not self.check_symlinks():
+                all_passed = False
 
         # 3. 檢查結構
-        if not self.check_skill_structure():
-            all_passed = False
+        with reporter.phase("structure", "檢查 Skill 結構"):
+            if not self.check_skill_structure():
+                all_passed = False
 
         # 4. 檢查重複名稱
-        if not self.check_duplicate_names():
-            all_passed = False
+        with reporter.phase("duplicates", "檢查重複名稱"):
+            if not self.check_duplicate_names():
+                all_passed = False
 
         # 5. 模擬載入檢查
-        if not self.check_claude_code_load():
-            all_passed = False
+        with reporter.phase("load", "模擬載入檢查"):
+            if not self.check_claude_code_load():
+                all_passed = False
 
         # 6. 生成報告
-        self.generate_report()
+        with reporter.phase("report", "生成報告"):
+            self.generate_report()
+        reporter.finish()
 
         return all_passed
 
@@ -11,6 +11,8 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
+from git_reader import GitReaderError, open_repo
+
 # 顏色輸出
 class Colors:
     GREEN = '\033[0;32m'
@@ -61,6 +63,16 @@ def check_installed(item):
 
 def get_repo_version(repo_path):
     """取得倉庫版本（最新 commit hash）"""
+    # 優先直接讀取 .git，避免 fork git
+    repo = open_repo(Path(repo_path))
+    if repo is not None:
+        try:
+            sha = repo.head_sha()
+            if sha:
+                return sha[:7]
+        except (GitReaderError, OSError):
+            pass
+
     try:
         result = subprocess.run(
             ['git', '-C', str(repo_path), 'rev-parse', '--short', 'HEAD'],
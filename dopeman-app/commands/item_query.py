@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Item Query
+掃描結果（分片或舊版單一檔案）的記憶體索引：依類別分頁查詢、關鍵字搜尋、
+type / project / dirty 篩選、排序與 facet 統計，Dashboard 只需取回要顯示的那一頁。
+manifest / 結果檔變動（mtime / size / inode）時自動重新載入
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from scan_output import ScanDataSource
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# 查詢欄位 → 各類別中對應的原始欄位（依序取第一個存在的）
+FIELD_ALIASES = {
+    "name": ("name", "skill_name"),
+    "type": ("type", "skill_type"),
+    "project": ("project_name", "belongs_to_project", "project_path"),
+    "dirty": ("dirty", "is_dirty"),
+}
+
+# 可篩選並統計 facet 的欄位
+FACET_FIELDS = ("type", "project", "dirty")
+
+# 納入關鍵字搜尋的原始欄位
+SEARCH_FIELDS = (
+    "name", "skill_name", "description", "path", "skill_path", "rule_path",
+    "project_name", "project_path", "belongs_to_project", "full_command", "entry_skill",
+    "group", "summary", "remote_url",
+)
+
+
+class QueryError(ValueError):
+    """查詢參數不正確"""
+
+
+def field_value(item: Dict[str, Any], field: str) -> Any:
+    for key in FIELD_ALIASES.get(field, (field,)):
+        if key in item:
+            return item[key]
+    return None
+
+
+def facet_key(value: Any) -> Optional[str]:
+    """facet / 篩選比對用的字串（布林轉為 true / false）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class _CategoryIndex:
+    """單一類別的索引：搜尋字串、facet 倒排表、排序結果快取"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.items = items
+        self.search_text = [
+            " ".join(str(item[key]) for key in SEARCH_FIELDS if item.get(key)).lower()
+            for item in items
+        ]
+        self.facet_values: Dict[str, List[Optional[str]]] = {}
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        for field in FACET_FIELDS:
+            values = [facet_key(field_value(item, field)) for item in items]
+            postings: Dict[str, List[int]] = {}
+            for position, value in enumerate(values):
+                if value is not None:
+                    postings.setdefault(value, []).append(position)
+            if postings:
+                self.facet_values[field] = values
+                self.postings[field] = postings
+        # 可排序的欄位：查詢欄位別名與任一項目有的原始欄位
+        self.fields = set(FIELD_ALIASES).union(*(item.keys() for item in items))
+        self.orders: Dict[str, List[int]] = {}
+        self.all_facets = self.facet_counts(range(len(items)))
+        self.order("name")  # 預設排序，載入時先建立
+
+    def search(self, term: str) -> set:
+        """包含 term 的項目位置（每個詞各掃一次，比逐項目檢查所有詞快）"""
+        return {p for p, text in enumerate(self.search_text) if term in text}
+
+    def facet_counts(self, positions) -> Dict[str, Dict[str, int]]:
+        counts: Dict[str, Dict[str, int]] = {}
+        for field, values in self.facet_values.items():
+            field_counts: Dict[str, int] = {}
+            for p in positions:
+                value = values[p]
+                if value is not None:
+                    field_counts[value] = field_counts.get(value, 0) + 1
+            counts[field] = dict(sorted(field_counts.items(), key=lambda kv: (-kv[1], kv[0])))
+        return counts
+
+    def order(self, field: str, descending: bool = False) -> List[int]:
+        """依欄位排序後的位置（快取；沒有值的一律排在最後）"""
+        cache_key = ("-" if descending else "") + field
+        order = self.orders.get(cache_key)
+        if order is None:
+            present, missing = [], []
+            for position, item in enumerate(self.items):
+                value = field_value(item, field)
+                if value is None:
+                    missing.append(position)
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    present.append((f"{value:020.6f}", position))
+                else:
+                    present.append((str(value).lower(), position))
+            present.sort(key=lambda pair: pair[0], reverse=descending)
+            order = self.orders[cache_key] = [position for _, position in present] + missing
+        return order
+
+
+class ItemIndex:
+    """掃描結果的分頁查詢
+
+    用法：
+        index = ItemIndex()
+        page = index.query("agents", q="review", type="worker", offset=0, limit=50, sort="name")
+    """
+
+    def __init__(self, source: Optional[ScanDataSource] = None):
+        self.source = source or ScanDataSource()
+        self.lock = threading.Lock()
+        self.key = None
+        self.last_scan: Optional[str] = None
+        self.categories: Dict[str, _CategoryIndex] = {}
+        self.loads = 0
+
+    def _refresh(self):
+        """結果檔變動時重新建立索引"""
+        key = self.source.key()
+        with self.lock:
+            if key == self.key:
+                return
+            data = self.source.load()
+            self.categories = {
+                name: _CategoryIndex(category.get("items", []))
+                for name, category in data.get("categories", {}).items()
+            }
+            self.last_scan = data.get("last_scan")
+            self.key = key
+            self.loads += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """各類別項目數"""
+        self._refresh()
+        with self.lock:
+            return {
+                "last_scan": self.last_scan,
+                "categories": {name: len(index.items) for name, index in self.categories.items()},
+            }
+
+    def query(self, category: str, q: str = "", offset: int = 0, limit: int = DEFAULT_LIMIT,
+              sort: Optional[str] = None, facets: bool = True, **filters: Optional[str]) -> Dict[str, Any]:
+        """查詢單一類別；filters 為 FACET_FIELDS 中的欄位（值以逗號分隔表示 OR）"""
+        started = time.perf_counter()
+        self._refresh()
+        with self.lock:
+            index = self.categories.get(category)
+            last_scan = self.last_scan
+        if index is None:
+            raise KeyError(category)
+        if offset < 0 or not 0 < limit <= MAX_LIMIT:
+            raise QueryError(f"offset 需 >= 0，limit 需介於 1 與 {MAX_LIMIT}")
+        descending = bool(sort) and sort.startswith("-")
+        sort_field = sort.lstrip("-") if sort else None
+        if sort_field and sort_field not in index.fields:
+            raise QueryError(f"不支援的排序欄位: {sort_field}")
+
+        # 1. 篩選（facet 倒排表取交集）
+        matched: Optional[set] = None
+        for field, wanted in filters.items():
+            if field not in FACET_FIELDS:
+                raise QueryError(f"不支援的篩選欄位: {field}")
+            if not wanted:
+                continue
+            postings = index.postings.get(field, {})
+            positions = set()
+            for value in wanted.split(","):
+                positions.update(postings.get(value, ()))
+            matched = positions if matched is None else matched & positions
+
+        # 2. 關鍵字（所有詞都需出現）
+        for term in q.lower().split():
+            found = index.search(term)
+            matched = found if matched is None else matched & found
+
+        # 3. 排序與分頁
+        if sort_field:
+            order: Sequence[int] = index.order(sort_field, descending)
+        else:
+            order = range(len(index.items))
+        if matched is not None:
+            order = [p for p in order if p in matched]
+        total_matched = len(order)
+        page = [index.items[p] for p in order[offset:offset + limit]]
+
+        result = {
+            "category": category,
+            "last_scan": last_scan,
+            "total": len(index.items),
+            "matched": total_matched,
+            "offset": offset,
+            "limit": limit,
+            "items": page,
+        }
+
+        # 4. facet 統計（針對符合條件的項目）
+        if facets:
+            result["facets"] = index.all_facets if matched is None else index.facet_counts(matched)
+
+        result["query_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"loads": self.loads, "categories": len(self.categories)}
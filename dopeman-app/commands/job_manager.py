@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Job Manager
+長時間操作（掃描、修復、健康檢查…）的排程器：送出後立即取得 job id，依優先順序排隊，
+在有上限的執行緒池中執行，可查詢狀態、排隊位置、耗時與結果，也可取消。
+每種工作類型有各自的同時執行上限（例如同時只有一個 fix），排隊中相同的工作只保留一個
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+import progress
+
+DEFAULT_JOB_WORKERS = 4
+
+# 每種工作類型同時執行的上限（超過的排隊等待）；未列出的類型使用 DEFAULT_TYPE_LIMIT
+DEFAULT_JOB_LIMITS = {
+    "scan": 1,
+    "fix": 1,               # 修復會改寫 symlink 與備份，不可並行
+    "health-check": 2,
+    "update-data": 1,
+    "reload": 1,
+    "install-official": 1,  # 失敗時會清除目標目錄，不可並行
+    "update-official": 2,
+}
+DEFAULT_TYPE_LIMIT = 1
+
+# 每種工作類型最多排隊的數量（超過時拒絕）
+DEFAULT_QUEUE_LIMIT = 8
+
+# 優先順序（數字小的先執行）：使用者操作優先於背景更新
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+DEFAULT_PRIORITY = "normal"
+
+# 保留的已結束工作數量（超過時移除最舊的）
+DEFAULT_KEEP_FINISHED = 200
+
+ACTIVE_STATES = ("queued", "running")
+
+JOBS_ACTIVE = metrics.gauge("dopeman_jobs_in_flight", "排隊中 / 執行中的背景工作數", ("type", "state"))
+JOB_QUEUE_SECONDS = metrics.histogram("dopeman_job_queue_seconds", "背景工作排隊時間（秒）", ("type",))
+JOB_RUN_SECONDS = metrics.histogram("dopeman_job_run_seconds", "背景工作執行時間（秒）", ("type", "state"))
+JOB_SUBMISSIONS = metrics.counter("dopeman_job_submissions_total",
+                                  "背景工作送出次數（created 新建 / coalesced 合併 / deduplicated 與排隊中的相同工作合併 / "
+                                  "rejected 排隊已滿）", ("type", "outcome"))
+JOB_CANCELLATIONS = metrics.counter("dopeman_job_cancellations_total", "取消的背景工作數（依取消時的狀態）",
+                                    ("type", "state"))
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+
+class JobRejected(Exception):
+    """該類型排隊中的工作已達上限"""
+
+    def __init__(self, job_type: str, limit: int, active: List[str]):
+        super().__init__(f"{job_type} 已有 {len(active)} 個工作排隊中（上限 {limit}）")
+        self.job_type = job_type
+        self.limit = limit
+        self.active = active
+
+
+class JobManager:
+    """背景工作排程器
+
+    用法：
+        jobs = JobManager()
+        job = jobs.submit("scan", run_scan, priority="interactive")
+        jobs.wait(job["id"], timeout=5)
+        jobs.get(job["id"])
+        jobs.cancel(job["id"])
+
+    listener（subscribe）在狀態改變的執行緒中收到 (事件, 工作狀態)：
+    queued（新工作排隊）、position（排隊位置改變）、started、finished（含 cancelled）
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS,
+                 limits: Optional[Dict[str, int]] = None, keep_finished: int = DEFAULT_KEEP_FINISHED,
+                 queue_limit: int = DEFAULT_QUEUE_LIMIT):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dopeman-job")
+        self.max_workers = max_workers
+        self.limits = dict(DEFAULT_JOB_LIMITS, **(limits or {}))
+        self.queue_limit = queue_limit
+        self.keep_finished = keep_finished
+        self.lock = threading.Lock()
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.done_events: Dict[str, threading.Event] = {}
+        self.sequence = itertools.count(1)
+        # 排隊中的工作：(優先順序, 送出序號, job id) 的 heap；提高優先順序或取消後留下的舊項目在取出時略過
+        self.queue: List[Tuple[int, int, str]] = []
+        self.pending: Dict[str, Tuple[Callable, tuple, int, float]] = {}  # job id → (func, args, 序號, 送出時間)
+        self.running: Dict[str, int] = {}
+        self.cancel_events: Dict[str, threading.Event] = {}
+        self.listeners: List[Listener] = []
+
+    def subscribe(self, listener: Listener):
+        self.listeners.append(listener)
+
+    def _notify(self, events: List[Tuple[str, Dict[str, Any]]]):
+        for event, job in events:
+            for listener in list(self.listeners):
+                try:
+                    listener(event, job)
+                except Exception:
+                    pass
+
+    def submit(self, job_type: str, func: Callable[..., Dict[str, Any]], *args,
+               coalesce: bool = False, priority: str = DEFAULT_PRIORITY, key: Optional[str] = None,
+               cancellable: bool = False) -> Dict[str, Any]:
+        """送出工作，回傳工作狀態；該類型排隊已滿時拋出 JobRejected
+
+        func 回傳結果 dict；結果含 success=False 或拋出例外時，工作狀態為 failed。
+        coalesce=True 時，同類型已有排隊中或執行中的工作則直接回傳該工作（coalesced=True）；
+        有 key 時，同類型且同 key 的工作已在排隊則直接回傳該工作（deduplicated=True）。
+        兩者都會把排隊中的工作提高到這次請求的優先順序。
+        cancellable=True 時 func 另以 cancel=threading.Event 呼叫，取消時設定該事件
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"未知優先順序: {priority}（可用: {', '.join(PRIORITIES)}）")
+        with self.lock:
+            active = [job_id for job_id, job in self.jobs.items()
+                      if job["type"] == job_type and job["state"] in ACTIVE_STATES]
+            queued = [job_id for job_id in active if self.jobs[job_id]["state"] == "queued"]
+            existing, outcome = None, None
+            if coalesce and active:
+                existing, outcome = active[0], "coalesced"
+            elif key is not None:
+                existing = next((job_id for job_id in queued if self.jobs[job_id]["key"] == key), None)
+                outcome = "deduplicated"
+            if existing is not None:
+                self._raise_priority(existing, priority)
+                events = self._reposition()
+                job = dict(self.jobs[existing], **{outcome: True})
+            elif len(queued) >= self.queue_limit:
+                JOB_SUBMISSIONS.inc(type=job_type, outcome="rejected")
+                raise JobRejected(job_type, self.queue_limit, queued)
+            else:
+                # 查詢與建立在同一次持有鎖內完成，同時送出的相同請求不會各自建立工作
+                job_id = self._create(job_type, func, args, priority, key, cancellable)
+
+        if existing is not None:
+            JOB_SUBMISSIONS.inc(type=job_type, outcome=outcome)
+            self._notify(events)
+            return job
+
+        JOB_SUBMISSIONS.inc(type=job_type, outcome="created")
+        JOBS_ACTIVE.inc(type=job_type, state="queued")
+
+        self._dispatch(created=job_id)
+        return self.get(job_id)
+
+    def _create(self, job_type: str, func: Callable[..., Dict[str, Any]], args: tuple, priority: str,
+                key: Optional[str], cancellable: bool) -> str:
+        """建立排隊中的工作，回傳 job_id（呼叫時需持有 lock）"""
+        sequence = next(self.sequence)
+        job_id = f"{job_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{sequence}"
+        job = {
+            "id": job_id,
+            "type": job_type,
+            "state": "queued",
+            "priority": priority,
+            "key": key,
+            "position": None,
+            "cancellable": cancellable,
+            "cancel_requested": False,
+            "submitted_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "queue_seconds": None,
+            "run_seconds": None,
+            "result": None,
+            "error": None,
+        }
+        self.jobs[job_id] = job
+        self.done_events[job_id] = threading.Event()
+        if cancellable:
+            self.cancel_events[job_id] = threading.Event()
+        self.pending[job_id] = (func, args, sequence, time.monotonic())
+        heapq.heappush(self.queue, (PRIORITIES[priority], sequence, job_id))
+        self._evict()
+        return job_id
+
+    def _raise_priority(self, job_id: str, priority: str):
+        """排隊中的工作改用較優先的順序（保留原本的送出序號）；呼叫時需持有 lock"""
+        job = self.jobs[job_id]
+        if job["state"] != "queued" or PRIORITIES[priority] >= PRIORITIES[job["priority"]]:
+            return
+        job["priority"] = priority
+        heapq.heappush(self.queue, (PRIORITIES[priority], self.pending[job_id][2], job_id))
+
+    def _queued_order(self) -> List[str]:
+        """排隊中的工作依執行順序排列（略過過時的 heap 項目）；呼叫時需持有 lock"""
+        order = []
+        for rank, _, job_id in sorted(self.queue):
+            job = self.jobs.get(job_id)
+            if job is not None and job["state"] == "queued" and PRIORITIES[job["priority"]] == rank:
+                order.append(job_id)
+        return order
+
+    def _reposition(self, skip: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """更新排隊位置，回傳位置改變的工作的 position 事件；呼叫時需持有 lock"""
+        events = []
+        order = self._queued_order()
+        for position, job_id in enumerate(order, 1):
+            job = self.jobs[job_id]
+            if job["position"] != position:
+                job["position"] = position
+                if job_id != skip:
+                    events.append(("position", dict(job, queue_length=len(order))))
+        return events
+
+    def _dispatch(self, created: Optional[str] = None, events: Optional[List] = None):
+        """依優先順序啟動排隊中的工作，直到執行緒或該類型的同時執行上限用完"""
+        events = list(events or [])
+        starting = []
+        with self.lock:
+            skipped = []
+            while self.queue and sum(self.running.values()) < self.max_workers:
+                entry = heapq.heappop(self.queue)
+                job = self.jobs.get(entry[2])
+                if job is None or job["state"] != "queued" or PRIORITIES[job["priority"]] != entry[0]:
+                    continue  # 已取消、已被移除或已提高優先順序的舊項目
+                if self.running.get(job["type"], 0) >= self.limits.get(job["type"], DEFAULT_TYPE_LIMIT):
+                    skipped.append(entry)
+                    continue
+                job["state"] = "running"
+                job["position"] = None
+                job["started_at"] = datetime.now().isoformat()
+                self.running[job["type"]] = self.running.get(job["type"], 0) + 1
+                starting.append(job)
+            for entry in skipped:
+                heapq.heappush(self.queue, entry)
+            moved = self._reposition(skip=created)
+            if created is not None and self.jobs[created]["state"] == "queued":
+                events.append(("queued", dict(self.jobs[created], queue_length=len(self._queued_order()))))
+            events.extend(moved)
+
+            launches = []
+            for job in starting:
+                func, args, _, submitted = self.pending.pop(job["id"])
+                queue_seconds = time.monotonic() - submitted
+                job["queue_seconds"] = round(queue_seconds, 3)
+                events.append(("started", dict(job)))
+                launches.append((job["id"], job["type"], queue_seconds, func, args))
+
+        for job_id, job_type, queue_seconds, func, args in launches:
+            JOBS_ACTIVE.dec(type=job_type, state="queued")
+            JOBS_ACTIVE.inc(type=job_type, state="running")
+            JOB_QUEUE_SECONDS.observe(queue_seconds, type=job_type)
+            self.executor.submit(self._run, job_id, func, args)
+        self._notify(events)
+
+    def _run(self, job_id: str, func, args):
+        started = time.monotonic()
+        with self.lock:
+            job = self.jobs[job_id]
+            cancel = self.cancel_events.get(job_id)
+
+        try:
+            result = func(*args, cancel=cancel) if cancel is not None else func(*args)
+            state = "failed" if isinstance(result, dict) and result.get("success") is False else "succeeded"
+            error = result.get("error") if isinstance(result, dict) else None
+        except progress.TaskCancelled as e:
+            # 與其他請求共用的執行被取消時，這個工作本身並未要求取消
+            result, error = None, str(e)
+            state = "cancelled" if cancel is not None and cancel.is_set() else "failed"
+        except Exception as e:
+            result, state, error = None, "failed", str(e)
+
+        with self.lock:
+            job.update({
+                "state": state,
+                "finished_at": datetime.now().isoformat(),
+                "run_seconds": round(time.monotonic() - started, 3),
+                "result": result,
+                "error": error,
+            })
+            self.running[job["type"]] -= 1
+            self.cancel_events.pop(job_id, None)
+            done = self.done_events.pop(job_id, None)
+            finished = dict(job)
+        JOBS_ACTIVE.dec(type=job["type"], state="running")
+        JOB_RUN_SECONDS.observe(time.monotonic() - started, type=job["type"], state=state)
+        if done:
+            done.set()
+        self._dispatch(events=[("finished", finished)])
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """取消工作：排隊中的立即取消；執行中且可取消的設定取消事件（由工作自行結束）。
+        回傳工作狀態（找不到時為 None），執行中但無法取消時 cancel_requested 為 False"""
+        events = []
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["state"] == "queued":
+                job.update({
+                    "state": "cancelled",
+                    "position": None,
+                    "finished_at": datetime.now().isoformat(),
+                    "cancel_requested": True,
+                    "error": "已取消",
+                })
+                self.pending.pop(job_id, None)
+                self.cancel_events.pop(job_id, None)
+                done = self.done_events.pop(job_id, None)
+                events.append(("finished", dict(job)))
+                events.extend(self._reposition())
+                JOBS_ACTIVE.dec(type=job["type"], state="queued")
+                JOB_CANCELLATIONS.inc(type=job["type"], state="queued")
+                if done:
+                    done.set()
+            elif job["state"] == "running" and job_id in self.cancel_events and not job["cancel_requested"]:
+                job["cancel_requested"] = True
+                self.cancel_events[job_id].set()
+                JOB_CANCELLATIONS.inc(type=job["type"], state="running")
+            job = dict(job)
+        self._notify(events)
+        return job
+
+    def _evict(self):
+        """移除超過保留數量的已結束工作（呼叫時需持有 lock）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待工作結束（或逾時），回傳目前狀態"""
+        with self.lock:
+            done = self.done_events.get(job_id)
+        if done:
+            done.wait(timeout)
+        return self.get(job_id)
+
+    def queued(self) -> List[Dict[str, Any]]:
+        """排隊中的工作（依執行順序）"""
+        with self.lock:
+            return [dict(self.jobs[job_id]) for job_id in self._queued_order()]
+
+    def list(self, include_results: bool = False) -> List[Dict[str, Any]]:
+        """所有保留中的工作（預設不含結果內容）"""
+        with self.lock:
+            jobs = [dict(job) for job in self.jobs.values()]
+        if not include_results:
+            for job in jobs:
+                job.pop("result", None)
+        return jobs
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            states: Dict[str, int] = {}
+            for job in self.jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+            running = dict(self.running)
+            queue = self._queued_order()
+        return {"workers": self.max_workers, "limits": self.limits, "queue_limit": self.queue_limit,
+                "states": states, "running": {t: n for t, n in running.items() if n}, "queue": queue}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
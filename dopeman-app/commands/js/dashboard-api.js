@@ -11,13 +11,8 @@ const DashboardAPI = {
     try {
       DashboardState.setLoading(true).clearError();
 
-      const response = await fetch(DashboardConfig.API.ENDPOINTS.DATA);
-
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-
-      const data = await response.json();
+      // 分片輸出時只下載 hash 改變的分片（js/scan-data.js）
+      const data = await ScanData.load();
       DashboardState.setData(data).setLoading(false);
 
       return data;
@@ -28,6 +23,44 @@ const DashboardAPI = {
     }
   },
 
+  /**
+   * 分頁查詢單一類別（伺服器端篩選、排序與 facet，只取回要顯示的那一頁）
+   * @param {string} category - 類別（agents、commands、dev_projects…）
+   * @param {Object} params - { q, type, project, dirty, offset, limit, sort, facets }
+   * @returns {Promise<Object>} { total, matched, offset, limit, items, facets }
+   */
+  async queryItems(category, params = {}) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        query.set(key, value);
+      }
+    });
+
+    const url = `${DashboardConfig.API.ENDPOINTS.ITEMS}/${encodeURIComponent(category)}?${query}`;
+    const response = await fetch(url);
+    const result = await response.json();
+
+    if (!response.ok || !result.success) {
+      throw new Error(result.error || `HTTP error! status: ${response.status}`);
+    }
+
+    return result;
+  },
+
+  /**
+   * 各類別項目數
+   */
+  async loadItemCounts() {
+    const response = await fetch(DashboardConfig.API.ENDPOINTS.ITEMS);
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+  },
+
   /**
    * 健康檢查
    */
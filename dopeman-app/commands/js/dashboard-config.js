@@ -9,6 +9,7 @@ const DashboardConfig = {
     BASE_URL: '',
     ENDPOINTS: {
       DATA: '/control-center-real-data.json',
+      ITEMS: '/api/items',
       HEALTH_CHECK: '/api/health-check',
       INSTALL_OFFICIAL: '/api/install-official',
       UNINSTALL_OFFICIAL: '/api/uninstall-official',
@@ -12,8 +12,7 @@ let data = null;
         async function loadData() {
             try {
                 // 載入掃描資料
-                const response = await fetch('./control-center-real-data.json');
-                data = await response.json();
+                data = await ScanData.load();
                 filteredData = data;
 
                 // 載入官方目錄
@@ -0,0 +1,116 @@
+/**
+ * DopeMAN Dashboard - Scan Data Loader
+ * 讀取分片掃描結果：先取 manifest，只下載 hash 改變的分片並組回完整資料；
+ * 沒有 manifest 時（舊版單一檔案輸出）讀取 control-center-real-data.json；
+ * 即時更新的 scan_delta 以 applyDelta 依穩定鍵套用到已載入的資料
+ */
+
+const ScanData = {
+  MANIFEST_URL: './scan-data/manifest.json',
+  SHARD_BASE: './scan-data/',
+  LEGACY_URL: './control-center-real-data.json',
+  META_KEYS: ['version', 'last_scan', 'user_preferences', 'scan_stats'],
+
+  // 已下載的分片：name → { hash, value }
+  shards: {},
+
+  /**
+   * 載入掃描資料（結構與舊版單一檔案相同）
+   */
+  async load() {
+    const manifest = await this.loadManifest();
+    if (!manifest) {
+      const response = await fetch(this.LEGACY_URL, { cache: 'no-cache' });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json();
+    }
+
+    const data = { categories: {} };
+    this.META_KEYS.forEach(key => {
+      data[key] = manifest[key];
+    });
+
+    await Promise.all(Object.entries(manifest.shards).map(async ([name, entry]) => {
+      let shard = this.shards[name];
+      if (!shard || shard.hash !== entry.hash) {
+        // 以 hash 作為查詢參數，內容不同的版本使用不同 URL
+        const response = await fetch(`${this.SHARD_BASE}${entry.file}?h=${entry.hash}`);
+        if (!response.ok) {
+          throw new Error(`載入分片 ${name} 失敗: ${response.status}`);
+        }
+        shard = this.shards[name] = { hash: entry.hash, value: await response.json() };
+      }
+
+      if (entry.kind === 'category') {
+        data.categories[name] = shard.value;
+      } else {
+        data[name] = shard.value;
+      }
+    }));
+
+    // 移除已不存在的分片
+    Object.keys(this.shards).forEach(name => {
+      if (!(name in manifest.shards)) {
+        delete this.shards[name];
+      }
+    });
+
+    return data;
+  },
+
+  /**
+   * 套用 websocket-server 的 scan_delta：依 patch.keys 的欄位移除 / 取代 / 新增項目，
+   * 帶 items 的分類整個取代（分類物件換成新的，不修改已快取的分片）
+   */
+  applyDelta(data, delta) {
+    Object.entries(delta.patches || {}).forEach(([name, patch]) => {
+      if (patch.items) {
+        data.categories[name] = { count: patch.count, items: patch.items };
+        return;
+      }
+      const keyOf = item => patch.keys.map(field => String(item[field] ?? null)).join('\0');
+      const removed = new Set(patch.removed.map(keyOf));
+      // 新增與更新一起處理：已存在時就地取代（重複套用同一個 delta 結果不變）
+      const changed = new Map([...patch.updated, ...patch.added].map(item => [keyOf(item), item]));
+      const items = [];
+      ((data.categories[name] || {}).items || []).forEach(item => {
+        const key = keyOf(item);
+        if (removed.has(key)) return;
+        if (changed.has(key)) {
+          items.push(changed.get(key));
+          changed.delete(key);
+        } else {
+          items.push(item);
+        }
+      });
+      items.push(...changed.values());
+      data.categories[name] = { count: patch.count, items };
+    });
+    if (delta.layers) data.layers = delta.layers;
+    if (delta.last_scan) data.last_scan = delta.last_scan;
+  },
+
+  /**
+   * 取得 manifest（不存在時回傳 null）
+   */
+  async loadManifest() {
+    try {
+      const response = await fetch(this.MANIFEST_URL, { cache: 'no-cache' });
+      return response.ok ? await response.json() : null;
+    } catch (error) {
+      return null;
+    }
+  }
+};
+
+// 掛載到 window
+if (typeof window !== 'undefined') {
+  window.ScanData = ScanData;
+}
+
+// 導出模組
+if (typeof module !== 'undefined' && module.exports) {
+  module.exports = ScanData;
+}
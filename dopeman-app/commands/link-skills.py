@@ -12,6 +12,8 @@ import json
 from pathlib import Path
 from typing import Dict, List, Set
 
+from location_index import LocationIndex, agent_project_skill_dirs, claude_skill_dirs
+
 # 路徑配置
 HOME = Path.home()
 CLAUDE_SKILLS_DIR = HOME / ".claude" / "skills"
@@ -75,33 +77,19 @@ class SkillLinker:
         return "exclusive"
 
     def scan_skills(self):
-        """掃描所有 Skills"""
+        """掃描所有 Skills（AgentProjects 固定兩層直接列出；DEV 查詢持久化位置索引中的 .claude 目錄）"""
         skills_found = []
 
-        # 1. 掃描 AgentProjects
-        if AGENT_PROJECTS_DIR.exists():
-            for project_dir in AGENT_PROJECTS_DIR.iterdir():
-                if not project_dir.is_dir():
-                    continue
-
-                # 檢查根目錄的 SKILL.md
-                if (project_dir / "SKILL.md").exists():
-                    skills_found.append(project_dir)
-
-                # 檢查 .claude/skills/
-                skills_dir = project_dir / ".claude" / "skills"
-                if skills_dir.exists():
-                    for skill_dir in skills_dir.iterdir():
-                        if skill_dir.is_dir() and (skill_dir / "SKILL.md").exists():
-                            skills_found.append(skill_dir)
-
-        # 2. 掃描 DEV 目錄
-        if DEV_DIR.exists():
-            for project_dir in DEV_DIR.rglob(".claude/skills"):
-                for skill_dir in project_dir.iterdir():
-                    if skill_dir.is_dir() and (skill_dir / "SKILL.md").exists():
-                        skills_found.append(skill_dir)
+        # 1. AgentProjects：專案根目錄的 SKILL.md 與 {project}/.claude/skills/{skill}/SKILL.md（含 symlink）
+        skills_found.extend(agent_project_skill_dirs(AGENT_PROJECTS_DIR))
+
+        # 2. DEV 目錄：任意深度的 .claude/skills/{skill}/SKILL.md（skill 目錄可為 symlink）
+        index = LocationIndex()
+        index.update(roots=[DEV_DIR])
+        for claude_dir in index.find(".claude", under=DEV_DIR):
+            skills_found.extend(claude_skill_dirs(claude_dir))
 
+        index.close()
         return skills_found
 
     def categorize_skills(self, skills: List[Path]):
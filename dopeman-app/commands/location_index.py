@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Persistent Location Index
+locate 風格的持久化索引：記錄各 scan root 下 SKILL.md、.claude、.git 的位置。
+每次更新只 stat 已知目錄，mtime 沒變的目錄不重新列出內容，
+新增 / 刪除 / 改名的項目會讓所在目錄的 mtime 改變而被重新掃描
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from scan_walker import DEFAULT_NO_DESCEND, DEFAULT_PRUNE_DIRS, dedupe_roots
+
+# 路徑配置
+HOME = Path.home()
+CLAUDE_DIR = HOME / ".claude"
+DEV_DIR = HOME / "DEV"
+AGENT_PROJECTS_DIR = HOME / "AgentProjects"
+MEMORY_DIR = CLAUDE_DIR / "memory" / "dopeman"
+DEFAULT_INDEX_PATH = MEMORY_DIR / "location-index.sqlite"
+PREFERENCES_FILE = MEMORY_DIR / "user-preferences.json"
+
+# 索引格式變更時遞增，舊索引會整個重建
+SCHEMA_VERSION = 1
+
+# subdirs 欄位以 NUL 分隔（檔名不可能含 NUL）
+SUBDIR_SEP = "\0"
+
+# 預設 scan roots 與額外排除的目錄（系統 / 套件管理器快取，不會有開發中的 skill）
+# CLAUDE_DIR / DEV_DIR / AGENT_PROJECTS_DIR 一定會納入（可能是指向 HOME 以外的 symlink）
+DEFAULT_SCAN_ROOTS = ["~"]
+REQUIRED_ROOTS = [CLAUDE_DIR, DEV_DIR, AGENT_PROJECTS_DIR]
+DEFAULT_EXCLUDE_DIRS = {
+    "Library", ".cache", ".npm", ".pnpm-store", ".yarn", ".cargo", ".rustup", ".gradle",
+    ".m2", ".nuget", ".pyenv", ".nvm", ".docker", ".Trash", ".local",
+}
+
+# 記錄位置的名稱：名稱 → 是否為目錄
+INDEXED_NAMES = {"SKILL.md": False, ".claude": True, ".git": True}
+
+# mtime 落在更新開始前這段時間內的目錄，下次仍重新掃描（避免同一時間刻度內的變更被漏掉）
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def load_scan_config(pref_file: Path = PREFERENCES_FILE) -> Tuple[List[Path], Set[str]]:
+    """從 user-preferences.json 的 preferences.scan 讀取 (roots, 排除目錄)
+
+    所有工具共用同一份索引，roots 一律由此決定，避免彼此更新時清掉對方的目錄。
+    """
+    scan = {}
+    try:
+        prefs = json.loads(pref_file.read_text(encoding='utf-8'))
+        scan = prefs.get("preferences", {}).get("scan", {}) or {}
+    except (OSError, ValueError):
+        pass
+
+    roots = [Path(os.path.expanduser(r)) for r in scan.get("roots", DEFAULT_SCAN_ROOTS)] + REQUIRED_ROOTS
+    exclude = set(scan.get("exclude", DEFAULT_EXCLUDE_DIRS))
+    return roots, exclude
+
+
+def claude_skill_dirs(claude_dir: Path) -> List[Path]:
+    """{claude_dir}/skills/{skill}/SKILL.md 的 skill 目錄（直接列出，跟隨 symlink 的 skill 目錄）"""
+    try:
+        entries = sorted((claude_dir / "skills").iterdir())
+    except OSError:
+        return []
+    return [entry for entry in entries if entry.is_dir() and (entry / "SKILL.md").is_file()]
+
+
+def agent_project_skill_dirs(root: Path = AGENT_PROJECTS_DIR) -> List[Path]:
+    """AgentProjects 下的 skill 目錄：{project}/SKILL.md 與 {project}/.claude/skills/{skill}/SKILL.md
+
+    固定兩層，直接列出目錄而不查詢索引：索引走訪不跟隨 symlink，symlink 的專案與 skill 目錄需另外列出
+    """
+    try:
+        projects = sorted(root.iterdir())
+    except OSError:
+        return []
+    found = []
+    for project_dir in projects:
+        if not project_dir.is_dir():
+            continue
+        if (project_dir / "SKILL.md").is_file():
+            found.append(project_dir)
+        found.extend(claude_skill_dirs(project_dir / ".claude"))
+    return found
+
+
+class LocationIndex:
+    """SKILL.md / .claude / .git 位置索引
+
+    用法：
+        index = LocationIndex()
+        index.update()
+        skill_mds = index.find("SKILL.md")
+        index.close()
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_INDEX_PATH, rebuild: bool = False,
+                 pref_file: Path = PREFERENCES_FILE):
+        roots, exclude = load_scan_config(pref_file)
+        self.roots = dedupe_roots(roots)
+        self.prune_dirs = DEFAULT_PRUNE_DIRS | exclude
+        self.db_path = Path(db_path)
+        self.last_update: Dict[str, float] = {}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema(rebuild)
+
+    def _init_schema(self, rebuild: bool):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if rebuild or version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS dirs")
+            self.conn.execute("DROP TABLE IF EXISTS hits")
+
+        # dirs：已走訪的目錄、上次看到的 mtime 與其子目錄名稱
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path     TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                subdirs  TEXT NOT NULL
+            )
+        """)
+        # hits：索引中的位置（parent 為所在目錄）
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hits (
+                path   TEXT PRIMARY KEY,
+                parent TEXT NOT NULL,
+                name   TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hits_parent ON hits(parent)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hits_name ON hits(name)")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def update(self, roots: Optional[List[Path]] = None) -> Dict[str, float]:
+        """增量更新：只重新列出 mtime 有變的目錄，回傳統計；
+        roots 限定只更新這些目錄以下（例如只需要 skill 所在目錄的工具），其他部分的索引不變"""
+        started = time.monotonic()
+        scoped = roots is not None
+        roots = dedupe_roots([Path(r) for r in roots]) if scoped else self.roots
+        prefixes = tuple(str(root).rstrip(os.sep) + os.sep for root in roots)
+        racy_after = time.time_ns() - RACY_WINDOW_NS
+
+        known: Dict[str, Tuple[int, List[str]]] = {
+            path: (mtime_ns, subdirs.split(SUBDIR_SEP) if subdirs else [])
+            for path, mtime_ns, subdirs in self.conn.execute("SELECT path, mtime_ns, subdirs FROM dirs")
+        }
+        seen: Set[str] = set()
+        rescanned = 0
+
+        stack = [str(root) for root in roots]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(current)
+
+            cached = known.get(current)
+            if cached and cached[0] == mtime_ns:
+                subdirs = cached[1]
+            else:
+                subdirs = self._rescan(current, mtime_ns if mtime_ns < racy_after else -1)
+                rescanned += 1
+
+            # 子目錄清單不含剪枝，排除設定變更後不需重建索引
+            stack.extend(os.path.join(current, name) for name in subdirs if name not in self.prune_dirs)
+
+        # 已不存在或已不在 roots 內的目錄（限定 roots 時只處理其下的目錄）
+        removed = [path for path in known if path not in seen
+                   and (not scoped or path.startswith(prefixes) or path + os.sep in prefixes)]
+        self.conn.executemany("DELETE FROM dirs WHERE path = ?", ((p,) for p in removed))
+        self.conn.executemany("DELETE FROM hits WHERE parent = ?", ((p,) for p in removed))
+        self.conn.commit()
+
+        self.last_update = {
+            "roots": len(roots),
+            "dirs": len(seen),
+            "rescanned": rescanned,
+            "removed": len(removed),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        return self.last_update
+
+    def _rescan(self, current: str, mtime_ns: int) -> List[str]:
+        """重新列出單一目錄，更新其 hits 與子目錄清單"""
+        subdirs: List[str] = []
+        hits: List[Tuple[str, str, str]] = []
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            wants_dir = INDEXED_NAMES.get(name)
+            if wants_dir is not None and wants_dir == is_dir and (is_dir or entry.is_file()):
+                hits.append((entry.path, current, name))
+
+            if is_dir and name not in DEFAULT_NO_DESCEND:
+                subdirs.append(name)
+
+        subdirs.sort()
+        self.conn.execute("DELETE FROM hits WHERE parent = ?", (current,))
+        self.conn.executemany("INSERT OR REPLACE INTO hits (path, parent, name) VALUES (?, ?, ?)", hits)
+        self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns, subdirs) VALUES (?, ?, ?)",
+                          (current, mtime_ns, SUBDIR_SEP.join(subdirs)))
+        return subdirs
+
+    def find(self, name: str, under: Optional[Path] = None) -> List[Path]:
+        """查詢某名稱的所有位置（可限定在某目錄下），依路徑排序"""
+        if under is None:
+            rows = self.conn.execute("SELECT path FROM hits WHERE name = ?", (name,))
+        else:
+            prefix = str(under).rstrip(os.sep) + os.sep
+            rows = self.conn.execute(
+                "SELECT path FROM hits WHERE name = ? AND substr(path, 1, ?) = ?",
+                (name, len(prefix), prefix)
+            )
+        return sorted(Path(row[0]) for row in rows)
+
+    def skill_dirs(self, under: Optional[Path] = None) -> List[Path]:
+        """含有 SKILL.md 的目錄"""
+        return [path.parent for path in self.find("SKILL.md", under=under)]
+
+    def close(self):
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Metrics
+process 內的輕量指標（counter / gauge / histogram），以 Prometheus 文字格式輸出給 /metrics，
+不需要 prometheus_client 或外部服務。各模組在自己的檔案頂層宣告所需指標（同名重複宣告會取得同一個物件）
+"""
+
+import bisect
+import math
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 1 ms ~ 2 分鐘：涵蓋 HTTP 請求、掃描階段與子程序
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[str, ...]
+GaugeCallback = Callable[[], Union[float, Dict[LabelKey, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}，收到 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def lines(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """只增不減的計數"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0.0)
+
+    def lines(self) -> List[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return super().lines() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """可增可減的目前值；提供 callback 時在輸出當下計算（例如連線數）"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 callback: Optional[GaugeCallback] = None):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[LabelKey, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self._key(labels), 0.0)
+
+    def lines(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                result = self.callback()
+            except Exception:
+                result = {}
+            values = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        else:
+            with self.lock:
+                values = sorted(self.values.items())
+        return super().lines() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """分布（桶的累計數、總和、次數）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 標籤 → [各桶次數（非累計，最後一個為 +Inf）, 總和, 次數]
+        self.values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """量測區塊執行時間（發生例外也記錄）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self.lock:
+            entry = self.values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def lines(self) -> List[str]:
+        with self.lock:
+            values = sorted((key, (list(e[0]), e[1], e[2])) for key, e in self.values.items())
+        lines = super().lines()
+        names = self.labelnames + ("le",)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """指標登錄表（同名重複宣告回傳既有物件，類型或標籤不同時拋出 ValueError）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: "OrderedDict[str, _Metric]" = OrderedDict()
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指標 {name} 已以不同類型或標籤宣告")
+            elif kwargs.get("callback") is not None:
+                metric.callback = kwargs["callback"]  # 模組重新載入時改用新的 callback
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              callback: Optional[GaugeCallback] = None) -> Gauge:
+        return self._register(Gauge, name, help, labelnames, callback=callback)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+
+
+# ── 子程序 ─────────────────────────────────────────────────
+
+SUBPROCESS_SPAWNS = counter("dopeman_subprocess_spawns_total", "子程序啟動次數", ("script",))
+SUBPROCESS_SECONDS = histogram("dopeman_subprocess_seconds", "子程序執行時間（秒）", ("script",))
+
+
+def timed_run(args: Iterable, label: Optional[str] = None, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run 並記錄啟動次數與執行時間（label 預設為執行檔名稱，git 另加子命令）"""
+    args = list(args)
+    if label is None:
+        label = Path(str(args[0])).name
+        if label == "git" and len(args) > 1:
+            label = f"git {args[1]}"  # git 依子命令區分
+    SUBPROCESS_SPAWNS.inc(script=label)
+    with SUBPROCESS_SECONDS.time(script=label):
+        return subprocess.run(args, **kwargs)
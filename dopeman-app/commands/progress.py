@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Progress
+工具執行時的結構化進度事件：階段開始 / 結束、階段內已處理數 / 預估總數、目前路徑、經過時間與 ETA。
+程式內執行時由 TaskRunner 為執行緒設定目前的 reporter，事件以 callback 送出；
+以子程序執行時，環境變數 DOPEMAN_PROGRESS_FD 指定的 fd 上以 NDJSON 逐行輸出，由父程序轉送。
+程式內執行的任務被取消時，下一次回報進度（階段開始、items）會拋出 TaskCancelled
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Sequence
+
+PROGRESS_FD_ENV = "DOPEMAN_PROGRESS_FD"
+
+# 階段內 items 事件的最短間隔（秒）；階段開始 / 結束一律送出
+ITEM_INTERVAL = 0.1
+
+# 整體完成比例低於此值時不估算 ETA（太早估算誤差過大）
+ETA_MIN_FRACTION = 0.02
+
+Event = Dict[str, Any]
+Emit = Callable[[Event], None]
+
+
+class TaskCancelled(BaseException):
+    """任務已被取消（繼承 BaseException：工具內的 except Exception 不會攔下，直接結束任務）"""
+
+
+class ProgressReporter:
+    """進度事件產生器（沒有 emit 時所有呼叫都是 no-op；cancel 事件設定後回報進度時拋出 TaskCancelled）
+
+    用法：
+        reporter = progress.current()
+        reporter.plan(["walk", "agents"], weights={"walk": 2})
+        with reporter.phase("agents", "掃描 Agents", total=len(paths)):
+            for i, path in enumerate(paths, 1):
+                reporter.items(i, path=path)
+        reporter.finish()
+    """
+
+    def __init__(self, emit: Optional[Emit] = None, cancel: Optional[threading.Event] = None):
+        self.emit = emit
+        self.cancel = cancel
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.phases: Sequence[str] = ()
+        self.weights: Dict[str, float] = {}
+        self.finished_weight = 0.0
+        self.current: Optional[str] = None
+        self.label: Optional[str] = None
+        self.done = 0
+        self.total: Optional[int] = None
+        self.phase_done = False
+        self.path: Optional[str] = None
+        self.last_items = 0.0
+        self.reported = 0.0  # 已送出的最大完成比例（同一階段內的子步驟重新計數時不倒退）
+
+    @property
+    def enabled(self) -> bool:
+        return self.emit is not None
+
+    def plan(self, phases: Sequence[str], weights: Optional[Dict[str, float]] = None):
+        """宣告接下來依序執行的階段；weights 為各階段的相對比重（預設相同，可傳入上次的耗時）"""
+        with self.lock:
+            self.phases = tuple(phases)
+            weights = weights or {}
+            self.weights = {name: max(float(weights.get(name, 1.0)), 0.001) for name in self.phases}
+            self.finished_weight = 0.0
+
+    def check_cancelled(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise TaskCancelled("任務已取消")
+
+    @contextmanager
+    def phase(self, name: str, label: Optional[str] = None, total: Optional[int] = None):
+        """一個階段（結束時送出 phase_finished，發生例外也送出）"""
+        self.check_cancelled()
+        with self.lock:
+            self.current, self.label = name, label or name
+            self.done, self.total, self.path = 0, total, None
+            self.phase_done = False
+            phase_started = time.monotonic()
+        self._send("phase_started")
+        try:
+            yield self
+        finally:
+            with self.lock:
+                if self.total is not None:
+                    self.done = self.total
+                self.phase_done = True
+                seconds = time.monotonic() - phase_started
+            self._send("phase_finished", phase_seconds=round(seconds, 3))
+            with self.lock:
+                self.finished_weight += self.weights.get(name, 0.0)
+                self.current = None
+
+    def items(self, done: int, total: Optional[int] = None, path: Any = None, force: bool = False):
+        """目前階段已處理 done 個（total 為預估總數）；依 ITEM_INTERVAL 節流"""
+        self.check_cancelled()
+        now = time.monotonic()
+        with self.lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+            if path is not None:
+                self.path = str(path)
+            if not force and now - self.last_items < ITEM_INTERVAL:
+                return
+            self.last_items = now
+        self._send("items")
+
+    def advance(self, path: Any = None):
+        """目前階段完成一個項目"""
+        self.items(self.done + 1, path=path)
+
+    def finish(self):
+        with self.lock:
+            self.finished_weight = sum(self.weights.values())
+        self._send("finished")
+
+    def fraction(self) -> float:
+        """整體完成比例（0 ~ 1）：已完成階段的比重 + 目前階段的 done / total"""
+        total_weight = sum(self.weights.values())
+        current = 0.0
+        if self.current is not None and self.phase_done:
+            current = 1.0
+        elif self.current is not None and self.total:
+            current = min(self.done / self.total, 1.0)
+        if not total_weight:
+            return current
+        weight = self.weights.get(self.current, 0.0) if self.current else 0.0
+        return min((self.finished_weight + weight * current) / total_weight, 1.0)
+
+    def _send(self, event: str, **fields: Any):
+        if self.emit is None:
+            return
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            fraction = self.reported = max(self.reported, self.fraction())
+            eta = elapsed * (1 - fraction) / fraction if fraction >= ETA_MIN_FRACTION else None
+            data = {
+                "event": event,
+                "phase": self.current,
+                "label": self.label if self.current else None,
+                "phase_index": self.phases.index(self.current) + 1 if self.current in self.phases else None,
+                "phase_count": len(self.phases) or None,
+                "done": self.done,
+                "total": self.total,
+                "path": self.path,
+                "progress": round(fraction * 100),
+                "elapsed": round(elapsed, 2),
+                "eta": None if eta is None else round(eta, 1),
+                **fields,
+            }
+        try:
+            self.emit(data)
+        except Exception:
+            pass  # 進度只是附加資訊，不影響工具本身
+
+
+_local = threading.local()
+_fd_reporter: Optional[ProgressReporter] = None
+_fd_lock = threading.Lock()
+
+
+def ndjson_emitter(fd: int) -> Emit:
+    """把事件以 NDJSON 寫入 fd（讀取端關閉後停止寫入）"""
+    lock = threading.Lock()
+    state = {"open": True}
+
+    def emit(event: Event):
+        if not state["open"]:
+            return
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with lock:
+            try:
+                os.write(fd, line)
+            except OSError:
+                state["open"] = False
+
+    return emit
+
+
+def _from_env() -> ProgressReporter:
+    """子程序：依 DOPEMAN_PROGRESS_FD 建立寫入 NDJSON 的 reporter（未設定時為 no-op）"""
+    global _fd_reporter
+    with _fd_lock:
+        if _fd_reporter is None:
+            fd = os.environ.get(PROGRESS_FD_ENV)
+            try:
+                _fd_reporter = ProgressReporter(ndjson_emitter(int(fd)) if fd else None)
+            except ValueError:
+                _fd_reporter = ProgressReporter()
+        return _fd_reporter
+
+
+def current() -> ProgressReporter:
+    """目前執行緒的 reporter（TaskRunner 設定；子程序由環境變數決定；否則為 no-op）"""
+    reporter = getattr(_local, "reporter", None)
+    return reporter if reporter is not None else _from_env()
+
+
+@contextmanager
+def use(reporter: Optional[ProgressReporter]):
+    """在區塊內把 reporter 設為目前執行緒的 reporter（None 時不變）"""
+    if reporter is None:
+        yield current()
+        return
+    previous = getattr(_local, "reporter", None)
+    _local.reporter = reporter
+    try:
+        yield reporter
+    finally:
+        _local.reporter = previous
+
+
+def relay(fd: int, emit: Emit):
+    """讀取子程序寫出的 NDJSON 進度事件並轉送，直到 EOF（讀完後關閉 fd）"""
+    with os.fdopen(fd, "rb") as stream:
+        for line in stream:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            try:
+                emit(event)
+            except Exception:
+                pass
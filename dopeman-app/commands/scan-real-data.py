@@ -7,19 +7,71 @@ Skills Control Center - Real Data Scanner
 import os
 import json
 import re
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+import metrics
+import progress
+from git_collector import DEFAULT_REPO_TIMEOUT, DEFAULT_WORKERS, GitCollector
+from git_reader import open_repo
+from git_status import DEFAULT_UNTRACKED_BUDGET
+from scan_cache import ScanCache, fingerprint
+from scan_output import DEFAULT_OUTPUT_FORMAT, LEGACY_FILE, OUTPUT_FORMATS, SHARD_DIR, save_scan_data
+from location_index import DEFAULT_EXCLUDE_DIRS, DEFAULT_SCAN_ROOTS, LocationIndex
+from scan_walker import split_nested
+from tech_stack import TechStackDetector, manifest_paths
+
 # 路徑配置
 HOME = Path.home()
 CLAUDE_DIR = HOME / ".claude"
 DEV_DIR = HOME / "DEV"
 AGENT_PROJECTS_DIR = HOME / "AgentProjects"
 MEMORY_DIR = CLAUDE_DIR / "memory" / "dopeman"
+DATA_FILE = LEGACY_FILE
+
+# 依序嘗試作為專案摘要的 README
+README_FILES = ["README.md", "README.txt", "README"]
+
+# 專案指紋納入的 README / AI 團隊檔案（技術棧 manifest 由 tech_stack.manifest_paths 提供）
+PROJECT_MANIFESTS = [*README_FILES, "CLAUDE.md", ".claude", ".claude/agents"]
+
+# 掃描階段（依 run_scan 執行順序）與各階段寫入的 layers 欄位
+SCAN_PHASES = [
+    "global_skills", "project_skills", "dev_skills", "dev_projects",
+    "global_rules", "project_rules", "agents", "commands",
+]
+PHASE_LABELS = {
+    "walk": "更新位置索引",
+    "global_skills": "掃描全域 Skills",
+    "project_skills": "掃描專案 Skills",
+    "dev_skills": "掃描開發中 Skills",
+    "dev_projects": "掃描開發專案",
+    "global_rules": "掃描全域 Rules",
+    "project_rules": "掃描專案 Rules",
+    "agents": "掃描 Agents",
+    "commands": "掃描 Commands",
+}
+PHASE_LAYERS = {
+    "global_skills": [("entry", "skills")],
+    "agents": [("coordination", "coordinators"), ("execution", "workers")],
+    "commands": [("entry", "commands")],
+}
+
+SCAN_SECONDS = metrics.histogram("dopeman_scan_seconds", "掃描總耗時（秒；full 完整掃描 / refresh 增量更新）", ("kind",))
+SCAN_PHASE_SECONDS = metrics.histogram("dopeman_scan_phase_seconds", "各掃描階段耗時（秒；walk 為位置索引更新）",
+                                       ("phase",))
+SCAN_ITEMS = metrics.gauge("dopeman_scan_items", "最近一次掃描各類別的項目數", ("category",))
+
+# 各階段上次的耗時（秒），作為下次進度估算的比重（常駐伺服器內越掃越準）
+last_phase_seconds: Dict[str, float] = {}
+
 
 class RealDataScanner:
-    def __init__(self):
+    def __init__(self, cache: Optional[ScanCache] = None, git: Optional[GitCollector] = None,
+                 index: Optional[LocationIndex] = None):
         self.data = {
             "version": "1.0.0",
             "last_scan": datetime.now().isoformat(),
@@ -44,8 +96,22 @@ class RealDataScanner:
                 "coordination": {"coordinators": []},
                 "execution": {"workers": [], "sub_skills": []},
             },
-            "user_preferences": {}
+            "user_preferences": {},
+            "scan_stats": {}
         }
+        # 位置索引查到的命中（由 walk_filesystem 填入）
+        self.walked = False
+        self.index = index
+        self.project_claude_dirs: List[Path] = []
+        self.project_git_dirs: List[Path] = []
+        self.skill_md_paths: List[Path] = []
+        self.claude_dir_skill_mds: Dict[str, List[Path]] = {}
+        # 解析結果快取（未變更的檔案不重新讀取）
+        self.cache = cache if cache is not None else ScanCache()
+        # 技術棧偵測（有限深度，命中即停）
+        self.tech_stack = TechStackDetector()
+        # 並行 git 狀態收集（每個 repo 有時間預算）
+        self.git = git if git is not None else GitCollector()
         # 載入用戶設定
         self.load_user_preferences()
 
@@ -87,6 +153,10 @@ class RealDataScanner:
                         "theme": "light",
                         "auto_refresh": False,
                         "refresh_interval": 300
+                    },
+                    "scan": {
+                        "roots": DEFAULT_SCAN_ROOTS,
+                        "exclude": sorted(DEFAULT_EXCLUDE_DIRS)
                     }
                 }
             }
@@ -103,6 +173,114 @@ class RealDataScanner:
                 print(f"⚠️  無法讀取用戶設定: {e}")
                 self.data["user_preferences"] = {}
 
+    def walk_filesystem(self):
+        """由持久化位置索引取得 .claude / .git / SKILL.md，分派給各掃描階段
+
+        索引只重新列出 mtime 有變的目錄；scan roots 可在 user-preferences.json 的 scan.roots 設定。
+        """
+        index = self.index if self.index is not None else LocationIndex()
+        with self._timed_phase("walk"):
+            update_stats = index.update()
+
+        for claude_dir in index.find(".claude"):
+            self._on_claude_dir(claude_dir)
+        for git_dir in index.find(".git"):
+            self._on_git_dir(git_dir)
+        for skill_md in index.find("SKILL.md"):
+            self._on_skill_md(skill_md)
+
+        if self.index is None:
+            index.close()
+
+        self.data["scan_stats"]["walk"] = update_stats
+        self.walked = True
+
+    def reset_walk(self):
+        """清除位置索引的查詢結果，下次 ensure_walked 時重新查詢"""
+        self.walked = False
+        self.project_claude_dirs = []
+        self.project_git_dirs = []
+        self.skill_md_paths = []
+        self.claude_dir_skill_mds = {}
+
+    def refresh(self, phases, repo_dirs=(), reindex: bool = False):
+        """只重跑指定的掃描階段（供 watcher 做增量更新）
+
+        reindex 時重新查詢位置索引（新增 / 刪除 SKILL.md、.claude、.git）；
+        repo_dirs 的 git 探測結果會先作廢再重新收集。
+        """
+        with SCAN_SECONDS.time(kind="refresh"):
+            reporter = progress.current()
+            if reindex:
+                self.reset_walk()
+            self.git.invalidate(repo_dirs)
+
+            selected = [phase for phase in SCAN_PHASES if phase in phases]
+            reporter.plan(selected, weights=last_phase_seconds)
+            for phase in selected:
+                self.data["categories"][phase] = {"count": 0, "items": []}
+                for layer, key in PHASE_LAYERS.get(phase, []):
+                    self.data["layers"][layer][key] = []
+                self._run_phase(phase)
+            reporter.finish()
+
+        self.data["last_scan"] = datetime.now().isoformat()
+
+    @contextmanager
+    def _timed_phase(self, phase: str):
+        """送出階段進度事件，並記錄耗時（metrics 與下次進度估算的比重）
+
+        在其他階段中延遲進行的 walk 只記錄耗時，進度仍算在外層階段
+        """
+        reporter = progress.current()
+        started = time.monotonic()
+        with SCAN_PHASE_SECONDS.time(phase=phase):
+            if reporter.current is None:
+                with reporter.phase(phase, PHASE_LABELS[phase]):
+                    yield
+            else:
+                yield
+        last_phase_seconds[phase] = time.monotonic() - started
+
+    def _run_phase(self, phase: str):
+        """執行單一掃描階段並記錄耗時與項目數"""
+        with self._timed_phase(phase):
+            getattr(self, f"scan_{phase}")()
+        SCAN_ITEMS.set(self.data["categories"][phase]["count"], category=phase)
+
+    def ensure_walked(self):
+        """確保已完成檔案系統走訪（單獨呼叫某個 scan_* 時使用）"""
+        if not self.walked:
+            self.walk_filesystem()
+
+    def _on_claude_dir(self, claude_dir: Path):
+        """專案 Skills / Rules / Agents 只關心 DEV 下的 .claude"""
+        if str(claude_dir) == str(CLAUDE_DIR):
+            return
+        if self._is_under(claude_dir, DEV_DIR):
+            self.project_claude_dirs.append(claude_dir)
+
+    def _on_git_dir(self, git_dir: Path):
+        """開發專案關心 DEV 與 AgentProjects 下的 .git"""
+        if self._is_under(git_dir, DEV_DIR) or self._is_under(git_dir, AGENT_PROJECTS_DIR):
+            self.project_git_dirs.append(git_dir)
+
+    def _on_skill_md(self, skill_md: Path):
+        """開發中 Skills 關心所有 SKILL.md；專案 Skills 依所屬 .claude/skills 分組"""
+        self.skill_md_paths.append(skill_md)
+
+        parts = skill_md.parts
+        if ".claude" not in parts:
+            return
+        idx = len(parts) - 1 - parts[::-1].index(".claude")
+        if idx + 1 < len(parts) - 1 and parts[idx + 1] == "skills":
+            claude_dir = str(Path(*parts[:idx + 1]))
+            self.claude_dir_skill_mds.setdefault(claude_dir, []).append(skill_md)
+
+    @staticmethod
+    def _is_under(path: Path, root: Path) -> bool:
+        return str(path).startswith(str(root) + os.sep)
+
     def scan_global_skills(self):
         """掃描全域 Skills（支援 symlinks）"""
         skills_dir = CLAUDE_DIR / "skills"
@@ -131,8 +309,7 @@ class RealDataScanner:
             skill_id = item.name
 
             # 讀取 YAML frontmatter
-            content = skill_md_path.read_text(encoding='utf-8')
-            frontmatter = self.extract_frontmatter(content)
+            frontmatter = self.read_frontmatter(skill_md_path)
 
             # 從 frontmatter 讀取顯示名稱，若無則使用 skill_id
             display_name = frontmatter.get("name", skill_id)
@@ -163,19 +340,13 @@ class RealDataScanner:
 
     def scan_project_skills(self):
         """掃描專案 Skills"""
-        # 掃描 DEV 目錄下的專案
-        for claude_dir in DEV_DIR.rglob(".claude"):
-            # 排除 node_modules 和全域 .claude
-            if "node_modules" in str(claude_dir) or str(claude_dir) == str(CLAUDE_DIR):
-                continue
+        self.ensure_walked()
 
+        # 掃描 DEV 目錄下的專案（node_modules 已在索引時剪枝）
+        for claude_dir in self.project_claude_dirs:
             project_path = claude_dir.parent
-            skills_dir = claude_dir / "skills"
 
-            if not skills_dir.exists():
-                continue
-
-            for skill_path in skills_dir.rglob("SKILL.md"):
+            for skill_path in self.claude_dir_skill_mds.get(str(claude_dir), []):
                 skill_name = skill_path.parent.name
 
                 project_info = {
@@ -199,14 +370,11 @@ class RealDataScanner:
         2. 有 .git（版本控制）
         3. 有變更（uncommitted changes 或 unpushed commits）
         """
-        processed_projects = set()  # 避免重複處理
-
-        # 掃描所有 SKILL.md（全域搜尋）
-        for skill_md in HOME.rglob("SKILL.md"):
-            # 排除 node_modules
-            if "node_modules" in str(skill_md):
-                continue
+        self.ensure_walked()
+        candidates = {}  # project_key -> (project_dir, skill_name, skill_type)，避免重複處理
 
+        # 所有 SKILL.md（索引時已剪枝 node_modules）
+        for skill_md in self.skill_md_paths:
             # 判斷 skill 類型和專案根目錄
             skill_dir = skill_md.parent
 
@@ -240,16 +408,24 @@ class RealDataScanner:
 
             # 避免重複處理同一個專案
             project_key = str(project_dir)
-            if project_key in processed_projects:
+            if project_key in candidates:
                 continue
 
             # 檢查是否有 .git
             if not (project_dir / ".git").exists():
                 continue
 
-            # 檢查 git 狀態
-            is_dirty = self.check_git_dirty(project_dir)
-            unpushed_count = self.check_unpushed_commits(project_dir)
+            candidates[project_key] = (project_dir, skill_name, skill_type)
+
+        # 並行檢查 git 狀態
+        git_results = self.git.collect(
+            [project_dir for project_dir, _, _ in candidates.values()],
+            ("dirty", "unpushed")
+        )
+
+        for project_key, (project_dir, skill_name, skill_type) in candidates.items():
+            is_dirty = self.git.get(project_dir, "dirty")
+            unpushed_count = self.git.get(project_dir, "unpushed")
 
             # 只有「有變更」的才算「開發中」
             if is_dirty or unpushed_count > 0:
@@ -269,11 +445,11 @@ class RealDataScanner:
                     "has_git": True,
                     "dirty": is_dirty,
                     "unpushed_commits": unpushed_count,
-                    "status": status
+                    "status": status,
+                    "git_state": git_results[project_key]["state"]
                 }
 
                 self.data["categories"]["dev_skills"]["items"].append(dev_info)
-                processed_projects.add(project_key)
 
         self.data["categories"]["dev_skills"]["count"] = len(
             self.data["categories"]["dev_skills"]["items"]
@@ -286,9 +462,7 @@ class RealDataScanner:
             return
 
         for rule_path in rules_dir.glob("*.md"):
-            content = rule_path.read_text(encoding='utf-8')
-            frontmatter = self.extract_frontmatter(content)
-            applicability = self.extract_applicability(content)
+            frontmatter, applicability = self.read_rule_meta(rule_path)
 
             rule_info = {
                 "name": rule_path.stem,
@@ -306,10 +480,9 @@ class RealDataScanner:
 
     def scan_project_rules(self):
         """掃描專案 Rules"""
-        for claude_dir in DEV_DIR.rglob(".claude"):
-            if "node_modules" in str(claude_dir) or str(claude_dir) == str(CLAUDE_DIR):
-                continue
+        self.ensure_walked()
 
+        for claude_dir in self.project_claude_dirs:
             project_path = claude_dir.parent
             rules_dir = claude_dir / "rules"
 
@@ -317,9 +490,7 @@ class RealDataScanner:
                 continue
 
             for rule_path in rules_dir.glob("*.md"):
-                content = rule_path.read_text(encoding='utf-8')
-                frontmatter = self.extract_frontmatter(content)
-                applicability = self.extract_applicability(content)
+                frontmatter, applicability = self.read_rule_meta(rule_path)
 
                 rule_info = {
                     "project_path": str(project_path.relative_to(HOME)),
@@ -338,11 +509,10 @@ class RealDataScanner:
 
     def scan_agents(self):
         """掃描 Agents（遞迴掃描所有層級）"""
-        # 遞迴掃描所有 .claude/agents 目錄
-        for claude_dir in DEV_DIR.rglob(".claude"):
-            if "node_modules" in str(claude_dir) or str(claude_dir) == str(CLAUDE_DIR):
-                continue
+        self.ensure_walked()
 
+        # 遞迴掃描所有 .claude/agents 目錄
+        for claude_dir in self.project_claude_dirs:
             project_path = claude_dir.parent
             agents_dir = claude_dir / "agents"
 
@@ -393,87 +563,110 @@ class RealDataScanner:
 
     def scan_commands(self):
         """掃描 Commands（從 SKILL.md 動態提取）"""
-        # 遞迴掃描所有 SKILL.md
-        for skill_path in CLAUDE_DIR.rglob("SKILL.md"):
-            if "node_modules" in str(skill_path):
+        self.ensure_walked()
+
+        # ~/.claude 下所有 SKILL.md（不跟隨 symlink，與 rglob 行為一致）
+        reporter = progress.current()
+        for done, skill_path in enumerate(self.skill_md_paths, 1):
+            reporter.items(done, len(self.skill_md_paths), skill_path)
+            if not self._is_under(skill_path, CLAUDE_DIR):
                 continue
 
             skill_name = skill_path.parent.name
-            content = skill_path.read_text(encoding='utf-8')
-
-            # 提取 description（從 YAML frontmatter 或第一個標題）
-            description = self._extract_skill_description(content, skill_name)
+            parsed = self.read_skill_commands(skill_path, skill_name)
 
             # 1. 先加入 skill 本身作為基礎命令
             base_cmd = {
                 "name": skill_name,
                 "full_command": f"/{skill_name}",
                 "entry_skill": skill_name,
-                "description": description,
+                "description": parsed["description"],
                 "aliases": [],
                 "is_base_command": True
             }
             self.data["categories"]["commands"]["items"].append(base_cmd)
             self.data["layers"]["entry"]["commands"].append(base_cmd["full_command"])
 
-            # 2. 檢查是否有子命令表格（如 dopeman 的多個子命令）
-            lines = content.split('\n')
-            in_command_table = False
-
-            for i, line in enumerate(lines):
-                # 檢查是否進入命令表格區域
-                if '可用命令' in line or ('命令' in line and '說明' in line):
-                    # 找到表格開始（下一行或下兩行應該是表格）
-                    for j in range(i, min(i+5, len(lines))):
-                        if '|' in lines[j] and ('---' in lines[j+1] if j+1 < len(lines) else False):
-                            in_command_table = True
-                            table_start = j + 2  # 跳過標題和分隔線
-                            break
+            # 2. 子命令表格（如 dopeman 的多個子命令）
+            for sub in parsed["subcommands"]:
+                cmd_info = {
+                    "name": sub["name"],
+                    "full_command": f"/{skill_name} {sub['name']}",
+                    "entry_skill": skill_name,
+                    "description": sub["description"],
+                    "aliases": sub["aliases"],
+                    "is_subcommand": True
+                }
+
+                self.data["categories"]["commands"]["items"].append(cmd_info)
+                self.data["layers"]["entry"]["commands"].append(cmd_info["full_command"])
 
-                    if in_command_table:
-                        # 解析表格內容
-                        for k in range(table_start, len(lines)):
-                            line = lines[k].strip()
+                # 也加入別名
+                for alias in sub["aliases"]:
+                    self.data["layers"]["entry"]["commands"].append(f"/{skill_name} {alias}")
+
+        self.data["categories"]["commands"]["count"] = len(
+            self.data["categories"]["commands"]["items"]
+        )
 
-                            # 表格結束
-                            if not line or not line.startswith('|'):
-                                break
+    def read_skill_commands(self, skill_path: Path, skill_name: str) -> Dict[str, Any]:
+        """讀取 SKILL.md 的描述與子命令表格（經快取）"""
+        def parse():
+            content = skill_path.read_text(encoding='utf-8')
+            return {
+                "description": self._extract_skill_description(content, skill_name),
+                "subcommands": self._parse_command_table(content)
+            }
 
-                            # 解析表格行
-                            parts = [p.strip() for p in line.split('|')]
-                            if len(parts) >= 4:  # | 命令 | 說明 | 範例 |
-                                # 清理命令名稱：移除所有 backticks 和參數
-                                cmd_text = parts[1].replace('`', '').strip()
+        return self.cache.get_or_compute(skill_path, "skill_commands", parse)
 
-                                # 檢查是否有別名（在移除 backticks 之前）
-                                alias_match = re.search(r'\(別名:\s*`?(.+?)`?\)', parts[1])
-                                aliases = [a.strip() for a in alias_match.group(1).split(',')] if alias_match else []
+    def _parse_command_table(self, content: str) -> List[Dict[str, Any]]:
+        """解析 SKILL.md 中的子命令表格（| 命令 | 說明 | 範例 |）"""
+        subcommands = []
+        lines = content.split('\n')
+        in_command_table = False
+
+        for i, line in enumerate(lines):
+            # 檢查是否進入命令表格區域
+            if '可用命令' in line or ('命令' in line and '說明' in line):
+                # 找到表格開始（下一行或下兩行應該是表格）
+                for j in range(i, min(i+5, len(lines))):
+                    if '|' in lines[j] and ('---' in lines[j+1] if j+1 < len(lines) else False):
+                        in_command_table = True
+                        table_start = j + 2  # 跳過標題和分隔線
+                        break
+
+                if in_command_table:
+                    # 解析表格內容
+                    for k in range(table_start, len(lines)):
+                        line = lines[k].strip()
+
+                        # 表格結束
+                        if not line or not line.startswith('|'):
+                            break
 
-                                # 移除別名部分，只保留命令名稱
-                                cmd_name = re.sub(r'\s*\(別名:.*?\)', '', cmd_text).split()[0]
-                                cmd_desc = parts[2]
+                        # 解析表格行
+                        parts = [p.strip() for p in line.split('|')]
+                        if len(parts) >= 4:  # | 命令 | 說明 | 範例 |
+                            # 清理命令名稱：移除所有 backticks 和參數
+                            cmd_text = parts[1].replace('`', '').strip()
 
-                                cmd_info = {
-                                    "name": cmd_name,
-                                    "full_command": f"/{skill_name} {cmd_name}",
-                                    "entry_skill": skill_name,
-                                    "description": cmd_desc,
-                                    "aliases": aliases,
-                                    "is_subcommand": True
-                                }
+                            # 檢查是否有別名（在移除 backticks 之前）
+                            alias_match = re.search(r'\(別名:\s*`?(.+?)`?\)', parts[1])
+                            aliases = [a.strip() for a in alias_match.group(1).split(',')] if alias_match else []
 
-                                self.data["categories"]["commands"]["items"].append(cmd_info)
-                                self.data["layers"]["entry"]["commands"].append(cmd_info["full_command"])
+                            # 移除別名部分，只保留命令名稱
+                            cmd_name = re.sub(r'\s*\(別名:.*?\)', '', cmd_text).split()[0]
 
-                                # 也加入別名
-                                for alias in aliases:
-                                    self.data["layers"]["entry"]["commands"].append(f"/{skill_name} {alias}")
+                            subcommands.append({
+                                "name": cmd_name,
+                                "description": parts[2],
+                                "aliases": aliases
+                            })
 
-                        break  # 找到並處理完表格後跳出
+                    break  # 找到並處理完表格後跳出
 
-        self.data["categories"]["commands"]["count"] = len(
-            self.data["categories"]["commands"]["items"]
-        )
+        return subcommands
 
     def _extract_skill_description(self, content: str, skill_name: str) -> str:
         """從 SKILL.md 提取簡短描述"""
@@ -516,135 +709,144 @@ class RealDataScanner:
 
     def scan_dev_projects(self):
         """掃描開發專案"""
-        import subprocess
-
-        # 掃描 ~/DEV 和 ~/AgentProjects 下所有有 .git 的專案（遞迴搜尋）
-        # 過濾掉不需要的子專案（node_modules, .venv, vendor 等）
-        exclude_patterns = ["node_modules", ".venv", "venv", "vendor", ".git/modules"]
-
-        all_git_dirs = []
-
-        # 掃描 DEV_DIR
-        if DEV_DIR.exists():
-            for git_dir in DEV_DIR.rglob(".git"):
-                # 跳過非目錄的 .git 檔案
-                if not git_dir.is_dir():
-                    continue
-
-                # 檢查路徑是否包含排除的模式
-                path_str = str(git_dir.relative_to(DEV_DIR))
-                if any(exclude in path_str for exclude in exclude_patterns):
-                    continue
-
-                all_git_dirs.append(git_dir)
-
-        # 掃描 AGENT_PROJECTS_DIR
-        if AGENT_PROJECTS_DIR.exists():
-            for git_dir in AGENT_PROJECTS_DIR.rglob(".git"):
-                # 跳過非目錄的 .git 檔案
-                if not git_dir.is_dir():
-                    continue
-
-                # 檢查路徑是否包含排除的模式
-                path_str = str(git_dir.relative_to(AGENT_PROJECTS_DIR))
-                if any(exclude in path_str for exclude in exclude_patterns):
-                    continue
-
-                all_git_dirs.append(git_dir)
-
-        # 過濾掉巢狀的 git 專案（只保留最上層）
-        top_level_git_dirs = []
-        for git_dir in sorted(all_git_dirs):
-            project_dir = git_dir.parent
-
-            # 檢查是否為其他已加入專案的子專案
-            is_nested = False
-            for other_git_dir in all_git_dirs:
-                if git_dir == other_git_dir:
-                    continue
-                other_project_dir = other_git_dir.parent
-                # 如果此專案在另一個專案目錄內，則為巢狀專案
-                if project_dir != other_project_dir and str(project_dir).startswith(str(other_project_dir) + "/"):
-                    is_nested = True
-                    break
-
-            if not is_nested:
-                top_level_git_dirs.append(git_dir)
+        self.ensure_walked()
+
+        # ~/DEV 和 ~/AgentProjects 下所有有 .git 的專案（由位置索引取得）
+        # node_modules, .venv, venv, vendor 已在索引時剪枝，.git/modules 不會進入
+        all_git_dirs = self.project_git_dirs
+
+        # 分出最上層與巢狀的 git 專案（巢狀專案掛在最近的父專案下）
+        project_dirs, nested = split_nested(git_dir.parent for git_dir in all_git_dirs)
+
+        # 指紋未變的專案直接沿用上次的 project_info（不需重新探測 remote / commit、技術棧、README）
+        base_fingerprints = {str(d): self.base_fingerprint(d) for d in project_dirs}
+        reused = {}
+        for project_dir in project_dirs:
+            extra = base_fingerprints[str(project_dir)] + self.tech_stack_fingerprint(project_dir)
+            hit, info = self.cache.get(project_dir, "project_info", extra=extra)
+            if hit:
+                reused[str(project_dir)] = info
+                self.touch_project_rows(project_dir)
+
+        # 並行收集 git 狀態（逾時的 repo 標記為 stale）；dirty 反映工作目錄，每次都重新判斷
+        self.git.collect(
+            [d for d in project_dirs if str(d) not in reused],
+            ("remote_url", "last_commit")
+        )
+        git_results = self.git.collect(project_dirs, ("dirty",))
 
         # 掃描所有最上層 git 專案
-        for git_dir in top_level_git_dirs:
-            project_dir = git_dir.parent
-            project_name = project_dir.name
-
-            # 取得 Git remote URL
-            remote_url = ""
-            try:
-                result = subprocess.run(
-                    ["git", "remote", "get-url", "origin"],
-                    cwd=project_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    remote_url = result.stdout.strip()
-            except:
-                pass
-
-            # 分類專案類型
-            project_type = self.classify_project(remote_url, project_name)
-
-            # 取得最後 commit 資訊
-            last_commit_date = ""
-            last_commit_message = ""
-            try:
-                result = subprocess.run(
-                    ["git", "log", "-1", "--format=%ci|||%s"],
-                    cwd=project_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    parts = result.stdout.strip().split("|||")
-                    if len(parts) == 2:
-                        last_commit_date = parts[0]
-                        last_commit_message = parts[1]
-            except:
-                pass
-
-            # 檢測技術棧
-            tech_stack = self.detect_tech_stack(project_dir)
-
-            # 讀取 README 第一行作為摘要
-            summary = self.extract_readme_summary(project_dir)
-
-            # 檢查是否有 AI agent 團隊
-            has_claude_team = (project_dir / "CLAUDE.md").exists() or \
-                             (project_dir / ".claude" / "agents").exists()
-
-            # 檢查是否有未 commit 變更
-            is_dirty = self.check_git_dirty(project_dir)
-
-            project_info = {
-                "name": project_name,
-                "path": str(project_dir.relative_to(HOME)),
-                "type": project_type,
-                "remote_url": remote_url,
-                "tech_stack": tech_stack,
-                "summary": summary,
-                "has_claude_team": has_claude_team,
-                "last_commit_date": last_commit_date,
-                "last_commit_message": last_commit_message,
-                "is_dirty": is_dirty
-            }
+        for project_dir in project_dirs:
+            git_result = git_results[str(project_dir)]
+
+            project_info = reused.get(str(project_dir))
+            if project_info is None:
+                project_info = self.build_project_info(project_dir)
+                if git_result["state"] == "ok":
+                    # 技術棧部分以本次走訪結果重新計算，其餘沿用探測前的指紋
+                    self.cache.put(project_dir, "project_info", project_info,
+                                   extra=base_fingerprints[str(project_dir)] + self.tech_stack_fingerprint(project_dir))
+
+            project_info = dict(project_info)
+            project_info.update({
+                "is_dirty": self.git.get(project_dir, "dirty"),
+                "git_state": git_result["state"],
+                "git_probe_ms": git_result.get("elapsed_ms", 0),
+                "nested_repos": self.describe_nested(project_dir, nested)
+            })
 
             self.data["categories"]["dev_projects"]["items"].append(project_info)
 
+        self.data["scan_stats"]["projects"] = {
+            "total": len(project_dirs),
+            "reused": len(reused),
+            "probed": len(project_dirs) - len(reused),
+            "nested": sum(len(children) for children in nested.values()),
+        }
+
         self.data["categories"]["dev_projects"]["count"] = len(
             self.data["categories"]["dev_projects"]["items"]
         )
 
+    def touch_project_rows(self, project_dir: Path):
+        """沿用 project_info 時，標記其衍生的 tech_stack / readme_summary 快取項目，避免被 prune 刪除"""
+        self.cache.touch(project_dir, "tech_stack")
+        for readme_name in README_FILES:
+            self.cache.touch(project_dir / readme_name, "readme_summary")
+
+    def build_project_info(self, project_dir: Path) -> Dict:
+        """組出單一專案的 project_info（不含每次都會變的 dirty / git 探測狀態）"""
+        project_name = project_dir.name
+
+        # Git remote URL
+        remote_url = self.git.get(project_dir, "remote_url")
+
+        # 分類專案類型
+        project_type = self.classify_project(remote_url, project_name)
+
+        # 最後 commit 資訊
+        last_commit_date, last_commit_message = self.git.get(project_dir, "last_commit")
+
+        # 檢測技術棧（以專案根目錄、manifest、上次走訪子目錄的 stat 與偵測器組合作為快取鍵）
+        hit, tech_stack = self.cache.get(project_dir, "tech_stack", extra=self.tech_stack_fingerprint(project_dir))
+        if not hit:
+            tech_stack = self.detect_tech_stack(project_dir)
+            # 走訪的子目錄可能與上次不同，以本次走訪結果重新計算快取鍵
+            self.cache.put(project_dir, "tech_stack", tech_stack, extra=self.tech_stack_fingerprint(project_dir))
+
+        # 讀取 README 第一行作為摘要
+        summary = self.extract_readme_summary(project_dir)
+
+        # 檢查是否有 AI agent 團隊
+        has_claude_team = (project_dir / "CLAUDE.md").exists() or \
+                         (project_dir / ".claude" / "agents").exists()
+
+        return {
+            "name": project_name,
+            "path": str(project_dir.relative_to(HOME)),
+            "type": project_type,
+            "remote_url": remote_url,
+            "tech_stack": tech_stack,
+            "summary": summary,
+            "has_claude_team": has_claude_team,
+            "last_commit_date": last_commit_date,
+            "last_commit_message": last_commit_message,
+        }
+
+    def describe_nested(self, project_dir: Path, nested: Dict[Path, List[Path]]) -> List[Dict[str, str]]:
+        """列出專案內所有巢狀 repo（含多層巢狀，parent 為最近的父 repo）"""
+        result = []
+        stack = [project_dir]
+        while stack:
+            parent = stack.pop()
+            children = nested.get(parent, [])
+            for child in children:
+                result.append({
+                    "name": child.name,
+                    "path": str(child.relative_to(HOME)),
+                    "parent": str(parent.relative_to(HOME)),
+                })
+            stack.extend(reversed(children))
+        result.sort(key=lambda item: item["path"])
+        return result
+
+    def base_fingerprint(self, project_dir: Path) -> str:
+        """專案指紋中與技術棧無關的部分：git 狀態檔、專案根目錄與 README / AI 團隊檔案的 stat
+        （完整指紋另加上 tech_stack_fingerprint）"""
+        repo = open_repo(project_dir)
+        git_files = repo.state_files() if repo else [project_dir / ".git"]
+        return fingerprint([project_dir, *git_files, *(project_dir / name for name in PROJECT_MANIFESTS)])
+
+    def tech_stack_fingerprint(self, project_dir: Path) -> str:
+        """技術棧指紋：根目錄 manifest 與上次偵測走訪過的子目錄的 stat，加上偵測器組合"""
+        return fingerprint([*manifest_paths(project_dir, self.tech_stack.detectors),
+                            *self.probed_dirs(project_dir)]) + self.tech_stack.cache_key()
+
+    def probed_dirs(self, project_dir: Path) -> List[Path]:
+        """上次技術棧偵測走訪過的子目錄（沒有紀錄時為空）"""
+        hit, dirs = self.cache.get(project_dir, "tech_probe", extra=self.tech_stack.cache_key())
+        return [project_dir / d for d in dirs] if hit else []
+
     def classify_project(self, remote_url: str, project_name: str) -> str:
         """分類專案類型"""
         if not remote_url:
@@ -667,78 +869,64 @@ class RealDataScanner:
         return "other"  # 其他下載
 
     def detect_tech_stack(self, project_dir: Path) -> List[str]:
-        """檢測技術棧"""
-        stack = []
-
-        # .NET / C#（遞迴搜尋，但限制深度）
-        if list(project_dir.glob("*.sln")) or \
-           list(project_dir.glob("**/*.sln")) or \
-           list(project_dir.glob("*.csproj")) or \
-           list(project_dir.glob("**/*.csproj"))[:1]:  # 至少找到一個
-            stack.append(".NET/C#")
-
-        # Node.js
-        if (project_dir / "package.json").exists():
-            stack.append("Node.js")
-
-            # 檢查是否有 React
-            try:
-                with open(project_dir / "package.json", encoding='utf-8') as f:
-                    content = f.read()
-                    if "react" in content.lower():
-                        stack.append("React")
-                    if "next" in content.lower():
-                        stack.append("Next.js")
-                    if "vue" in content.lower():
-                        stack.append("Vue")
-            except:
-                pass
-
-        # Python
-        if (project_dir / "requirements.txt").exists() or \
-           (project_dir / "pyproject.toml").exists() or \
-           (project_dir / "setup.py").exists():
-            stack.append("Python")
-
-        # Go
-        if (project_dir / "go.mod").exists():
-            stack.append("Go")
-
-        # Rust
-        if (project_dir / "Cargo.toml").exists():
-            stack.append("Rust")
-
-        # 資料庫 scripts
-        if (project_dir / "migrations").exists() or \
-           list(project_dir.glob("*.sql")):
-            stack.append("SQL")
-
-        return stack
+        """檢測技術棧（有限深度走訪，偵測器定義於 tech_stack.DETECTORS），並記錄走訪過的子目錄"""
+        tech_stack, probed = self.tech_stack.probe(project_dir)
+        self.cache.put(project_dir, "tech_probe", [str(d.relative_to(project_dir)) for d in probed],
+                       extra=self.tech_stack.cache_key())
+        return tech_stack
 
     def extract_readme_summary(self, project_dir: Path) -> str:
         """提取 README 第一行作為摘要"""
-        readme_files = ["README.md", "README.txt", "README"]
-
-        for readme_name in readme_files:
+        for readme_name in README_FILES:
             readme_path = project_dir / readme_name
             if readme_path.exists():
-                try:
-                    with open(readme_path, encoding='utf-8') as f:
-                        lines = f.readlines()
-                        # 跳過 # 標題，找第一行有內容的
-                        for line in lines:
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                return line[:200]  # 限制長度
-                            # 或者如果是 # 標題，移除 # 號
-                            if line.startswith('#'):
-                                return line.lstrip('#').strip()[:200]
-                except:
-                    pass
+                summary = self.cache.get_or_compute(
+                    readme_path, "readme_summary",
+                    lambda: self._parse_readme_summary(readme_path)
+                )
+                if summary:
+                    return summary
+
+        return ""
+
+    def _parse_readme_summary(self, readme_path: Path) -> str:
+        """讀取單一 README 的第一行有內容的文字"""
+        try:
+            with open(readme_path, encoding='utf-8') as f:
+                lines = f.readlines()
+                # 跳過 # 標題，找第一行有內容的
+                for line in lines:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        return line[:200]  # 限制長度
+                    # 或者如果是 # 標題，移除 # 號
+                    if line.startswith('#'):
+                        return line.lstrip('#').strip()[:200]
+        except:
+            pass
 
         return ""
 
     # Helper methods
+    def read_frontmatter(self, path: Path) -> Dict[str, str]:
+        """讀取檔案的 YAML frontmatter（經快取）"""
+        return self.cache.get_or_compute(
+            path, "frontmatter",
+            lambda: self.extract_frontmatter(path.read_text(encoding='utf-8'))
+        )
+
+    def read_rule_meta(self, path: Path):
+        """讀取 Rule 的 frontmatter 與 applicability（經快取）"""
+        def parse():
+            content = path.read_text(encoding='utf-8')
+            return {
+                "frontmatter": self.extract_frontmatter(content),
+                "applicability": self.extract_applicability(content)
+            }
+
+        meta = self.cache.get_or_compute(path, "rule_meta", parse)
+        return meta["frontmatter"], meta["applicability"]
+
     def extract_frontmatter(self, content: str) -> Dict[str, str]:
         """提取 YAML frontmatter"""
         match = re.search(r'^---\s*\n(.*?)\n---', content, re.DOTALL)
@@ -769,84 +957,82 @@ class RealDataScanner:
         )
 
     def check_git_dirty(self, repo_path: Path) -> bool:
-        """檢查 Git 是否有未 commit 變更"""
-        import subprocess
-        try:
-            result = subprocess.run(
-                ["git", "status", "--porcelain"],
-                cwd=repo_path,
-                capture_output=True,
-                text=True
-            )
-            return bool(result.stdout.strip())
-        except:
-            return False
+        """檢查 Git 是否有未 commit 變更（受 repo 時間預算限制）"""
+        self.git.collect([repo_path], ("dirty",))
+        return self.git.get(repo_path, "dirty")
 
     def check_unpushed_commits(self, repo_path: Path) -> int:
         """檢查是否有未推送的 commits，回傳未推送的數量"""
-        import subprocess
-        try:
-            # 檢查是否有 remote
-            result = subprocess.run(
-                ["git", "remote"],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if not result.stdout.strip():
-                return 0  # 沒有 remote，不算 unpushed
-
-            # 檢查 local 是否領先 remote
-            result = subprocess.run(
-                ["git", "rev-list", "--count", "@{u}..HEAD"],
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return int(result.stdout.strip())
-        except:
-            return 0
+        self.git.collect([repo_path], ("unpushed",))
+        return self.git.get(repo_path, "unpushed")
+
+    def run_scan(self, close_cache: bool = True):
+        """執行完整掃描（close_cache=False 時保留快取，供之後的 refresh 使用）"""
+        with SCAN_SECONDS.time(kind="full"):
+            return self._run_scan(close_cache)
 
-    def run_scan(self):
-        """執行完整掃描"""
+    def _run_scan(self, close_cache: bool):
         print("🔍 開始掃描...")
+        reporter = progress.current()
+        reporter.plan(["walk", *SCAN_PHASES], weights=last_phase_seconds)
+
+        print("  → 更新位置索引...")
+        self.walk_filesystem()
+        walk_stats = self.data["scan_stats"]["walk"]
+        print(f"    索引 {walk_stats['dirs']} 個目錄，重新列出 {walk_stats['rescanned']} 個（{walk_stats['seconds']}s）")
 
         print("  → 掃描全域 Skills...")
-        self.scan_global_skills()
+        self._run_phase("global_skills")
 
         print("  → 掃描專案 Skills...")
-        self.scan_project_skills()
+        self._run_phase("project_skills")
 
         print("  → 掃描開發中 Skills...")
-        self.scan_dev_skills()
+        self._run_phase("dev_skills")
 
         print("  → 掃描開發專案...")
-        self.scan_dev_projects()
+        self._run_phase("dev_projects")
 
         print("  → 掃描全域 Rules...")
-        self.scan_global_rules()
+        self._run_phase("global_rules")
 
         print("  → 掃描專案 Rules...")
-        self.scan_project_rules()
+        self._run_phase("project_rules")
 
         print("  → 掃描 Agents...")
-        self.scan_agents()
+        self._run_phase("agents")
 
         print("  → 掃描 Commands...")
-        self.scan_commands()
+        self._run_phase("commands")
+
+        self.data["scan_stats"]["git"] = self.git.stats()
+        git_stats = self.data["scan_stats"]["git"]
+        print(f"    git 探測 {git_stats['repos']} 個 repo（{git_stats['seconds']}s，{git_stats['stale']} 個逾時）")
+        project_stats = self.data["scan_stats"].get("projects")
+        if project_stats:
+            print(f"    開發專案沿用 {project_stats['reused']} / {project_stats['total']}（指紋未變更）")
+
+        self.data["scan_stats"]["cache"] = self.cache.stats()
+        if close_cache:
+            self.cache.close(prune=True)
+        cache_stats = self.data["scan_stats"]["cache"]
+        if cache_stats["enabled"]:
+            print(f"    快取命中 {cache_stats['hits']} / {cache_stats['hits'] + cache_stats['misses']}")
 
         print("✓ 掃描完成！")
+        reporter.finish()
 
         return self.data
 
     def save_to_file(self, output_path: str):
-        """儲存到 JSON 檔案"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """儲存到單一 JSON 檔案（舊版格式）"""
+        self.save_output("single", output_file=Path(output_path))
 
-        print(f"💾 資料已儲存到: {output_path}")
+    def save_output(self, output_format: str = DEFAULT_OUTPUT_FORMAT, output_file: Path = DATA_FILE,
+                    shard_dir: Path = SHARD_DIR):
+        """依輸出格式儲存（sharded：分片 + manifest；single：單一檔案；both）"""
+        for path in save_scan_data(self.data, output_format, legacy_file=output_file, shard_dir=shard_dir):
+            print(f"💾 資料已儲存到: {path}")
 
     def print_summary(self):
         """印出摘要"""
@@ -861,6 +1047,9 @@ class RealDataScanner:
         print(f"專案 Rules:      {self.data['categories']['project_rules']['count']}")
         print(f"Agents:          {self.data['categories']['agents']['count']}")
         print(f"Commands:        {self.data['categories']['commands']['count']}")
+        walk_stats = self.data.get("scan_stats", {}).get("walk")
+        if walk_stats:
+            print(f"索引目錄:        {walk_stats['dirs']}（重新列出 {walk_stats['rescanned']}）")
         print("="*60)
 
         # Dev Projects 分類統計
@@ -886,15 +1075,65 @@ class RealDataScanner:
         print(f"  Execution Layer:")
         print(f"    - Workers:   {len(self.data['layers']['execution']['workers'])}")
 
-if __name__ == "__main__":
-    scanner = RealDataScanner()
-    data = scanner.run_scan()
+
+def run_full_scan(use_cache: bool = True, rebuild_cache: bool = False,
+                  git_workers: int = DEFAULT_WORKERS, git_timeout: float = DEFAULT_REPO_TIMEOUT,
+                  check_untracked: bool = True, untracked_budget: float = DEFAULT_UNTRACKED_BUDGET,
+                  rebuild_index: bool = False, output_file: Path = DATA_FILE,
+                  output_format: str = DEFAULT_OUTPUT_FORMAT, shard_dir: Path = SHARD_DIR) -> RealDataScanner:
+    """完整掃描並儲存資料檔（CLI 與程式內呼叫共用的入口）"""
+    index = LocationIndex(rebuild=rebuild_index)
+    scanner = RealDataScanner(
+        cache=ScanCache(enabled=use_cache, rebuild=rebuild_cache),
+        git=GitCollector(max_workers=git_workers, repo_timeout=git_timeout,
+                         check_untracked=check_untracked,
+                         untracked_budget=untracked_budget),
+        index=index
+    )
+    try:
+        scanner.run_scan()
+    finally:
+        index.close()
 
     # 儲存資料
-    output_file = Path(__file__).parent / "control-center-real-data.json"
-    scanner.save_to_file(str(output_file))
+    scanner.save_output(output_format, output_file=output_file, shard_dir=shard_dir)
+    return scanner
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - Real Data Scanner')
+    parser.add_argument('--no-cache', action='store_true', help='不使用掃描快取（全部重新解析）')
+    parser.add_argument('--rebuild-cache', action='store_true', help='清空並重建掃描快取')
+    parser.add_argument('--git-workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'git 探測並行數 (預設: {DEFAULT_WORKERS})')
+    parser.add_argument('--git-timeout', type=float, default=DEFAULT_REPO_TIMEOUT,
+                        help=f'每個 repo 的 git 探測時間預算秒數 (預設: {DEFAULT_REPO_TIMEOUT})')
+    parser.add_argument('--no-untracked', action='store_true', help='dirty 判斷不檢查 untracked 檔案')
+    parser.add_argument('--untracked-budget', type=float, default=DEFAULT_UNTRACKED_BUDGET,
+                        help=f'每個 repo 的 untracked 檔案走訪時間預算秒數 (預設: {DEFAULT_UNTRACKED_BUDGET})')
+    parser.add_argument('--rebuild-index', action='store_true', help='清空並重建 SKILL.md / .claude / .git 位置索引')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT,
+                        help=f'輸出格式：sharded（分片 + manifest）、single（舊版單一檔案）、both (預設: {DEFAULT_OUTPUT_FORMAT})')
+    args = parser.parse_args()
+
+    scanner = run_full_scan(
+        use_cache=not args.no_cache,
+        rebuild_cache=args.rebuild_cache,
+        git_workers=args.git_workers,
+        git_timeout=args.git_timeout,
+        check_untracked=not args.no_untracked,
+        untracked_budget=args.untracked_budget,
+        rebuild_index=args.rebuild_index,
+        output_format=args.output_format,
+    )
 
     # 印出摘要
     scanner.print_summary()
 
     print(f"\n✨ 下一步: 使用此資料生成視覺化 HTML")
+
+
+if __name__ == "__main__":
+    main()
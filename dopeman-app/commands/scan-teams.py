@@ -8,6 +8,8 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from git_reader import open_repo
+
 
 def is_team_structure(path):
     """
@@ -101,26 +103,21 @@ def extract_team_description(team_path):
 
 
 def check_github_repo(team_path):
-    """Check if team has a GitHub remote."""
-    team_path = Path(team_path)
-    git_config = team_path / ".git" / "config"
-
-    if not git_config.exists():
+    """Check if team has a GitHub remote (read from .git/config in-process)."""
+    repo = open_repo(Path(team_path))
+    if repo is None:
         return None
 
-    try:
-        with open(git_config, 'r') as f:
-            content = f.read()
+    # Prefer origin, then any other remote pointing at GitHub
+    urls = [repo.origin_url()] + [
+        values.get("url", "") for section, values in repo.config().items()
+        if section.startswith('remote "')
+    ]
+    for url in urls:
+        if url.startswith("https://github.com/"):
+            return url.replace('.git', '')
 
-        # Simple regex to find github URL
-        import re
-        match = re.search(r'url = (https://github\.com/[^\s]+)', content)
-        if match:
-            return match.group(1).replace('.git', '')
-
-        return None
-    except Exception:
-        return None
+    return None
 
 
 def scan_directory(base_path):
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Incremental Scan Cache
+持久化的掃描快取：以 (path, inode, mtime_ns, size) 判斷檔案是否變更，
+未變更的檔案直接沿用上次解析結果（frontmatter、描述、命令表格、README 摘要、技術棧）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import metrics
+
+# 路徑配置
+HOME = Path.home()
+MEMORY_DIR = HOME / ".claude" / "memory" / "dopeman"
+DEFAULT_CACHE_PATH = MEMORY_DIR / "scan-cache.sqlite"
+
+# 解析邏輯變更時遞增，舊快取會整個丟棄
+SCHEMA_VERSION = 1
+
+StatKey = Tuple[int, int, int]
+
+CACHE_LOOKUPS = metrics.counter("dopeman_scan_cache_lookups_total", "掃描快取查詢次數", ("result",))
+
+
+def _hit_ratio() -> float:
+    hits = CACHE_LOOKUPS.value(result="hit")
+    total = hits + CACHE_LOOKUPS.value(result="miss")
+    return hits / total if total else 0.0
+
+
+metrics.gauge("dopeman_scan_cache_hit_ratio", "掃描快取命中率（process 啟動以來）", callback=_hit_ratio)
+
+
+def stat_key(path: Path) -> Optional[StatKey]:
+    """取得 (inode, mtime_ns, size)，檔案不存在時回傳 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def fingerprint(paths: Iterable[Path]) -> str:
+    """多個檔案的 stat 指紋（不存在的檔案也會計入，出現或消失都會改變指紋）"""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(f"{path}\0{stat_key(path)}\n".encode('utf-8', errors='surrogateescape'))
+    return digest.hexdigest()
+
+
+def latest_mtime_ns(paths: Iterable[Path]) -> int:
+    """多個檔案中最新的 mtime（皆不存在時為 0）"""
+    return max((key[1] for key in map(stat_key, paths) if key), default=0)
+
+
+class ScanCache:
+    """SQLite 掃描快取
+
+    用法：
+        cache = ScanCache()
+        meta = cache.get_or_compute(skill_md, "skill_meta", lambda: parse(skill_md))
+        cache.close()
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_PATH, enabled: bool = True,
+                 rebuild: bool = False):
+        self.db_path = Path(db_path)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.seen = set()
+        self.lock = threading.Lock()
+        self.conn = None
+
+        if not self.enabled:
+            return
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_schema(rebuild)
+        except sqlite3.Error as e:
+            print(f"⚠️  無法開啟掃描快取，改為不使用快取: {e}")
+            self.conn = None
+            self.enabled = False
+
+    def _init_schema(self, rebuild: bool):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if rebuild or version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS entries")
+
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                path     TEXT NOT NULL,
+                kind     TEXT NOT NULL,
+                inode    INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size     INTEGER NOT NULL,
+                extra    TEXT NOT NULL DEFAULT '',
+                value    TEXT NOT NULL,
+                PRIMARY KEY (path, kind)
+            )
+        """)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def get(self, path: Path, kind: str, key: Optional[StatKey] = None,
+            extra: str = "") -> Tuple[bool, Any]:
+        """查詢快取，回傳 (是否命中, 值)"""
+        if not self.enabled:
+            return False, None
+
+        key = key if key is not None else stat_key(path)
+        if key is None:
+            return False, None
+
+        with self.lock:
+            self.seen.add((str(path), kind))
+            row = self.conn.execute(
+                "SELECT inode, mtime_ns, size, extra, value FROM entries WHERE path = ? AND kind = ?",
+                (str(path), kind)
+            ).fetchone()
+
+            if row and tuple(row[:3]) == key and row[3] == extra:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hit")
+                return True, json.loads(row[4])
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return False, None
+
+    def put(self, path: Path, kind: str, value: Any, key: Optional[StatKey] = None,
+            extra: str = ""):
+        """寫入快取（值需可 JSON 序列化）"""
+        if not self.enabled:
+            return
+
+        key = key if key is not None else stat_key(path)
+        if key is None:
+            return
+
+        with self.lock:
+            self.seen.add((str(path), kind))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (path, kind, inode, mtime_ns, size, extra, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(path), kind, key[0], key[1], key[2], extra,
+                 json.dumps(value, ensure_ascii=False))
+            )
+
+    def get_or_compute(self, path: Path, kind: str, compute: Callable[[], Any],
+                       extra: str = "") -> Any:
+        """命中則回傳快取值，否則執行 compute 並寫入快取
+
+        stat 只取一次：compute 期間檔案若被改動，下次掃描會因 mtime 不同而重新解析。
+        """
+        key = stat_key(path) if self.enabled else None
+        hit, value = self.get(path, kind, key=key, extra=extra)
+        if hit:
+            return value
+
+        value = compute()
+        if key is not None:
+            self.put(path, kind, value, key=key, extra=extra)
+        return value
+
+    def touch(self, path: Path, kind: str):
+        """標記項目為本次掃描仍在使用（沿用上層快取、未直接查詢的項目不會被 prune 刪除）"""
+        with self.lock:
+            self.seen.add((str(path), kind))
+
+    def prune_unseen(self) -> int:
+        """刪除本次掃描沒有查詢過的項目（檔案已刪除或已不在掃描範圍內）"""
+        if not self.enabled:
+            return 0
+
+        with self.lock:
+            rows = self.conn.execute("SELECT path, kind FROM entries").fetchall()
+            stale = [row for row in rows if (row[0], row[1]) not in self.seen]
+            self.conn.executemany("DELETE FROM entries WHERE path = ? AND kind = ?", stale)
+        return len(stale)
+
+    def commit(self):
+        """提交目前的寫入（常駐的掃描器每次掃描後呼叫，不長時間佔住寫入鎖）"""
+        if not self.conn:
+            return
+
+        with self.lock:
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """快取統計"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self, prune: bool = False):
+        """提交並關閉快取"""
+        if not self.conn:
+            return
+
+        if prune:
+            self.prune_unseen()
+
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+            self.enabled = False
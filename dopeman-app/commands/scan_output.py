@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Scan Output
+掃描結果的輸出格式：
+- sharded：每個類別（以及 layers、relationships）各一個分片檔，加上記錄各分片 hash / 數量的
+  manifest.json；內容未變的分片不重寫，Dashboard 只需重新下載 hash 改變的分片
+- single：舊版單一 control-center-real-data.json
+- both：兩者都寫
+所有檔案以暫存檔 + rename 原子寫入，讀取端不會讀到寫一半的內容
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from scan_cache import stat_key
+
+COMMANDS_DIR = Path(__file__).parent
+LEGACY_FILE = COMMANDS_DIR / "control-center-real-data.json"
+SHARD_DIR = COMMANDS_DIR / "scan-data"
+MANIFEST_NAME = "manifest.json"
+
+OUTPUT_FORMATS = ("sharded", "single", "both")
+DEFAULT_OUTPUT_FORMAT = "sharded"
+
+# 直接放在 manifest 中的小型欄位
+META_KEYS = ("version", "last_scan", "user_preferences", "scan_stats")
+
+# 類別以外的分片（data 頂層欄位）
+TOP_LEVEL_SHARDS = ("layers", "relationships")
+
+MANIFEST_FORMAT = 1
+
+
+def atomic_write(path: Path, payload: bytes):
+    """寫入同目錄的暫存檔後 rename 取代"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o644)  # mkstemp 預設 0600，靜態伺服器與其他使用者需可讀
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode('utf-8')
+
+
+def _shard_count(value: Any) -> int:
+    if isinstance(value, dict) and "count" in value:
+        return value["count"]
+    if isinstance(value, dict):
+        # layers：{層: {子層: [項目]}}
+        return sum(len(items) for layer in value.values() if isinstance(layer, dict)
+                   for items in layer.values() if isinstance(items, list))
+    return len(value) if isinstance(value, list) else 0
+
+
+def read_manifest(shard_dir: Path = SHARD_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((shard_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def write_shards(data: Dict[str, Any], shard_dir: Path = SHARD_DIR) -> Dict[str, Any]:
+    """寫出分片與 manifest，回傳 manifest（manifest["written"] 為本次實際重寫的分片）"""
+    previous = (read_manifest(shard_dir) or {}).get("shards", {})
+
+    shards = {name: ("category", value) for name, value in data.get("categories", {}).items()}
+    for name in TOP_LEVEL_SHARDS:
+        if name in data:
+            shards[name] = ("top", data[name])
+
+    entries = {}
+    written = []
+    for name, (kind, value) in shards.items():
+        payload = _encode(value)
+        digest = hashlib.sha256(payload).hexdigest()[:16]
+        filename = f"{name}.json"
+        old = previous.get(name)
+        if not old or old.get("hash") != digest or not (shard_dir / filename).exists():
+            atomic_write(shard_dir / filename, payload)
+            written.append(name)
+        entries[name] = {
+            "file": filename,
+            "kind": kind,
+            "hash": digest,
+            "count": _shard_count(value),
+            "bytes": len(payload),
+        }
+
+    # 已不存在的類別：移除分片檔
+    for name, old in previous.items():
+        if name not in entries:
+            try:
+                (shard_dir / old["file"]).unlink()
+            except OSError:
+                pass
+
+    manifest = {"format": MANIFEST_FORMAT, **{key: data.get(key) for key in META_KEYS}, "shards": entries}
+    # manifest 最後寫入：讀取端看到新 manifest 時分片已就緒
+    atomic_write(shard_dir / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+    manifest["written"] = written
+    return manifest
+
+
+def write_single(data: Dict[str, Any], path: Path = LEGACY_FILE):
+    """舊版單一檔案輸出"""
+    atomic_write(path, json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+def save_scan_data(data: Dict[str, Any], output_format: str = DEFAULT_OUTPUT_FORMAT,
+                   legacy_file: Path = LEGACY_FILE, shard_dir: Path = SHARD_DIR) -> List[Path]:
+    """依輸出格式儲存，回傳寫出的主要檔案（manifest 與 / 或單一檔案）"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"未知輸出格式: {output_format}")
+    outputs = []
+    if output_format in ("sharded", "both"):
+        write_shards(data, shard_dir)
+        outputs.append(shard_dir / MANIFEST_NAME)
+    if output_format in ("single", "both"):
+        write_single(data, legacy_file)
+        outputs.append(legacy_file)
+    if output_format == "single":
+        # 讀取端優先使用 manifest，只輸出單一檔案時移除舊的 manifest 以免讀到過期分片
+        try:
+            (shard_dir / MANIFEST_NAME).unlink()
+        except OSError:
+            pass
+    return outputs
+
+
+class ScanDataSource:
+    """讀取掃描結果：有 manifest 時組合分片，否則讀取舊版單一檔案
+
+    用法：
+        source = ScanDataSource()
+        if source.key() != last_key:
+            data = source.load()
+    """
+
+    def __init__(self, shard_dir: Path = SHARD_DIR, legacy_file: Path = LEGACY_FILE):
+        self.shard_dir = Path(shard_dir)
+        self.legacy_file = Path(legacy_file)
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.shard_dir / MANIFEST_NAME
+
+    def key(self):
+        """變動偵測用的 stat key（manifest 每次儲存都會重寫）"""
+        manifest_key = stat_key(self.manifest_file)
+        if manifest_key is not None:
+            return ("sharded", manifest_key)
+        return ("single", stat_key(self.legacy_file))
+
+    def load(self) -> Dict[str, Any]:
+        """完整的掃描結果（與舊版單一檔案相同結構）；沒有資料時回傳空 dict"""
+        manifest = read_manifest(self.shard_dir)
+        if manifest is None:
+            try:
+                return json.loads(self.legacy_file.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                return {}
+
+        data = {key: manifest.get(key) for key in META_KEYS}
+        data["categories"] = {}
+        for name, entry in manifest.get("shards", {}).items():
+            try:
+                value = json.loads((self.shard_dir / entry["file"]).read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            if entry.get("kind") == "category":
+                data["categories"][name] = value
+            else:
+                data[name] = value
+        return data
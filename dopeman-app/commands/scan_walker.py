@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Pruning Filesystem Walker
+單次走訪檔案系統：在進入目錄前先剪枝，並把 .claude / .git / SKILL.md 命中
+分派給所有有興趣的掃描階段
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# 不需要進入的目錄（依賴、虛擬環境、快取）
+DEFAULT_PRUNE_DIRS = {
+    "node_modules", ".venv", "venv", "vendor", "__pycache__",
+}
+
+# 命中後不再往下走的目錄（.git 內部只會有 objects / modules）
+DEFAULT_NO_DESCEND = {".git"}
+
+# ignore 判斷：(所在目錄相對於 root 的路徑, 名稱, 是否為目錄) → 是否略過；每個項目都會呼叫一次
+IgnoreFunc = Callable[[str, str, bool], bool]
+
+
+def dedupe_roots(roots: List[Path]) -> List[Path]:
+    """移除已被其他 root 涵蓋的 root（symlink root 仍需獨立走訪）"""
+    result = []
+    for root in roots:
+        if not root.is_dir():
+            continue
+        covered = False
+        if not root.is_symlink():
+            for other in roots:
+                if other is root or other == root:
+                    continue
+                if str(root).startswith(str(other) + os.sep):
+                    covered = True
+                    break
+        if not covered and root not in result:
+            result.append(root)
+    return result
+
+
+class ScanWalker:
+    """以 os.scandir 實作的剪枝走訪器
+
+    用法：
+        walker = ScanWalker([HOME])
+        walker.subscribe(".git", on_git_dir)
+        walker.subscribe("SKILL.md", on_skill_md)
+        walker.walk()
+    """
+
+    def __init__(self, roots: Iterable[Path],
+                 prune_dirs: Optional[Set[str]] = None,
+                 no_descend: Optional[Set[str]] = None,
+                 ignore: Optional[IgnoreFunc] = None):
+        self.roots = dedupe_roots([Path(r) for r in roots])
+        self.prune_dirs = set(DEFAULT_PRUNE_DIRS if prune_dirs is None else prune_dirs)
+        self.no_descend = set(DEFAULT_NO_DESCEND if no_descend is None else no_descend)
+        self.ignore = ignore
+        self.dir_handlers: Dict[str, List[Callable[[Path], None]]] = {}
+        self.file_handlers: Dict[str, List[Callable[[Path], None]]] = {}
+        self.entries_visited = 0
+        self.dirs_pruned = 0
+        self.stopped = False
+        self.timed_out = False
+
+    def subscribe(self, name: str, handler: Callable[[Path], None], is_dir: bool = True):
+        """註冊命中 handler（name 為目錄或檔案名稱）"""
+        handlers = self.dir_handlers if is_dir else self.file_handlers
+        handlers.setdefault(name, []).append(handler)
+
+    def stop(self):
+        """由 handler 呼叫，提前結束走訪"""
+        self.stopped = True
+
+    def walk(self, deadline: Optional[float] = None) -> int:
+        """走訪所有 roots，回傳拜訪的目錄項目數
+
+        deadline 為 time.monotonic() 的截止時間，超過時停止並設定 timed_out。
+        """
+        for root in self.roots:
+            self._walk_root(root, deadline)
+            if self.stopped:
+                break
+        return self.entries_visited
+
+    def _walk_root(self, root: Path, deadline: Optional[float]):
+        root_str = str(root)
+        stack = [root_str]
+        prefix_len = len(root_str) + 1
+
+        while stack and not self.stopped:
+            if deadline is not None and time.monotonic() > deadline:
+                self.timed_out = True
+                self.stopped = True
+                break
+
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except (PermissionError, FileNotFoundError, NotADirectoryError, OSError):
+                continue
+
+            rel_dir = current[prefix_len:]
+
+            for entry in entries:
+                if self.stopped:
+                    break
+                self.entries_visited += 1
+                name = entry.name
+
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if self.ignore and name not in self.no_descend and self.ignore(rel_dir, name, is_dir):
+                    if is_dir:
+                        self.dirs_pruned += 1
+                    continue
+
+                if is_dir:
+                    if name in self.prune_dirs:
+                        self.dirs_pruned += 1
+                        continue
+
+                    handlers = self.dir_handlers.get(name)
+                    if handlers:
+                        path = Path(entry.path)
+                        for handler in handlers:
+                            handler(path)
+
+                    if name not in self.no_descend:
+                        stack.append(entry.path)
+
+                else:
+                    handlers = self.file_handlers.get(name)
+                    if handlers and entry.is_file():
+                        path = Path(entry.path)
+                        for handler in handlers:
+                            handler(path)
+
+    def stats(self) -> Dict[str, int]:
+        """走訪統計"""
+        return {
+            "roots": len(self.roots),
+            "entries_visited": self.entries_visited,
+            "dirs_pruned": self.dirs_pruned,
+        }
+
+
+def split_nested(paths: Iterable[Path]) -> Tuple[List[Path], Dict[Path, List[Path]]]:
+    """把目錄分成最上層與巢狀兩類，回傳 (最上層目錄, {父目錄: [直接巢狀的子目錄]})
+
+    依路徑元件排序後，祖先必定排在子孫之前且子孫相鄰，
+    以堆疊維護目前的祖先鏈即可一次掃完：O(n log n)。
+    """
+    top_level: List[Path] = []
+    nested: Dict[Path, List[Path]] = {}
+    stack: List[Tuple[Path, Tuple[str, ...]]] = []
+
+    for path in sorted({Path(p) for p in paths}, key=lambda p: p.parts):
+        parts = path.parts
+        while stack and parts[:len(stack[-1][1])] != stack[-1][1]:
+            stack.pop()
+
+        if stack:
+            nested.setdefault(stack[-1][0], []).append(path)
+        else:
+            top_level.append(path)
+        stack.append((path, parts))
+
+    return top_level, nested
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Live Scan Watcher
+常駐監看 ~/.claude/skills、~/.claude/rules 與已知專案的 .claude/、.git/，
+檔案變更時只重跑受影響的掃描階段，並把各分類依穩定鍵比較出的新增 / 移除 / 更新項目推送給訂閱者。
+每次儲存後發佈唯讀快照（snapshot / version），同一 process 內的 API 可直接查詢記憶體模型；
+最近的 delta 保留在有上限的歷史中，落後的客戶端由此補上，落後太多時改取完整快照。
+Linux 使用 inotify（ctypes，無額外相依），其他平台或 inotify 不可用時改用輪詢
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import progress
+from location_index import AGENT_PROJECTS_DIR, CLAUDE_DIR, DEV_DIR, LocationIndex
+from scan_output import DEFAULT_OUTPUT_FORMAT, SHARD_DIR, ScanDataSource
+from task_runner import load_script
+
+DEFAULT_DEBOUNCE = 0.25
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DELTA_HISTORY = 32  # 保留的 delta 數（更落後的客戶端改取完整快照）
+
+# inotify 事件旗標（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# 會改變目錄結構的事件（需要更新位置索引）
+STRUCTURE_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# 各類監看目錄觸發的掃描階段
+GLOBAL_SKILL_PHASES = frozenset({"global_skills", "project_skills", "dev_skills", "commands"})
+GLOBAL_RULE_PHASES = frozenset({"global_rules"})
+PROJECT_PHASES = frozenset({"project_skills", "project_rules", "agents", "dev_skills"})
+REPO_PHASES = frozenset({"dev_projects", "dev_skills"})
+# 專案根目錄的其他檔案（README、manifest、untracked 檔案）只影響專案資訊與 dirty 狀態
+REPO_FILE_PHASES = frozenset({"dev_projects"})
+# 專案根目錄中會改變位置索引的名稱
+REPO_ROOT_NAMES = frozenset({".claude", ".git", "SKILL.md"})
+ALL_PHASES = GLOBAL_SKILL_PHASES | GLOBAL_RULE_PHASES | PROJECT_PHASES | REPO_PHASES
+
+# 分類項目的穩定鍵（用來比較新增 / 移除 / 更新的項目，客戶端依同樣的鍵套用 delta）
+ITEM_KEYS = {
+    "global_skills": ("id",),
+    "project_skills": ("project_path", "skill_path"),
+    "dev_skills": ("path",),
+    "dev_projects": ("path",),
+    "global_rules": ("path",),
+    "project_rules": ("project_path", "rule_path"),
+    "agents": ("path",),
+    "commands": ("full_command", "entry_skill"),
+}
+
+OnDelta = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WatchTarget:
+    """單一監看目錄：觸發的階段、所屬 repo、結構變更是否需要更新索引
+
+    names 有設定時只有這些名稱的事件觸發 phases 與 reindex，其他名稱只觸發 other_phases
+    """
+
+    __slots__ = ("phases", "repo_dir", "reindex", "names", "other_phases")
+
+    def __init__(self, phases: Iterable[str], repo_dir: Optional[Path] = None, reindex: bool = True,
+                 names: Optional[Iterable[str]] = None, other_phases: Iterable[str] = ()):
+        self.phases = set(phases)
+        self.repo_dir = repo_dir
+        self.reindex = reindex
+        self.names = set(names) if names is not None else None
+        self.other_phases = set(other_phases)
+
+    def match(self, name: str) -> Tuple[Set[str], bool]:
+        """事件名稱觸發的階段與是否需要更新索引"""
+        if self.names is None or not name or name in self.names:
+            return self.phases, self.reindex
+        return self.other_phases, False
+
+
+def watch_targets(scanner) -> Dict[str, WatchTarget]:
+    """依目前的掃描結果決定要監看的目錄"""
+    targets: Dict[str, WatchTarget] = {}
+
+    def add(path: Path, phases, repo_dir: Optional[Path] = None, reindex: bool = True,
+            names: Optional[Iterable[str]] = None, other_phases: Iterable[str] = ()):
+        if not path.is_dir():
+            return
+        key = str(path)
+        target = targets.get(key)
+        if target is None:
+            targets[key] = WatchTarget(phases, repo_dir, reindex, names, other_phases)
+        else:
+            target.phases |= set(phases)
+            target.repo_dir = target.repo_dir or repo_dir
+            target.reindex = target.reindex or reindex
+            # 任一來源不過濾名稱時，所有事件都觸發完整的階段
+            target.names = None if target.names is None or names is None else target.names | set(names)
+            target.other_phases |= set(other_phases)
+
+    def add_repo(repo_dir: Path, phases):
+        git_dir = repo_dir / ".git"
+        if not git_dir.is_dir():
+            return
+        # .git 內的 lock 檔、objects 變動不影響索引，只需作廢 git 探測結果
+        add(git_dir, phases, repo_dir, reindex=False)
+        add(git_dir / "refs" / "heads", phases, repo_dir, reindex=False)
+
+    # 全域 Skills：skills 目錄本身與每個 skill（symlink 解析後）的目錄
+    skills_dir = CLAUDE_DIR / "skills"
+    add(skills_dir, GLOBAL_SKILL_PHASES)
+    if skills_dir.is_dir():
+        for item in skills_dir.iterdir():
+            real_path = item.resolve()
+            add(real_path, GLOBAL_SKILL_PHASES, repo_dir=real_path if (real_path / ".git").is_dir() else None)
+            add_repo(real_path, GLOBAL_SKILL_PHASES)
+
+    add(CLAUDE_DIR / "rules", GLOBAL_RULE_PHASES, reindex=False)
+
+    # 專案 .claude：skills / rules / agents（agents 支援多層巢狀）
+    for claude_dir in scanner.project_claude_dirs:
+        add(claude_dir, PROJECT_PHASES)
+        add(claude_dir / "skills", PROJECT_PHASES)
+        add(claude_dir / "rules", PROJECT_PHASES)
+        for skill_md in scanner.claude_dir_skill_mds.get(str(claude_dir), []):
+            add(skill_md.parent, PROJECT_PHASES)
+        agents_dir = claude_dir / "agents"
+        if agents_dir.is_dir():
+            for current, dirnames, _ in os.walk(agents_dir):
+                add(Path(current), PROJECT_PHASES)
+
+    # 開發專案：專案根目錄（新增 / 刪除檔案）與 .git（commit、checkout、stage）
+    # 根目錄只有 .claude / .git / SKILL.md 與含有已索引項目的子目錄需要更新索引，
+    # 其他檔案（README、manifest、建置輸出、untracked 檔案）只重新探測該專案
+    root_names = {str(git_dir.parent): set(REPO_ROOT_NAMES) for git_dir in scanner.project_git_dirs}
+    for path in (*scanner.project_git_dirs, *scanner.project_claude_dirs, *scanner.skill_md_paths):
+        for parent in path.parents:
+            names = root_names.get(str(parent.parent))
+            if names is not None:
+                names.add(parent.name)
+    for git_dir in scanner.project_git_dirs:
+        repo_dir = git_dir.parent
+        add(repo_dir, REPO_PHASES | PROJECT_PHASES, repo_dir,
+            names=root_names[str(repo_dir)], other_phases=REPO_FILE_PHASES)
+        add_repo(repo_dir, REPO_PHASES)
+
+    # 新專案出現在 DEV / AgentProjects 下
+    for root in (DEV_DIR, AGENT_PROJECTS_DIR):
+        add(root, REPO_PHASES | PROJECT_PHASES)
+
+    return targets
+
+
+class InotifyWatcher:
+    """Linux inotify（透過 ctypes 呼叫 libc）"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        self.wd_paths: Dict[int, str] = {}
+        self.path_wds: Dict[str, int] = {}
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            return hasattr(libc, "inotify_init1")
+        except OSError:
+            return False
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add(self, path: str) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                print(f"⚠️  inotify 監看數已達上限（fs.inotify.max_user_watches），略過: {path}")
+            return False
+        self.wd_paths[wd] = path
+        self.path_wds[path] = wd
+        return True
+
+    def remove(self, path: str):
+        wd = self.path_wds.pop(path, None)
+        if wd is not None:
+            self.wd_paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def paths(self) -> Set[str]:
+        return set(self.path_wds)
+
+    def read_events(self) -> List[Tuple[str, str, int]]:
+        """讀取所有待處理事件，回傳 (監看目錄, 名稱, mask)"""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    events.append(("", "", mask))
+                    continue
+                path = self.wd_paths.get(wd)
+                if path is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # 目錄已刪除或監看已移除
+                    self.wd_paths.pop(wd, None)
+                    if self.path_wds.get(path) == wd:
+                        del self.path_wds[path]
+                    continue
+                events.append((path, name, mask))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """輪詢備援：定期比對各監看目錄的 scandir 快照"""
+
+    def __init__(self):
+        self.snapshots: Dict[str, Optional[Dict[str, Tuple[int, int, int]]]] = {}
+
+    @staticmethod
+    def snapshot(path: str) -> Optional[Dict[str, Tuple[int, int, int]]]:
+        entries = {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries[entry.name] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+        return entries
+
+    def add(self, path: str) -> bool:
+        self.snapshots[path] = self.snapshot(path)
+        return self.snapshots[path] is not None
+
+    def remove(self, path: str):
+        self.snapshots.pop(path, None)
+
+    def paths(self) -> Set[str]:
+        return set(self.snapshots)
+
+    def poll(self) -> List[Tuple[str, str, int]]:
+        """與上次快照比對，產生與 inotify 相同格式的事件"""
+        events = []
+        for path, before in list(self.snapshots.items()):
+            after = self.snapshot(path)
+            if after is None:
+                if before is not None:
+                    events.append((path, "", IN_DELETE_SELF))
+                    del self.snapshots[path]
+                continue
+            self.snapshots[path] = after
+            before = before or {}
+            for name, stat in after.items():
+                old = before.get(name)
+                if old is None:
+                    events.append((path, name, IN_CREATE))
+                elif old != stat:
+                    events.append((path, name, IN_CLOSE_WRITE))
+            for name in before.keys() - after.keys():
+                events.append((path, name, IN_DELETE))
+        return events
+
+    def close(self):
+        self.snapshots.clear()
+
+
+def load_scanner_class():
+    """載入 scan-real-data.py 的 RealDataScanner（與 task_runner 共用同一個模組）"""
+    return load_script("scan-real-data.py").RealDataScanner
+
+
+def item_key(category: str, item: Dict[str, Any]) -> str:
+    fields = ITEM_KEYS.get(category)
+    if fields is None:
+        return json.dumps(item, sort_keys=True)
+    return "\0".join(str(item.get(field)) for field in fields)
+
+
+def diff_items(category: str, before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, list]:
+    """依穩定鍵比較前後項目：新增與更新的項目（更新後的內容）、移除項目的鍵欄位"""
+    fields = ITEM_KEYS.get(category)
+    old = {item_key(category, item): item for item in before}
+    new = {item_key(category, item): item for item in after}
+    return {
+        "added": [item for key, item in new.items() if key not in old],
+        "removed": [{field: item.get(field) for field in fields} if fields else item
+                    for key, item in old.items() if key not in new],
+        "updated": [item for key, item in new.items() if key in old and old[key] != item],
+    }
+
+
+def patch_size(patch: Dict[str, list]) -> int:
+    return len(patch["added"]) + len(patch["removed"]) + len(patch["updated"])
+
+
+class LiveScanSource:
+    """以 LiveScan 的記憶體模型作為 StatusCache / ItemIndex 的資料來源（與 ScanDataSource 相同介面）；
+    初次掃描完成前改讀磁碟上的掃描結果"""
+
+    def __init__(self, live: "LiveScan", fallback: Optional[ScanDataSource] = None):
+        self.live = live
+        self.fallback = fallback or ScanDataSource(shard_dir=live.shard_dir, legacy_file=live.output_file)
+
+    def key(self):
+        if self.live.version:
+            return ("live", self.live.version)
+        return self.fallback.key()
+
+    def load(self) -> Dict[str, Any]:
+        return self.live.snapshot or self.fallback.load()
+
+
+class LiveScan:
+    """以檔案系統事件驅動的增量掃描
+
+    掃描器與其 SQLite 快取 / 索引都綁定在單一工作執行緒上；
+    asyncio 端只負責收集事件、防抖與推送。
+
+    用法：
+        live = LiveScan(output_file, on_delta=broadcast)
+        await live.start()
+        ...
+        await live.stop()
+    """
+
+    def __init__(self, output_file: Path, on_delta: Optional[OnDelta] = None,
+                 debounce: float = DEFAULT_DEBOUNCE, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 force_polling: bool = False, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                 shard_dir: Path = SHARD_DIR, delta_history: int = DEFAULT_DELTA_HISTORY):
+        self.output_file = Path(output_file)
+        self.output_format = output_format
+        self.shard_dir = Path(shard_dir)
+        self.on_delta = on_delta
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dopeman-live-scan")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.scanner = None
+        self.index: Optional[LocationIndex] = None
+        self.watcher = None
+        self.targets: Dict[str, WatchTarget] = {}
+        self.poll_task: Optional[asyncio.Task] = None
+
+        # 防抖期間累積的待處理變更
+        self.pending_phases: Set[str] = set()
+        self.pending_repos: Set[str] = set()
+        self.pending_reindex = False
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.flushing = False
+        self.refreshes = 0
+
+        # 最近一次儲存的模型快照（每次儲存 version + 1）與之後的 delta 歷史；
+        # epoch 區分不同次啟動的 version（伺服器重新啟動後客戶端的 version 不再適用）
+        self.snapshot: Dict[str, Any] = {}
+        self.version = 0
+        self.epoch = f"{time.time_ns():x}"
+        self.deltas: deque = deque(maxlen=delta_history)
+        self.model_lock = threading.Lock()
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if isinstance(self.watcher, InotifyWatcher) else "polling"
+
+    async def start(self):
+        """完整掃描一次建立模型，再開始監看"""
+        self.loop = asyncio.get_running_loop()
+        await self._run(self._initial_scan)
+
+        if not self.force_polling and InotifyWatcher.available():
+            try:
+                self.watcher = InotifyWatcher()
+            except OSError as e:
+                print(f"⚠️  inotify 無法使用（{e}），改用輪詢")
+        if self.watcher is None:
+            self.watcher = PollingWatcher()
+
+        await self._sync_watches()
+        if isinstance(self.watcher, InotifyWatcher):
+            self.loop.add_reader(self.watcher.fileno(), self._on_readable)
+        else:
+            self.poll_task = asyncio.create_task(self._poll_loop())
+        print(f"👀 即時監看已啟動（{self.backend}，{len(self.targets)} 個目錄）")
+
+    async def stop(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+        if self.poll_task:
+            self.poll_task.cancel()
+        if isinstance(self.watcher, InotifyWatcher):
+            self.loop.remove_reader(self.watcher.fileno())
+        if self.watcher:
+            self.watcher.close()
+        await self._run(self._close_scanner)
+        self.executor.shutdown(wait=False)
+
+    def _run(self, func, *args):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    async def rescan(self, reporter: Optional[progress.ProgressReporter] = None) -> Dict[str, Any]:
+        """重跑所有掃描階段（掃描任務使用，更新同一個記憶體模型），回傳 delta；
+        reporter 為呼叫端（TaskRunner）的進度 reporter"""
+        repos = {str(t.repo_dir) for t in self.targets.values() if t.repo_dir}
+        delta = await self._run(self._refresh, set(ALL_PHASES), repos, True, reporter)
+        self.refreshes += 1
+        if self.watcher:
+            await self._sync_watches()
+        if delta and self.on_delta:
+            await self.on_delta(delta)
+        return delta
+
+    def rescan_threadsafe(self) -> Dict[str, Any]:
+        """從其他執行緒（背景工作）呼叫 rescan 並等待結果"""
+        delta = asyncio.run_coroutine_threadsafe(self.rescan(progress.current()), self.loop).result()
+        data = self.snapshot
+        return {
+            "success": True,
+            "last_scan": data["last_scan"],
+            "counts": {name: category["count"] for name, category in data["categories"].items()},
+            "scan_stats": data.get("scan_stats"),
+            "changes": delta.get("changes", {}),
+            "mode": "live",
+        }
+
+    # ── 工作執行緒 ─────────────────────────────────────────
+
+    def _initial_scan(self):
+        scanner_class = load_scanner_class()
+        self.index = LocationIndex()
+        self.scanner = scanner_class(index=self.index)
+        self.scanner.run_scan(close_cache=False)
+        self.scanner.cache.commit()
+        self._save()
+
+    def _refresh(self, phases: Set[str], repo_dirs: Set[str], reindex: bool,
+                 reporter: Optional[progress.ProgressReporter] = None) -> Dict[str, Any]:
+        """重跑受影響的階段並依穩定鍵與之前的模型比較，回傳 delta（無變動時為空）；
+        變動的項目比整個分類還多（或沒有穩定鍵）時改送整個分類（items）"""
+        started = time.monotonic()
+        data = self.scanner.data
+        before_categories = {phase: data["categories"][phase]["items"] for phase in phases}
+        before_layers = json.dumps(data["layers"], sort_keys=True)
+
+        with progress.use(reporter):
+            try:
+                self.scanner.refresh(phases, repo_dirs=[Path(d) for d in repo_dirs], reindex=reindex)
+            finally:
+                self.scanner.cache.commit()
+
+        patches = {}
+        changes = {}
+        for phase in sorted(phases):
+            category = data["categories"][phase]
+            patch = diff_items(phase, before_categories[phase], category["items"])
+            size = patch_size(patch)
+            if not size:
+                continue
+            changes[phase] = {name: len(items) for name, items in patch.items()}
+            if phase in ITEM_KEYS and size < len(category["items"]):
+                patches[phase] = dict(patch, keys=ITEM_KEYS[phase], count=category["count"])
+            else:
+                patches[phase] = {"count": category["count"], "items": category["items"]}
+
+        layers_changed = json.dumps(data["layers"], sort_keys=True) != before_layers
+        if not patches and not layers_changed:
+            return {}
+
+        delta = {
+            "type": "scan_delta",
+            "last_scan": data["last_scan"],
+            "patches": patches,
+            "changes": changes,
+        }
+        if layers_changed:
+            delta["layers"] = data["layers"]
+        self._save(delta)
+        delta["seconds"] = round(time.monotonic() - started, 3)
+        return delta
+
+    def _save(self, delta: Optional[Dict[str, Any]] = None):
+        """只有內容改變的分片會重寫；同時發佈新的快照，delta 記上 version 並放入歷史"""
+        self.scanner.save_output(self.output_format, output_file=self.output_file, shard_dir=self.shard_dir)
+        # refresh() 以新的 dict / list 取代各類別與 layers 的內容，淺層複製即不會再被修改
+        data = self.scanner.data
+        snapshot = dict(
+            data,
+            categories=dict(data["categories"]),
+            layers={layer: dict(groups) for layer, groups in data.get("layers", {}).items()},
+        )
+        with self.model_lock:
+            self.snapshot = snapshot
+            self.version += 1
+            if delta is not None:
+                delta.update(epoch=self.epoch, base_version=self.version - 1, version=self.version)
+                self.deltas.append(delta)
+
+    def model(self) -> Tuple[str, int, Dict[str, Any]]:
+        """目前的 (epoch, version, 快照)（三者一致）"""
+        with self.model_lock:
+            return self.epoch, self.version, self.snapshot
+
+    def since(self, epoch: Optional[str], version: int) -> Optional[List[Dict[str, Any]]]:
+        """version 之後的 delta；epoch 不同（伺服器已重新啟動）或已超出保留的歷史時回傳 None"""
+        with self.model_lock:
+            if epoch != self.epoch or version > self.version:
+                return None
+            if version == self.version:
+                return []
+            if not self.deltas or self.deltas[0]["base_version"] > version:
+                return None
+            return [delta for delta in self.deltas if delta["version"] > version]
+
+    def _compute_targets(self) -> Dict[str, WatchTarget]:
+        self.scanner.ensure_walked()
+        return watch_targets(self.scanner)
+
+    def _close_scanner(self):
+        if self.scanner:
+            self.scanner.cache.close(prune=True)
+        if self.index:
+            self.index.close()
+
+    # ── 事件處理 ───────────────────────────────────────────
+
+    async def _sync_watches(self):
+        """依最新的掃描結果增減監看目錄"""
+        self.targets = await self._run(self._compute_targets)
+        current = self.watcher.paths()
+        for path in current - self.targets.keys():
+            self.watcher.remove(path)
+        for path in self.targets.keys() - current:
+            self.watcher.add(path)
+
+    def _on_readable(self):
+        self._handle_events(self.watcher.read_events())
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            events = await asyncio.to_thread(self.watcher.poll)
+            self._handle_events(events)
+
+    def _handle_events(self, events: List[Tuple[str, str, int]]):
+        for path, name, mask in events:
+            if mask & IN_Q_OVERFLOW:
+                # 事件遺失：全部重掃
+                self.pending_phases |= ALL_PHASES
+                self.pending_repos |= {str(t.repo_dir) for t in self.targets.values() if t.repo_dir}
+                self.pending_reindex = True
+                continue
+            if name.endswith(".lock"):
+                continue
+            target = self.targets.get(path)
+            if target is None:
+                continue
+            phases, reindex = target.match(name)
+            self.pending_phases |= phases
+            if target.repo_dir:
+                self.pending_repos.add(str(target.repo_dir))
+            if reindex and mask & STRUCTURE_MASK:
+                self.pending_reindex = True
+
+        if self.pending_phases and self.flush_handle is None and not self.flushing:
+            self.flush_handle = self.loop.call_later(self.debounce, self._start_flush)
+
+    def _start_flush(self):
+        self.flush_handle = None
+        asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        phases, self.pending_phases = self.pending_phases, set()
+        repos, self.pending_repos = self.pending_repos, set()
+        reindex, self.pending_reindex = self.pending_reindex, False
+
+        self.flushing = True
+        try:
+            delta = await self._run(self._refresh, phases, repos, reindex)
+            self.refreshes += 1
+            if reindex or "global_skills" in phases:
+                await self._sync_watches()
+            if delta:
+                summary = ", ".join(f"{name} +{c['added']}/-{c['removed']}/~{c['updated']}"
+                                    for name, c in delta["changes"].items()) or "layers"
+                print(f"🔄 增量更新（{delta['seconds']}s）: {summary}")
+                if self.on_delta:
+                    await self.on_delta(delta)
+        except Exception as e:
+            print(f"⚠️  增量更新失敗: {e}")
+        finally:
+            self.flushing = False
+            # 更新期間又有新事件
+            if self.pending_phases and self.flush_handle is None:
+                self.flush_handle = self.loop.call_later(self.debounce, self._start_flush)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Send Queue
+WebSocket 廣播的每客戶端送出佇列：每個客戶端有自己的有界佇列與寫入 task，慢速或半斷線的
+分頁只會卡住自己；同一任務的 progress 以最新的一則取代尚未送出的舊訊息，並依任務限制送出頻率；
+佇列持續滿載或單次送出卡住超過期限的客戶端會被中斷連線（重新連線後由 current_tasks 取得最新狀態）
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import metrics
+
+DEFAULT_MAX_QUEUE = 256
+DEFAULT_PROGRESS_RATE = 10.0   # 每個任務每秒最多送出幾則 progress（0 不限制）
+DEFAULT_SLOW_TIMEOUT = 5.0     # 佇列持續滿載 / 單次送出卡住幾秒後中斷連線
+OVERFLOW_FACTOR = 4            # 無 progress 可丟棄時佇列最多暫時超過上限幾倍，再多就立即中斷
+
+MESSAGES_SUPERSEDED = metrics.counter("dopeman_websocket_messages_superseded_total",
+                                      "被同任務較新的 progress 取代而未送出的訊息數", ("stage",))
+MESSAGES_DROPPED = metrics.counter("dopeman_websocket_messages_dropped_total", "佇列已滿而丟棄的 progress 數")
+SLOW_DISCONNECTS = metrics.counter("dopeman_websocket_slow_disconnects_total", "因送出過慢而中斷的客戶端數",
+                                   ("reason",))
+SEND_SECONDS = metrics.histogram("dopeman_websocket_send_seconds", "送出一則訊息給單一客戶端的時間（秒）")
+
+
+class ClientChannel:
+    """單一客戶端的送出佇列與寫入 task
+
+    佇列滿時丟棄最舊的 progress（之後還會有較新的）；其他訊息（task_completed、scan_delta 等）不丟棄，
+    暫時超過上限，持續滿載超過 slow_timeout 或超過上限 OVERFLOW_FACTOR 倍時中斷連線
+
+    用法：
+        channel = ClientChannel(websocket)
+        channel.start()
+        channel.send(text)                               # 依序送出
+        channel.send(text, key=("progress", task_id))    # 取代佇列中同 key 的舊訊息
+        await channel.stop()
+    """
+
+    def __init__(self, websocket, max_queue: int = DEFAULT_MAX_QUEUE,
+                 slow_timeout: float = DEFAULT_SLOW_TIMEOUT):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.slow_timeout = slow_timeout
+        self.queue: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.sequence = itertools.count()
+        self.ready = asyncio.Event()
+        self.full_since: Optional[float] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+
+    def start(self):
+        self.writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        self.closed = True
+        if self.writer:
+            self.writer.cancel()
+            try:
+                await self.writer
+            except asyncio.CancelledError:
+                pass
+
+    def send(self, message: str, key: Optional[Hashable] = None) -> bool:
+        """放入佇列（不等待送出）；已中斷時回傳 False"""
+        if self.closed:
+            return False
+        if key is not None and key in self.queue:
+            # 同 key 的舊訊息尚未送出：直接由最新的取代（移到最後）
+            del self.queue[key]
+            MESSAGES_SUPERSEDED.inc(stage="queue")
+        elif len(self.queue) >= self.max_queue:
+            now = time.monotonic()
+            if self.full_since is None:
+                self.full_since = now
+            elif now - self.full_since > self.slow_timeout:
+                self.disconnect("queue_full")
+                return False
+            if not self._drop_progress() and len(self.queue) >= self.max_queue * OVERFLOW_FACTOR:
+                self.disconnect("overflow")
+                return False
+        self.queue[key if key is not None else ("message", next(self.sequence))] = message
+        self.ready.set()
+        return True
+
+    def _drop_progress(self) -> bool:
+        """丟棄最舊的 progress，沒有可丟棄的時回傳 False"""
+        victim = next((key for key in self.queue if key[0] == "progress"), None)
+        if victim is None:
+            return False
+        del self.queue[victim]
+        MESSAGES_DROPPED.inc()
+        return True
+
+    async def _write_loop(self):
+        while not self.closed:
+            await self.ready.wait()
+            while self.queue and not self.closed:
+                _, message = self.queue.popitem(last=False)
+                if len(self.queue) < self.max_queue:
+                    self.full_since = None
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(self.websocket.send(message), self.slow_timeout)
+                except asyncio.TimeoutError:
+                    self.disconnect("send_timeout")
+                    return
+                except Exception:
+                    # 連線已關閉：由 handle_client 的 finally 移除
+                    self.closed = True
+                    return
+                SEND_SECONDS.observe(time.monotonic() - started)
+                self.sent += 1
+            self.ready.clear()
+
+    def disconnect(self, reason: str):
+        """中斷慢速客戶端（不做 close handshake，對方不讀取時 handshake 也會卡住）"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        SLOW_DISCONNECTS.inc(reason=reason)
+        address = getattr(self.websocket, "remote_address", None)
+        print(f"🐢 客戶端送出過慢，中斷連線 ({reason}, {address})")
+        transport = getattr(self.websocket, "transport", None)
+        if transport is not None:
+            transport.abort()
+
+
+class Broadcaster:
+    """把訊息放進所有客戶端的佇列：訊息只編碼一次；progress 依 task_id 限制頻率，
+    期間內較新的一則取代尚未送出的舊訊息，同任務的其他訊息（task_completed 等）送出前先送出待送的 progress
+
+    用法：
+        broadcaster = Broadcaster(progress_rate=10)
+        channel = broadcaster.add(websocket)
+        broadcaster.publish({"type": "progress", "task_id": ..., ...})
+        await broadcaster.remove(websocket)
+    """
+
+    def __init__(self, progress_rate: float = DEFAULT_PROGRESS_RATE, max_queue: int = DEFAULT_MAX_QUEUE,
+                 slow_timeout: float = DEFAULT_SLOW_TIMEOUT):
+        self.interval = 1.0 / progress_rate if progress_rate > 0 else 0.0
+        self.max_queue = max_queue
+        self.slow_timeout = slow_timeout
+        self.channels: Dict[Any, ClientChannel] = {}
+        # task_id → 上次送出 progress 的時間 / 等待送出的最新 progress 與其計時器
+        self.last_progress: Dict[str, float] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+
+    def add(self, websocket) -> ClientChannel:
+        channel = ClientChannel(websocket, self.max_queue, self.slow_timeout)
+        channel.start()
+        self.channels[websocket] = channel
+        return channel
+
+    async def remove(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel:
+            await channel.stop()
+
+    def publish(self, data: Dict[str, Any]):
+        """廣播一則訊息（不等待送出）"""
+        task_id = data.get("task_id")
+        if data.get("type") == "progress" and task_id is not None and self.interval:
+            now = time.monotonic()
+            wait = self.last_progress.get(task_id, 0.0) + self.interval - now
+            if wait > 0:
+                if task_id in self.pending:
+                    MESSAGES_SUPERSEDED.inc(stage="rate")
+                self.pending[task_id] = data
+                if task_id not in self.timers:
+                    loop = asyncio.get_running_loop()
+                    self.timers[task_id] = loop.call_later(wait, self._flush_pending, task_id)
+                return
+            self.last_progress[task_id] = now
+            self._fanout(data, ("progress", task_id))
+            return
+
+        if task_id is not None:
+            self._flush_pending(task_id)
+            if data.get("type") != "progress":
+                self.last_progress.pop(task_id, None)  # 任務已結束，不再需要
+        self._fanout(data, ("progress", task_id) if data.get("type") == "progress" else None)
+
+    def _flush_pending(self, task_id: str):
+        timer = self.timers.pop(task_id, None)
+        if timer:
+            timer.cancel()
+        data = self.pending.pop(task_id, None)
+        if data is not None:
+            self.last_progress[task_id] = time.monotonic()
+            self._fanout(data, ("progress", task_id))
+
+    def _fanout(self, data: Dict[str, Any], key: Optional[Hashable]):
+        message = json.dumps(data, ensure_ascii=False)
+        for channel in list(self.channels.values()):
+            channel.send(message, key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.channels),
+            "queued": sum(len(c.queue) for c in self.channels.values()),
+            "pending_progress": len(self.pending),
+            "progress_interval": self.interval,
+        }
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Single-Flight
+同一操作（例如 scan）已在執行時，新的請求等待並共用該次結果，不再重複執行；
+結束後 fresh_for 秒內的請求直接回傳上次結果。
+同一 process 內以 Event 等待；跨 process（api-server 與 websocket-server）以檔案鎖與結果檔協調
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows：只做 process 內的合併
+    fcntl = None
+
+from location_index import MEMORY_DIR, PREFERENCES_FILE
+
+DEFAULT_STATE_DIR = MEMORY_DIR / "single-flight"
+
+# 每種操作的預設策略：enabled 是否合併、fresh_for 結果沿用秒數
+DEFAULT_POLICIES = {
+    "scan": {"enabled": True, "fresh_for": 5.0},
+    "health-check": {"enabled": True, "fresh_for": 2.0},
+    "check": {"enabled": True, "fresh_for": 2.0},
+    "reload": {"enabled": True, "fresh_for": 0.0},
+    "update-data": {"enabled": True, "fresh_for": 60.0},
+    "fix": {"enabled": True, "fresh_for": 0.0},
+}
+
+
+def load_policies(pref_file: Path = PREFERENCES_FILE) -> Dict[str, Dict[str, Any]]:
+    """預設策略，再以 user-preferences.json 的 preferences.single_flight 覆寫"""
+    policies = {key: dict(policy) for key, policy in DEFAULT_POLICIES.items()}
+    try:
+        prefs = json.loads(pref_file.read_text(encoding='utf-8'))
+        overrides = prefs.get("preferences", {}).get("single_flight", {}) or {}
+    except (OSError, ValueError):
+        overrides = {}
+
+    for key, override in overrides.items():
+        if isinstance(override, dict):
+            policies.setdefault(key, {"enabled": True, "fresh_for": 0.0}).update(override)
+    return policies
+
+
+class _Flight:
+    """process 內進行中的一次執行"""
+
+    __slots__ = ("done", "result", "error", "finished_at")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """依操作名稱合併重複的昂貴請求
+
+    用法：
+        flights = SingleFlight()
+        result, info = flights.run("scan", do_scan)
+        # info["source"]: "run"（本次執行）/ "in-flight"（共用進行中的結果）/ "fresh"（沿用上次結果）
+    """
+
+    def __init__(self, state_dir: Path = DEFAULT_STATE_DIR,
+                 policies: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.state_dir = Path(state_dir)
+        self.policies = policies if policies is not None else load_policies()
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, _Flight] = {}
+        self.counts = {"run": 0, "in-flight": 0, "fresh": 0}
+
+    def policy(self, key: str) -> Dict[str, Any]:
+        return self.policies.get(key, {"enabled": False, "fresh_for": 0.0})
+
+    def run(self, key: str, func: Callable[[], Any],
+            keep: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, Dict[str, Any]]:
+        """執行（或共用）key 對應的操作，回傳 (結果, 來源資訊)
+
+        keep(result) 為 False 時結果不寫入結果檔（之後的請求不會沿用）。
+        """
+        policy = self.policy(key)
+        if not policy.get("enabled"):
+            return func(), {"source": "run", "shared": False}
+
+        requested_at = time.time()
+        fresh_for = float(policy.get("fresh_for", 0.0))
+
+        # 1. process 內：進行中則等待，否則成為 leader
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, self._info("in-flight", flight.finished_at)
+
+        # 2. 跨 process：取得檔案鎖（其他 process 執行中時在此等待）
+        try:
+            with self._file_lock(key):
+                shared = self._read_result(key)
+                if shared and shared["finished_at"] >= requested_at - fresh_for:
+                    # 在我們請求時仍在執行，或仍在 fresh 期間內
+                    source = "in-flight" if shared["finished_at"] >= requested_at else "fresh"
+                    flight.result, flight.finished_at = shared["result"], shared["finished_at"]
+                    return flight.result, self._info(source, flight.finished_at)
+
+                started_at = time.time()
+                flight.result = func()
+                flight.finished_at = time.time()
+                if keep is None or keep(flight.result):
+                    self._write_result(key, started_at, flight.finished_at, flight.result)
+                else:
+                    self._clear_result(key)
+                return flight.result, self._info("run", flight.finished_at)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.done.set()
+
+    def _info(self, source: str, finished_at: float) -> Dict[str, Any]:
+        with self.lock:
+            self.counts[source] += 1
+        return {
+            "source": source,
+            "shared": source != "run",
+            "age_seconds": round(max(0.0, time.time() - finished_at), 3),
+        }
+
+    def _file_lock(self, key: str):
+        return _FileLock(self.state_dir / f"{key}.lock")
+
+    def _result_path(self, key: str) -> Path:
+        return self.state_dir / f"{key}.result.json"
+
+    def _read_result(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._result_path(key).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, key: str, started_at: float, finished_at: float, result: Any):
+        """暫存檔 + rename，其他 process 不會讀到寫一半的結果"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        payload = {"key": key, "started_at": started_at, "finished_at": finished_at, "result": result}
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self._result_path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _clear_result(self, key: str):
+        try:
+            self._result_path(key).unlink()
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"counts": dict(self.counts), "in_flight": sorted(self.inflight)}
+
+
+class _FileLock:
+    """跨 process 的互斥鎖（flock；不支援的平台上不做任何事）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+        return False
@@ -62,7 +62,7 @@ fi
 chmod +x control-center-server.py websocket-server.py
 
 # 智能掃描（6 小時快取）
-DATA_FILE="control-center-real-data.json"
+DATA_FILE="scan-data/manifest.json"
 CACHE_HOURS=6
 
 if [ -f "$DATA_FILE" ]; then
@@ -85,8 +85,8 @@ echo ""
 
 cd "$COMMANDS_DIR"
 
-# 檢查資料檔案
-DATA_FILE="control-center-real-data.json"
+# 檢查資料檔案（分片輸出的 manifest 每次掃描都會重寫）
+DATA_FILE="scan-data/manifest.json"
 if [ ! -f "$DATA_FILE" ]; then
     echo -e "${YELLOW}⚠️  資料檔案不存在，執行掃描...${NC}"
     if [ -f "scan-real-data.py" ]; then
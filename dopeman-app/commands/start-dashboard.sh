@@ -63,8 +63,8 @@ if [ ! -f "control-center-real.html" ]; then
     exit 1
 fi
 
-if [ ! -f "control-center-real-data.json" ]; then
-    echo -e "${YELLOW}⚠️  找不到 control-center-real-data.json，執行掃描...${NC}"
+if [ ! -f "scan-data/manifest.json" ] && [ ! -f "control-center-real-data.json" ]; then
+    echo -e "${YELLOW}⚠️  找不到掃描資料（scan-data/manifest.json），執行掃描...${NC}"
     echo ""
 
     if [ -f "scan-real-data.py" ]; then
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Startup Timing
+伺服器啟動時間分解：直譯器啟動、import、初始化、socket bind，以及就緒後在背景進行的預熱
+（工具模組載入、掃描模型建立）。提供 /api/ready 的內容、就緒時寫入繼承的 fd 通知父程序，
+並把每次的結果附加到 startup-history.jsonl 以追蹤冷啟動退化
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from location_index import MEMORY_DIR
+
+HISTORY_FILE = MEMORY_DIR / "startup-history.jsonl"
+HISTORY_KEEP = 200
+
+# 父程序（Electron）spawn 當下的時間（epoch 毫秒），包含 spawn 本身的耗時
+SPAWNED_AT_ENV = "DOPEMAN_SPAWNED_AT"
+
+
+def process_started_at() -> Optional[float]:
+    """process 啟動時間（epoch 秒）：優先使用父程序提供的 spawn 時間，其次 Linux /proc；無法取得時為 None"""
+    spawned_at = os.environ.get(SPAWNED_AT_ENV)
+    if spawned_at:
+        try:
+            return float(spawned_at) / 1000
+        except ValueError:
+            pass
+    try:
+        # /proc/self/stat 第 22 欄：開機後的 clock ticks（process 名稱可能含空白，從最後的 ")" 之後切）
+        fields = Path("/proc/self/stat").read_text().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimer:
+    """啟動各階段耗時
+
+    用法（腳本最上方先記錄 STARTED_AT = time.time()，再 import 其他模組）：
+        timer = StartupTimer("api-server", STARTED_AT)   # 記錄 imports
+        ...                                               # timer.mark("init") / timer.mark("bind")
+        timer.warming("tasks", "model")                   # 就緒後仍在背景進行的階段
+        timer.set_ready(ready_fd)                         # 可接受連線
+        timer.warm("tasks", runner.warm_up)               # 全部預熱完成時寫入歷史
+    """
+
+    def __init__(self, server: str, script_started_at: float, history_file: Optional[Path] = HISTORY_FILE):
+        self.server = server
+        self.history_file = history_file
+        self.lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        self.warm_phases: Dict[str, float] = {}
+        self.pending_warm: set = set()
+
+        self.process_started_at = process_started_at()
+        if self.process_started_at is not None:
+            self.phases["interpreter"] = max(0.0, script_started_at - self.process_started_at)
+        self.origin = self.process_started_at or script_started_at
+        self.last = script_started_at
+        self.ready_at: Optional[float] = None
+        self.warm_at: Optional[float] = None
+        self.mark("imports")
+
+    def mark(self, phase: str):
+        """記錄自上一個階段結束到現在的耗時"""
+        now = time.time()
+        with self.lock:
+            self.phases[phase] = now - self.last
+            self.last = now
+
+    def set_ready(self, ready_fd: Optional[int] = None, **extra: Any):
+        """開始接受連線；有 ready_fd 時寫入一行 JSON 通知後關閉"""
+        with self.lock:
+            self.ready_at = time.time()
+            if not self.pending_warm and self.warm_at is None:
+                self.warm_at = self.ready_at
+        if ready_fd is not None:
+            line = json.dumps(dict(self.report(), **extra), ensure_ascii=False) + "\n"
+            try:
+                os.write(ready_fd, line.encode("utf-8"))
+                os.close(ready_fd)
+            except OSError as e:
+                print(f"⚠️  無法寫入就緒通知 fd {ready_fd}: {e}")
+
+    def warm(self, name: str, func, *args):
+        """執行一個預熱階段並記錄耗時"""
+        started = time.time()
+        try:
+            return func(*args)
+        finally:
+            self.warmed(name, time.time() - started)
+
+    def warming(self, *names: str):
+        """宣告就緒後仍在背景進行的預熱階段"""
+        with self.lock:
+            self.pending_warm.update(names)
+            self.warm_at = None
+
+    def warmed(self, name: str, seconds: float):
+        with self.lock:
+            self.warm_phases[name] = seconds
+            self.pending_warm.discard(name)
+            finished = not self.pending_warm and self.warm_at is None
+            if finished:
+                self.warm_at = time.time()
+        if finished:
+            self._append_history()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready_at is not None
+
+    @property
+    def is_warm(self) -> bool:
+        return self.warm_at is not None
+
+    def report(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        with self.lock:
+            return {
+                "server": self.server,
+                "pid": os.getpid(),
+                "ready": self.ready_at is not None,
+                "warm": self.warm_at is not None,
+                "warming": sorted(self.pending_warm),
+                "ready_ms": ms(self.ready_at and self.ready_at - self.origin),
+                "warm_ms": ms(self.warm_at and self.warm_at - self.origin),
+                "phases_ms": {name: ms(seconds) for name, seconds in self.phases.items()},
+                "warm_phases_ms": {name: ms(seconds) for name, seconds in self.warm_phases.items()},
+                "measured_from": "process" if self.process_started_at is not None else "script",
+            }
+
+    def describe(self) -> str:
+        """一行的啟動摘要（印在啟動訊息中）"""
+        report = self.report()
+        phases = " / ".join(f"{name} {value:.0f}" for name, value in report["phases_ms"].items())
+        return f"⏱️  啟動 {report['ready_ms']:.0f} ms（{phases} ms）"
+
+    def _append_history(self):
+        """附加到歷史檔（超過 HISTORY_KEEP 筆時只保留最新的）"""
+        if self.history_file is None:
+            return
+        entry = dict(self.report(), at=datetime.now().isoformat())
+        try:
+            self.history_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            lines = self.history_file.read_text(encoding="utf-8").splitlines()
+            if len(lines) > HISTORY_KEEP:
+                self.history_file.write_text("\n".join(lines[-HISTORY_KEEP:]) + "\n", encoding="utf-8")
+        except OSError as e:
+            print(f"⚠️  無法寫入啟動歷史: {e}")
+
+
+def load_history(history_file: Path = HISTORY_FILE, server: Optional[str] = None) -> list:
+    """讀取啟動歷史（可依伺服器名稱篩選），由舊到新"""
+    try:
+        lines = history_file.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if server is None or entry.get("server") == server:
+            entries.append(entry)
+    return entries
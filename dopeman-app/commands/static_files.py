@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Static Files
+Dashboard 靜態檔案（HTML、css/js、掃描結果 JSON）的快速路徑：
+強 ETag 與 If-None-Match / If-Modified-Since（304）、依 Accept-Encoding 選用預先壓縮的
+.br / .gz 檔（沒有時即時 gzip 並快取）、大檔以 sendfile 傳送、支援單一 byte range
+"""
+
+import email.utils
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # 沒有 brotli 時只使用預先壓縮的 .br 檔
+    brotli = None
+
+# 可壓縮的 Content-Type 前綴
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# 小於此大小不壓縮（壓縮省下的位元組不及額外成本）
+MIN_COMPRESS_SIZE = 1024
+
+# 即時壓縮結果的記憶體快取上限（位元組）
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+# 大於此大小的未壓縮內容以 sendfile 傳送
+SENDFILE_THRESHOLD = 64 * 1024
+
+# 預先壓縮的副檔案：Content-Encoding → 副檔名
+SIDECARS = (("br", ".br"), ("gzip", ".gz"))
+
+# --precompress 預設處理的副檔名
+PRECOMPRESS_SUFFIXES = (".html", ".css", ".js", ".json", ".svg")
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """解析 Accept-Encoding → {編碼: q 值}（q=0 的排除）"""
+    encodings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            encodings[name] = q
+    return encodings
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析單一 bytes range → (start, end)（含 end）；格式不支援回傳 None，無法滿足回傳 (size, size)"""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return size, size
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return size, size
+    return start, min(end, size - 1)
+
+
+class StaticFiles:
+    """靜態檔案回應（搭配 SimpleHTTPRequestHandler 使用）
+
+    用法：
+        static = StaticFiles()
+        if not static.serve(handler, head=False):   # 在 do_GET / do_HEAD 中呼叫
+            super().do_GET()                         # 目錄或找不到的檔案
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.cache_bytes = cache_bytes
+        self.lock = threading.Lock()
+        # (路徑, 編碼, mtime_ns, size) → 壓縮後內容
+        self.cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self.cached_bytes = 0
+        self.counts = {"200": 0, "206": 0, "304": 0, "416": 0, "sidecar": 0, "compressed": 0, "sendfile": 0}
+
+    def serve(self, handler, head: bool = False) -> bool:
+        """回應目前請求；目錄或找不到的檔案回傳 False（交回 SimpleHTTPRequestHandler 處理）"""
+        path = Path(handler.translate_path(handler.path))
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        if not path.is_file():
+            return False
+        self._respond(handler, path, st, head)
+        return True
+
+    def _respond(self, handler, path: Path, st, head: bool):
+        content_type = handler.guess_type(str(path))
+        etag = f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+        encoding, body_path = self._select_encoding(handler, path, st, content_type)
+        if encoding:
+            etag = etag[:-1] + f'-{encoding}"'
+
+        headers = {
+            "Content-Type": content_type,
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes",
+        }
+
+        if self._not_modified(handler, etag, st.st_mtime):
+            self._count("304")
+            handler.send_response(304)
+            self._send_headers(handler, headers)
+            return
+
+        if encoding:
+            # 沒有預先壓縮檔時才即時壓縮（304 不需壓縮）
+            body = self._compressed(path, st, encoding) if body_path is None else None
+            headers["Content-Encoding"] = encoding
+            size = len(body) if body is not None else body_path.stat().st_size
+            self._count("200")
+            handler.send_response(200)
+            headers["Content-Length"] = str(size)
+            self._send_headers(handler, headers)
+            if not head:
+                if body is not None:
+                    handler.wfile.write(body)
+                else:
+                    self._send_file(handler, body_path, 0, size)
+            return
+
+        size = st.st_size
+        start, end = 0, size - 1
+        status = 200
+        range_header = handler.headers.get("Range")
+        if range_header and size and self._if_range_matches(handler, etag, last_modified):
+            byte_range = parse_range(range_header, size)
+            if byte_range == (size, size):
+                self._count("416")
+                handler.send_response(416)
+                headers["Content-Range"] = f"bytes */{size}"
+                headers["Content-Length"] = "0"
+                self._send_headers(handler, headers)
+                return
+            if byte_range:
+                start, end = byte_range
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        length = end - start + 1 if size else 0
+        self._count(str(status))
+        handler.send_response(status)
+        headers["Content-Length"] = str(length)
+        self._send_headers(handler, headers)
+        if not head and length:
+            self._send_file(handler, path, start, length)
+
+    def _select_encoding(self, handler, path: Path, st, content_type: str):
+        """依 Accept-Encoding 選擇 (編碼, 預先壓縮檔)；不壓縮時編碼為 None，需即時壓縮時檔案為 None"""
+        if handler.headers.get("Range") or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return None, path
+        if st.st_size < MIN_COMPRESS_SIZE:
+            return None, path
+        accepted = accepted_encodings(handler.headers.get("Accept-Encoding"))
+        if not accepted:
+            return None, path
+
+        # 1. 預先壓縮的副檔案（需比原檔新）
+        for encoding, suffix in SIDECARS:
+            if encoding not in accepted:
+                continue
+            sidecar = path.with_name(path.name + suffix)
+            try:
+                if sidecar.stat().st_mtime_ns >= st.st_mtime_ns:
+                    self._count("sidecar")
+                    return encoding, sidecar
+            except OSError:
+                continue
+
+        # 2. 即時壓縮（依 mtime / size 快取）
+        if brotli is not None and "br" in accepted:
+            return "br", None
+        if "gzip" in accepted:
+            return "gzip", None
+        return None, path
+
+    def _compressed(self, path: Path, st, encoding: str) -> bytes:
+        key = (str(path), encoding, st.st_mtime_ns, st.st_size)
+        with self.lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                return body
+
+        raw = path.read_bytes()
+        body = brotli.compress(raw) if encoding == "br" else gzip.compress(raw, compresslevel=6, mtime=0)
+        self._count("compressed")
+
+        with self.lock:
+            if key not in self.cache:
+                self.cache[key] = body
+                self.cached_bytes += len(body)
+            while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cached_bytes -= len(evicted)
+        return body
+
+    @staticmethod
+    def _not_modified(handler, etag: str, mtime: float) -> bool:
+        """If-None-Match 優先；沒有時才看 If-Modified-Since"""
+        if_none_match = handler.headers.get("If-None-Match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # 比對時忽略弱標記 W/（If-None-Match 使用弱比較）
+            return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+        if_modified_since = handler.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    @staticmethod
+    def _if_range_matches(handler, etag: str, last_modified: str) -> bool:
+        """If-Range 不相符時忽略 Range，回傳完整內容"""
+        if_range = handler.headers.get("If-Range")
+        return not if_range or if_range.strip() in (etag, last_modified)
+
+    @staticmethod
+    def _send_headers(handler, headers: Dict[str, str]):
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_cors_headers()
+        handler.end_headers()
+
+    def _send_file(self, handler, path: Path, offset: int, count: int):
+        with open(path, "rb") as f:
+            if count >= SENDFILE_THRESHOLD:
+                # socket.sendfile 在支援的平台使用 os.sendfile（零複製），否則自動改用 send
+                self._count("sendfile")
+                handler.wfile.flush()
+                handler.connection.sendfile(f, offset, count)
+            else:
+                f.seek(offset)
+                handler.wfile.write(f.read(count))
+
+    def _count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self.lock:
+            return {"counts": dict(self.counts), "cache_entries": len(self.cache), "cache_bytes": self.cached_bytes}
+
+
+def precompress(root: Path, suffixes=PRECOMPRESS_SUFFIXES) -> List[Path]:
+    """為 root 下的靜態資源產生 .gz（有 brotli 時另產生 .br）副檔案，只更新過期的"""
+    written = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".") and d != "node_modules"]
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            if path.suffix not in suffixes:
+                continue
+            st = path.stat()
+            if st.st_size < MIN_COMPRESS_SIZE:
+                continue
+            for encoding, suffix in SIDECARS:
+                if encoding == "br" and brotli is None:
+                    continue
+                sidecar = path.with_name(path.name + suffix)
+                if sidecar.exists() and sidecar.stat().st_mtime_ns >= st.st_mtime_ns:
+                    continue
+                raw = path.read_bytes()
+                body = brotli.compress(raw) if encoding == "br" else gzip.compress(raw, compresslevel=9, mtime=0)
+                sidecar.write_bytes(body)
+                written.append(sidecar)
+    return written
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DopeMAN - 預先壓縮 Dashboard 靜態資源')
+    parser.add_argument('--root', type=Path, default=Path(__file__).parent, help='資源目錄 (預設: commands/)')
+    args = parser.parse_args()
+
+    written = precompress(args.root)
+    for path in written:
+        print(f"🗜️  {path.relative_to(args.root)}")
+    print(f"✅ 產生 {len(written)} 個壓縮檔" + ("" if brotli else "（未安裝 brotli，只產生 .gz）"))
+
+
+if __name__ == "__main__":
+    main()
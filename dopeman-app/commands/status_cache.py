@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Status Cache
+/api/status 的快取快照：~/.claude/skills 目錄或掃描結果（manifest / 舊版單一檔案）的 mtime 變動時才重建，
+其餘請求只需 stat 兩個路徑；內容不變時 ETag 不變，輪詢端可取得 304
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from location_index import CLAUDE_DIR
+from scan_output import ScanDataSource
+
+SKILLS_DIR = CLAUDE_DIR / "skills"
+
+# 即使 mtime 未變也重建的間隔（symlink 目標被刪除不會改變 skills 目錄的 mtime）
+DEFAULT_MAX_AGE = 30.0
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class StatusCache:
+    """系統狀態快照
+
+    用法：
+        cache = StatusCache()
+        status, etag = cache.get()
+    """
+
+    def __init__(self, skills_dir: Path = SKILLS_DIR, source: Optional[ScanDataSource] = None,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.skills_dir = skills_dir
+        self.source = source or ScanDataSource()
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.key = None
+        self.built_at = 0.0
+        self.status: Dict[str, Any] = {}
+        self.etag = ""
+        self.builds = 0
+
+    def get(self) -> Tuple[Dict[str, Any], str]:
+        """回傳 (狀態, ETag)；狀態不含每次都會變的 last_scan_age_seconds"""
+        key = (_stat_key(self.skills_dir), self.source.key())
+        with self.lock:
+            if key != self.key or time.monotonic() - self.built_at > self.max_age:
+                status = self._build()
+                body = json.dumps(status, sort_keys=True, ensure_ascii=False).encode('utf-8')
+                self.status = status
+                self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                self.key = key
+                self.built_at = time.monotonic()
+                self.builds += 1
+            return self.status, self.etag
+
+    def _build(self) -> Dict[str, Any]:
+        skills_count = 0
+        broken_count = 0
+        if self.skills_dir.exists():
+            for item in self.skills_dir.iterdir():
+                if item.is_symlink():
+                    skills_count += 1
+                    if not item.resolve().exists():
+                        broken_count += 1
+
+        status = {
+            'skills_count': skills_count,
+            'broken_count': broken_count,
+            'healthy': broken_count == 0,
+            'last_scan': None,
+            'counts': {},
+        }
+
+        data = self.source.load()
+        if not data:
+            return status
+
+        categories = data.get('categories', {})
+
+        def items(name):
+            return categories.get(name, {}).get('items', [])
+
+        def count(name):
+            return categories.get(name, {}).get('count', 0)
+
+        status['last_scan'] = data.get('last_scan')
+        status['counts'] = {
+            'skills': count('global_skills'),
+            'project_skills': count('project_skills'),
+            'dev_skills': count('dev_skills'),
+            'rules': count('global_rules') + count('project_rules'),
+            'agents': count('agents'),
+            'commands': count('commands'),
+            'projects': count('dev_projects'),
+            'dirty_projects': sum(1 for p in items('dev_projects') if p.get('is_dirty')),
+            'dirty_skills': sum(1 for s in items('dev_skills') if s.get('dirty')),
+        }
+        return status
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"builds": self.builds, "etag": self.etag}
+
+
+def last_scan_age(last_scan: Optional[str]) -> Optional[float]:
+    """距離上次掃描的秒數"""
+    if not last_scan:
+        return None
+    try:
+        return round((datetime.now() - datetime.fromisoformat(last_scan)).total_seconds(), 1)
+    except ValueError:
+        return None
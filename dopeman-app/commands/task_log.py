@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Task Log
+WebSocket 任務事件的記錄：每個事件（task_queued、progress、task_completed…）有遞增的序號 seq，
+保留在有上限的環形緩衝（同一任務的 progress 只留最新一則）並附加到 task-log.jsonl（超過大小時輪替）。
+任務狀態由事件推導，只保留最近的已結束任務；伺服器重新啟動時由記錄檔重建，
+重新連線的客戶端以 since=<seq> 只取得錯過的事件
+"""
+
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional
+
+import metrics
+from location_index import MEMORY_DIR
+
+LOG_FILE = MEMORY_DIR / "task-log.jsonl"
+
+DEFAULT_CAPACITY = 1000          # 環形緩衝保留的事件數
+DEFAULT_MAX_TASKS = 200          # 保留的任務數（執行中的不移除）
+DEFAULT_MAX_BYTES = 1024 * 1024  # 記錄檔超過此大小時輪替
+DEFAULT_BACKUPS = 3              # 輪替保留的舊檔數（task-log.jsonl.1 ~ .3）
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = {"task_completed": "completed", "task_failed": "failed", "task_cancelled": "cancelled"}
+
+EVENTS_RECORDED = metrics.counter("dopeman_task_log_events_total", "記錄的任務事件數", ("type",))
+LOG_ROTATIONS = metrics.counter("dopeman_task_log_rotations_total", "任務記錄檔輪替次數")
+
+
+class TaskLog:
+    """任務事件記錄與任務狀態
+
+    用法：
+        log = TaskLog(LOG_FILE)
+        log.load()
+        log.track(task_id, "scan", status="queued")
+        log.record({"type": "progress", "task_id": task_id, "progress": 10})   # 加上 seq
+        log.since(120)      # seq 120 之後的事件；已不完整時為 None（改送 snapshot）
+        log.snapshot()
+    """
+
+    def __init__(self, path: Optional[Path] = LOG_FILE, capacity: int = DEFAULT_CAPACITY,
+                 max_tasks: int = DEFAULT_MAX_TASKS, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backups: int = DEFAULT_BACKUPS):
+        self.path = Path(path) if path else None
+        self.capacity = capacity
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.seq = 0
+        # 事件依 seq 排列；progress 以 ("progress", task_id) 為 key，新的一則取代舊的並移到最後
+        self.events: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        # 因超過容量而移除的最大 seq（since 小於此值時事件已不完整）
+        self.trimmed = 0
+        self.tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.file = None
+        self.size = 0
+
+    # ── 記錄 ─────────────────────────────────────────────
+
+    def track(self, task_id: str, task_type: str, **fields: Any):
+        """登記任務（之後的事件更新其狀態）"""
+        task = self.tasks.setdefault(task_id, {"type": task_type, "status": "queued", "progress": 0})
+        task.update(fields)
+        self._evict_tasks()
+
+    def record(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """指派 seq 與 timestamp、更新任務狀態、放入環形緩衝並附加到記錄檔（直接修改並回傳 event）"""
+        self.seq += 1
+        event["seq"] = self.seq
+        event.setdefault("timestamp", datetime.now().isoformat())
+        self._apply(event)
+        self._append(event)
+        EVENTS_RECORDED.inc(type=event.get("type", "unknown"))
+        self._write(event)
+        return event
+
+    def _append(self, event: Dict[str, Any]):
+        key = ("progress", event["task_id"]) if event.get("type") == "progress" else event["seq"]
+        self.events.pop(key, None)
+        self.events[key] = event
+        while len(self.events) > self.capacity:
+            _, dropped = self.events.popitem(last=False)
+            self.trimmed = max(self.trimmed, dropped["seq"])
+
+    def _apply(self, event: Dict[str, Any]):
+        """依事件更新任務狀態"""
+        task_id = event["task_id"]
+        task = self.tasks.get(task_id)
+        if task is None:
+            task = self.tasks[task_id] = {"type": event.get("task_type"), "status": "queued", "progress": 0}
+        kind = event.get("type")
+        if kind == "task_queued":
+            task.update(status="queued", position=event.get("position"), priority=event.get("priority"))
+            task.setdefault("queued_at", event["timestamp"])
+        elif kind == "progress":
+            if task["status"] == "queued":
+                task.update(status="running", position=None, started_at=event["timestamp"])
+            task.update(progress=event.get("progress", task["progress"]), message=event.get("message"),
+                        phase=event.get("phase"), eta=event.get("eta"))
+        elif kind in FINISHED_STATUSES:
+            task.update(status=FINISHED_STATUSES[kind], position=None, completed_at=event["timestamp"])
+            if kind == "task_completed":
+                task["progress"] = 100
+            if event.get("error"):
+                task["error"] = event["error"]
+        task["seq"] = event["seq"]
+        self._evict_tasks()
+
+    def _evict_tasks(self):
+        """只保留最近 max_tasks 個任務（排隊中 / 執行中的不移除）"""
+        excess = len(self.tasks) - self.max_tasks
+        if excess <= 0:
+            return
+        for task_id in [t for t, task in self.tasks.items() if task["status"] not in ACTIVE_STATUSES][:excess]:
+            del self.tasks[task_id]
+
+    # ── 查詢 ─────────────────────────────────────────────
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """seq 之後的事件（同一任務的 progress 只有最新一則）；
+        其間有事件已超過容量被移除，或 seq 比目前還新（記錄已重建）時回傳 None"""
+        if seq < self.trimmed or seq > self.seq:
+            return None
+        events = []
+        for event in reversed(self.events.values()):
+            if event["seq"] <= seq:
+                break
+            events.append(event)
+        events.reverse()
+        return events
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "tasks": self.tasks}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "events": len(self.events),
+            "capacity": self.capacity,
+            "trimmed": self.trimmed,
+            "tasks": len(self.tasks),
+            "file": str(self.path) if self.path else None,
+            "file_bytes": self.size,
+        }
+
+    # ── 記錄檔 ───────────────────────────────────────────
+
+    def _files(self) -> List[Path]:
+        """記錄檔（由舊到新）"""
+        return [Path(f"{self.path}.{i}") for i in range(self.backups, 0, -1)] + [self.path]
+
+    def load(self) -> int:
+        """由記錄檔重建事件與任務狀態，回傳讀取的事件數；上次結束時仍在排隊 / 執行的任務記為失敗"""
+        if self.path is None:
+            return 0
+        count = 0
+        for path in self._files():
+            try:
+                lines = path.read_text(encoding="utf-8").splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    event = json.loads(line)
+                    seq = int(event["seq"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # 寫入中斷的最後一行等
+                if "task_id" not in event or seq <= self.seq:
+                    continue
+                if not count:
+                    self.trimmed = seq - 1  # 更早的事件已隨輪替刪除
+                self.seq = seq
+                self._apply(event)
+                self._append(event)
+                count += 1
+
+        try:
+            self.size = self.path.stat().st_size
+        except OSError:
+            self.size = 0
+        for task_id, task in list(self.tasks.items()):
+            if task["status"] in ACTIVE_STATUSES:
+                self.record({
+                    "type": "task_failed",
+                    "task_id": task_id,
+                    "task_type": task["type"],
+                    "error": "伺服器重新啟動，任務已中斷",
+                    "interrupted": True,
+                })
+        return count
+
+    def _write(self, event: Dict[str, Any]):
+        if self.path is None:
+            return
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        try:
+            if self.file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+                self.size = self.file.tell()
+            if self.size and self.size + len(line) > self.max_bytes:
+                self._rotate()
+            self.file.write(line)
+            self.file.flush()
+            self.size += len(line.encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️  無法寫入任務記錄: {e}")
+            self.close()
+            self.path = None  # 之後只保留在記憶體中
+
+    def _rotate(self):
+        """task-log.jsonl → .1 → .2 …（最舊的刪除）"""
+        self.file.close()
+        for i in range(self.backups, 0, -1):
+            source = self.path if i == 1 else Path(f"{self.path}.{i - 1}")
+            if source.exists():
+                os.replace(source, f"{self.path}.{i}")
+        if not self.backups:
+            self.path.unlink(missing_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = 0
+        LOG_ROTATIONS.inc()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Task Runner
+在伺服器 process 內直接呼叫各工具的入口（HealthChecker、AutoFixer、IntegrityChecker、
+RealDataScanner、資訊匯流爬蟲），省去每次啟動 python3、重新 import 與透過檔案交換結果。
+模組在 warm_up 時預先載入；相依套件缺少時該任務改以子程序執行。
+提供 SingleFlight 時，重複的任務請求會共用進行中（或仍新鮮）的結果。
+執行中的進度事件（progress.py）轉送給該任務的所有 listener，共用結果的請求也收得到。
+取消時，子程序整個 process group 先收到 SIGTERM、寬限期後 SIGKILL；程式內執行的任務在下一次回報進度時結束
+"""
+
+import importlib.util
+import io
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import metrics
+import progress
+from single_flight import SingleFlight
+
+COMMANDS_DIR = Path(__file__).parent
+INFO_STREAM_FILE = COMMANDS_DIR / "info-stream-data.json"
+
+# 任務 → (腳本檔名, 子程序逾時秒數)
+TASK_SCRIPTS = {
+    "health-check": ("health-check.py", 30),
+    "fix": ("fix.py", 60),
+    "check": ("check.py", 60),
+    "reload": ("reload-skills.py", 30),
+    "scan": ("scan-real-data.py", 60),
+    "update-data": ("fetch-ptt-stocks-v2.py", 120),
+}
+
+# 取消子程序時 SIGTERM 後等待結束的秒數（之後 SIGKILL）
+CANCEL_GRACE = 3.0
+# 等待子程序時檢查取消的間隔
+CANCEL_POLL = 0.2
+
+TASK_SECONDS = metrics.histogram("dopeman_task_seconds", "任務執行時間（秒）", ("task", "mode", "result"))
+
+_modules: Dict[str, Any] = {}
+_modules_lock = threading.Lock()
+
+
+def load_script(filename: str):
+    """載入 commands 下的腳本為模組（檔名含連字號，無法直接 import），同一 process 內只載入一次"""
+    with _modules_lock:
+        module = _modules.get(filename)
+        if module is None:
+            name = filename[:-len(".py")].replace("-", "_")
+            spec = importlib.util.spec_from_file_location(name, COMMANDS_DIR / filename)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _modules[filename] = module
+        return module
+
+
+class _ThreadOutput(io.TextIOBase):
+    """依執行緒分流的 stdout / stderr：有擷取中的執行緒寫入自己的 buffer，其餘照常輸出"""
+
+    def __init__(self, target):
+        self.target = target
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self.target.write(text)
+
+    def flush(self):
+        if getattr(self.local, "buffer", None) is None:
+            self.target.flush()
+
+
+_install_lock = threading.Lock()
+
+
+@contextmanager
+def capture_output():
+    """擷取目前執行緒的 print 輸出（其他執行緒不受影響）"""
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadOutput):
+            sys.stderr = _ThreadOutput(sys.stderr)
+
+    buffer = io.StringIO()
+    sys.stdout.local.buffer = buffer
+    sys.stderr.local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        sys.stdout.local.buffer = None
+        sys.stderr.local.buffer = None
+
+
+# ── 各任務的程式內入口（回傳結構化結果）─────────────────────────
+
+def _health_check() -> Dict[str, Any]:
+    checker = load_script("health-check.py").HealthChecker()
+    passed = checker.run()
+    return {"success": passed, "report": checker.report or {"error": "Report not generated"}}
+
+
+def _fix() -> Dict[str, Any]:
+    history = load_script("fix.py").AutoFixer().run()
+    return {"success": True, "fix_history": history}
+
+
+def _check() -> Dict[str, Any]:
+    checker = load_script("check.py").IntegrityChecker()
+    report = checker.run()
+    checker.save_report()
+    return {"success": report["summary"]["error"] == 0, "report": report}
+
+
+def _reload() -> Dict[str, Any]:
+    return {"success": load_script("reload-skills.py").main() == 0}
+
+
+def _scan() -> Dict[str, Any]:
+    scanner = load_script("scan-real-data.py").run_full_scan()
+    data = scanner.data
+    return {
+        "success": True,
+        "last_scan": data["last_scan"],
+        "counts": {name: category["count"] for name, category in data["categories"].items()},
+        "scan_stats": data["scan_stats"],
+    }
+
+
+def _update_data() -> Dict[str, Any]:
+    module = load_script("fetch-ptt-stocks-v2.py")
+    data = module.collect_info_stream()
+    module.save_to_json(data, str(INFO_STREAM_FILE))
+    tw = data["stocks"]["tw"]
+    return {
+        "success": True,
+        "generated_at": data["metadata"]["generated_at"],
+        "counts": {
+            "ptt_gossiping": data["social"]["ptt"]["gossiping"]["count"],
+            "top_gainers": len(tw["top_gainers"]),
+            "top_losers": len(tw["top_losers"]),
+        },
+    }
+
+
+TASKS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "health-check": _health_check,
+    "fix": _fix,
+    "check": _check,
+    "reload": _reload,
+    "scan": _scan,
+    "update-data": _update_data,
+}
+
+
+class TaskRunner:
+    """在目前 process 內執行任務（必要時改用子程序）
+
+    用法：
+        runner = TaskRunner(flights=SingleFlight())
+        runner.warm_up()
+        result = runner.run("health-check", on_progress=print, cancel=threading.Event())
+    """
+
+    def __init__(self, in_process: bool = True, flights: Optional[SingleFlight] = None,
+                 overrides: Optional[Dict[str, Callable[[], Dict[str, Any]]]] = None):
+        self.in_process = in_process
+        self.flights = flights
+        # 取代預設入口的任務（例如常駐伺服器以記憶體模型重掃），一律在 process 內執行
+        self.overrides = dict(overrides or {})
+        # 無法在 process 內載入的任務（缺少相依套件）→ 原因
+        self.unavailable: Dict[str, str] = {}
+        # 任務 → 進度事件的 listener
+        self.listeners: Dict[str, List[progress.Emit]] = {}
+        self.listeners_lock = threading.Lock()
+
+    def warm_up(self, tasks: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """預先載入任務腳本與其相依套件，回傳各任務載入耗時"""
+        timings = {}
+        if not self.in_process:
+            return timings
+        for task in tasks or TASK_SCRIPTS:
+            started = time.monotonic()
+            self._load(task)
+            timings[task] = round(time.monotonic() - started, 3)
+        return timings
+
+    def _load(self, task: str) -> bool:
+        if task in self.unavailable:
+            return False
+        try:
+            load_script(TASK_SCRIPTS[task][0])
+            return True
+        except ImportError as e:
+            self.unavailable[task] = str(e)
+            return False
+
+    def coalesces(self, task: str) -> bool:
+        """該任務是否啟用 single-flight 合併"""
+        return self.flights is not None and bool(self.flights.policy(task).get("enabled"))
+
+    @contextmanager
+    def listening(self, task: str, on_progress: Optional[progress.Emit]):
+        """區塊內收到該任務（不論由誰啟動）的進度事件"""
+        if on_progress is None:
+            yield
+            return
+        with self.listeners_lock:
+            self.listeners.setdefault(task, []).append(on_progress)
+        try:
+            yield
+        finally:
+            with self.listeners_lock:
+                self.listeners[task].remove(on_progress)
+
+    def _emit(self, task: str, event: progress.Event):
+        with self.listeners_lock:
+            listeners = list(self.listeners.get(task, ()))
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                pass
+
+    def run(self, task: str, on_progress: Optional[progress.Emit] = None,
+            cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """執行任務，回傳結果（含 success、stdout、mode、seconds；共用結果時另含 single_flight）
+
+        on_progress 在工作執行緒中收到進度事件（progress.ProgressReporter 的 dict）；
+        cancel 設定後任務提早結束並拋出 progress.TaskCancelled
+        """
+        if task not in TASK_SCRIPTS:
+            raise ValueError(f"未知任務類型: {task}")
+        with self.listening(task, on_progress):
+            if self.flights is None:
+                return self._execute(task, cancel)
+
+            # 失敗的結果只交給同時等待的請求，不沿用到 fresh 期間
+            result, info = self.flights.run(task, lambda: self._execute(task, cancel),
+                                            keep=lambda r: r.get("success", False))
+        return dict(result, single_flight=info)
+
+    def _execute(self, task: str, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        # 取代入口（記憶體模型重掃）很快且中途停止會留下不一致的模型，不檢查取消
+        reporter = progress.ProgressReporter(lambda event: self._emit(task, event),
+                                             cancel=None if task in self.overrides else cancel)
+        if task in self.overrides or (self.in_process and self._load(task)):
+            with progress.use(reporter):
+                result = self._run_in_process(task)
+        else:
+            result = self._run_subprocess(task, reporter.emit, cancel)
+        seconds = time.monotonic() - started
+        TASK_SECONDS.observe(seconds, task=task, mode=result.get("mode", ""),
+                             result="success" if result.get("success") else "failure")
+        result["seconds"] = round(seconds, 3)
+        return result
+
+    def _run_in_process(self, task: str) -> Dict[str, Any]:
+        with capture_output() as output:
+            try:
+                result = self.overrides.get(task, TASKS[task])()
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            except SystemExit as e:
+                result = {"success": e.code in (0, None)}
+        result.update({"stdout": output.getvalue(), "stderr": result.get("error", ""), "mode": "in-process"})
+        return result
+
+    def _run_subprocess(self, task: str, emit: progress.Emit,
+                        cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        script, timeout = TASK_SCRIPTS[task]
+        kwargs = {}
+        relay = None
+        if os.name == "posix":
+            # 子程序在繼承的 pipe 上寫 NDJSON 進度，由 relay 執行緒轉送；
+            # 獨立的 session（process group）讓取消時連同它啟動的子程序一起結束
+            read_fd, write_fd = os.pipe()
+            kwargs = {"pass_fds": (write_fd,), "env": dict(os.environ, **{progress.PROGRESS_FD_ENV: str(write_fd)}),
+                      "start_new_session": True}
+            relay = threading.Thread(target=progress.relay, args=(read_fd, emit), daemon=True)
+            relay.start()
+        metrics.SUBPROCESS_SPAWNS.inc(script=script)
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(
+                [sys.executable, script],
+                cwd=COMMANDS_DIR,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                **kwargs
+            )
+        finally:
+            if relay is not None:
+                os.close(write_fd)  # 已由子程序繼承；子程序結束時 relay 讀到 EOF
+        try:
+            stdout, stderr = self._wait(process, timeout, cancel)
+        finally:
+            if relay is not None:
+                relay.join(timeout=1)
+            metrics.SUBPROCESS_SECONDS.observe(time.monotonic() - started, script=script)
+        return {
+            "success": process.returncode == 0,
+            "stdout": stdout,
+            "stderr": stderr,
+            "mode": "subprocess",
+        }
+
+    def _wait(self, process: subprocess.Popen, timeout: float, cancel: Optional[threading.Event]):
+        """等待子程序結束並取得輸出；逾時拋出 TimeoutExpired、取消拋出 TaskCancelled（兩者都先結束子程序）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return process.communicate(timeout=CANCEL_POLL)
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel is not None and cancel.is_set():
+                self._terminate(process)
+                raise progress.TaskCancelled(f"任務已取消（已結束子程序 {process.pid}）")
+            if time.monotonic() >= deadline:
+                self._terminate(process)
+                raise subprocess.TimeoutExpired(process.args, timeout)
+
+    def _terminate(self, process: subprocess.Popen):
+        """結束子程序（posix 為整個 process group）：SIGTERM，寬限期後 SIGKILL"""
+        def kill(force: bool):
+            try:
+                if os.name == "posix":
+                    os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+                elif force:
+                    process.kill()
+                else:
+                    process.terminate()
+            except (ProcessLookupError, PermissionError):
+                pass
+
+        kill(force=False)
+        try:
+            process.communicate(timeout=CANCEL_GRACE)
+        except subprocess.TimeoutExpired:
+            kill(force=True)
+            process.communicate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_process": self.in_process,
+            "overrides": sorted(self.overrides),
+            "loaded": sorted(_modules),
+            "unavailable": self.unavailable,
+            "single_flight": self.flights.stats() if self.flights else None,
+        }
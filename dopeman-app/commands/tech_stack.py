@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+DopeMAN - Tech Stack Detector
+以有限深度走訪專案目錄判斷技術棧：每個訊號命中一次即停止，全部命中後不再往下走；
+package.json 解析相依套件名稱，不做字串包含比對
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from scan_walker import DEFAULT_NO_DESCEND, DEFAULT_PRUNE_DIRS
+
+DEFAULT_MAX_DEPTH = 3
+
+# 單一專案最多檢查的目錄項目數（超過則以目前結果為準）
+DEFAULT_ENTRY_BUDGET = 20000
+
+# 技術棧偵測不進入的目錄（相依套件、建置輸出）
+TECH_PRUNE_DIRS = DEFAULT_PRUNE_DIRS | DEFAULT_NO_DESCEND | {
+    "bin", "obj", "dist", "build", "target", "out", ".idea", ".vs", ".gradle",
+}
+
+# package.json 中列出相依套件的欄位
+PACKAGE_DEP_FIELDS = ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+
+
+class Detector:
+    """單一技術棧訊號
+
+    files:        專案根目錄下的檔名 / 目錄名（存在即命中）
+    extensions:   副檔名（含目錄，如 .xcodeproj），在 depth 層以內搜尋
+    npm_packages: package.json 相依套件名稱（任一存在即命中）
+    """
+
+    __slots__ = ("name", "files", "extensions", "depth", "npm_packages")
+
+    def __init__(self, name: str, files: Iterable[str] = (), extensions: Iterable[str] = (),
+                 depth: int = 0, npm_packages: Iterable[str] = ()):
+        self.name = name
+        self.files = tuple(files)
+        self.extensions = tuple(extensions)
+        self.depth = depth
+        self.npm_packages = frozenset(npm_packages)
+
+
+# 依輸出順序排列；新增技術棧用 register_detector
+DETECTORS: List[Detector] = [
+    Detector(".NET/C#", extensions=(".sln", ".csproj"), depth=DEFAULT_MAX_DEPTH),
+    Detector("Node.js", files=("package.json",)),
+    Detector("React", npm_packages=("react",)),
+    Detector("Next.js", npm_packages=("next",)),
+    Detector("Vue", npm_packages=("vue", "nuxt")),
+    Detector("Python", files=("requirements.txt", "pyproject.toml", "setup.py")),
+    Detector("Go", files=("go.mod",)),
+    Detector("Rust", files=("Cargo.toml",)),
+    Detector("SQL", files=("migrations",), extensions=(".sql",)),
+    Detector("Java/Gradle", files=("build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts")),
+    Detector("Swift", files=("Package.swift",), extensions=(".xcodeproj", ".xcworkspace"), depth=2),
+    Detector("Terraform", extensions=(".tf",), depth=2),
+]
+
+
+def register_detector(detector: Detector, before: Optional[str] = None):
+    """加入自訂偵測器（before 指定時插在該技術棧之前）"""
+    names = [d.name for d in DETECTORS]
+    DETECTORS.insert(names.index(before) if before in names else len(DETECTORS), detector)
+
+
+def manifest_paths(project_dir: Path, detectors: Optional[List[Detector]] = None) -> List[Path]:
+    """專案根目錄下會影響偵測結果的檔案（供快取指紋使用）"""
+    names = dict.fromkeys(name for d in (detectors or DETECTORS) for name in d.files)
+    return [project_dir / name for name in names]
+
+
+def read_package_deps(package_json: Path) -> Set[str]:
+    """package.json 所有相依欄位的套件名稱"""
+    try:
+        data = json.loads(package_json.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return set()
+    if not isinstance(data, dict):
+        return set()
+
+    deps: Set[str] = set()
+    for field in PACKAGE_DEP_FIELDS:
+        value = data.get(field)
+        if isinstance(value, dict):
+            deps.update(value)
+    return deps
+
+
+class TechStackDetector:
+    """有限深度的技術棧偵測
+
+    用法：
+        stack = TechStackDetector().detect(project_dir)
+        stack, probed = TechStackDetector().probe(project_dir)   # 同時取得走訪過的子目錄
+    """
+
+    def __init__(self, detectors: Optional[List[Detector]] = None,
+                 max_depth: int = DEFAULT_MAX_DEPTH, entry_budget: int = DEFAULT_ENTRY_BUDGET):
+        self.detectors = detectors if detectors is not None else DETECTORS
+        self.max_depth = max_depth
+        self.entry_budget = entry_budget
+
+    def cache_key(self) -> str:
+        """偵測器組合（變更後快取需失效）"""
+        return "|".join(d.name for d in self.detectors)
+
+    def detect(self, project_dir: Path) -> List[str]:
+        return self.probe(project_dir)[0]
+
+    def probe(self, project_dir: Path) -> Tuple[List[str], List[Path]]:
+        """偵測技術棧，並回傳副檔名走訪列出過的子目錄
+
+        子目錄的 mtime 會隨其中項目新增 / 刪除而變，納入快取指紋即可察覺
+        子目錄中 .csproj、.tf 等檔案的變動。
+        """
+        hits: Set[str] = set()
+        probed: List[Path] = []
+
+        # 根目錄檔名：只需 stat
+        for detector in self.detectors:
+            if any((project_dir / name).exists() for name in detector.files):
+                hits.add(detector.name)
+
+        # package.json 相依套件
+        npm_detectors = [d for d in self.detectors if d.npm_packages]
+        if npm_detectors and (project_dir / "package.json").is_file():
+            deps = read_package_deps(project_dir / "package.json")
+            for detector in npm_detectors:
+                if detector.npm_packages & deps:
+                    hits.add(detector.name)
+
+        # 副檔名：一次有限深度走訪，同時檢查所有尚未命中的訊號
+        pending = [d for d in self.detectors if d.extensions and d.name not in hits]
+        if pending:
+            hits |= self._walk(project_dir, pending, probed)
+
+        return [d.name for d in self.detectors if d.name in hits], probed
+
+    def _walk(self, project_dir: Path, pending: List[Detector], probed: List[Path]) -> Set[str]:
+        hits: Set[str] = set()
+        budget = self.entry_budget
+        queue = deque([(str(project_dir), 0)])
+
+        while queue and pending and budget > 0:
+            current, depth = queue.popleft()
+            active = [d for d in pending if d.depth >= depth]
+            if not active:
+                continue
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            budget -= len(entries)
+            if depth:
+                probed.append(Path(current))
+
+            for entry in entries:
+                name = entry.name
+                matched = False
+                for detector in active:
+                    if name.endswith(detector.extensions):
+                        hits.add(detector.name)
+                        matched = True
+                if matched:
+                    pending = [d for d in pending if d.name not in hits]
+                    active = [d for d in active if d.name not in hits]
+                    if not pending:
+                        break
+                    # 命中的項目（如 .xcodeproj）本身不需再往下走
+                    continue
+                if depth < self.max_depth and name not in TECH_PRUNE_DIRS and not name.startswith("."):
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            queue.append((entry.path, depth + 1))
+                    except OSError:
+                        pass
+
+        return hits
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+git_status：process 內的 dirty 判斷與 git status --porcelain 一致
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from git_collector import GitCollector
+from git_reader import GitRepo
+from git_status import LARGE_INDEX_ENTRIES, worktree_status
+
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.run(["git", "-c", "user.email=a@b", "-c", "user.name=a", *args], cwd=repo,
+                          capture_output=True, text=True, check=True).stdout
+
+
+class DirtyCheckerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.home = Path(self.tmp.name) / "home"
+        self.home.mkdir()
+        # 隔離使用者層級的 git config（global_config 與 git CLI 都讀 HOME / XDG_CONFIG_HOME）
+        self.env = mock.patch.dict(os.environ, {"HOME": str(self.home),
+                                                "XDG_CONFIG_HOME": str(self.home / ".config")})
+        self.env.start()
+        self.repo = Path(self.tmp.name) / "repo"
+        self.repo.mkdir()
+        git(self.repo, "init", "-q")
+        (self.repo / "README.md").write_text("# repo\n")
+        git(self.repo, "add", "README.md")
+        git(self.repo, "commit", "-qm", "init")
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def assertMatchesGit(self, dirty: bool):
+        status = worktree_status(GitRepo(self.repo), untracked_budget=10.0)
+        self.assertEqual(bool(git(self.repo, "status", "--porcelain").strip()), dirty)
+        self.assertEqual(status["dirty"], dirty, status)
+
+    def test_global_excludes_file(self):
+        (self.home / ".gitignore_global").write_text(".DS_Store\n*.swp\n")
+        (self.home / ".gitconfig").write_text("[core]\n\texcludesFile = ~/.gitignore_global\n")
+        (self.repo / ".DS_Store").write_text("x")
+        (self.repo / "notes.swp").write_text("x")
+        self.assertMatchesGit(False)
+
+    def test_repo_excludes_file(self):
+        excludes = Path(self.tmp.name) / "repo-ignore"
+        excludes.write_text("*.log\n")
+        git(self.repo, "config", "core.excludesFile", str(excludes))
+        (self.repo / "debug.log").write_text("x")
+        self.assertMatchesGit(False)
+        (self.repo / "other.txt").write_text("x")
+        self.assertMatchesGit(True)
+
+    def test_untracked_in_dependency_dirs(self):
+        (self.repo / "vendor").mkdir()
+        (self.repo / "vendor" / "lib.py").write_text("x")
+        self.assertMatchesGit(True)
+        (self.repo / ".gitignore").write_text("vendor/\n")
+        git(self.repo, "add", ".gitignore")
+        git(self.repo, "commit", "-qm", "ignore vendor")
+        self.assertMatchesGit(False)
+
+    def test_large_index_keeps_in_process_untracked_pass(self):
+        # tracked 交給 git status --untracked-files=no，untracked 仍在 process 內走訪
+        for i in range(LARGE_INDEX_ENTRIES + 50):
+            (self.repo / f"f{i}.txt").write_text(str(i))
+        git(self.repo, "add", ".")
+        git(self.repo, "commit", "-qm", "many files")
+        (self.repo / ".gitignore").write_text("*.log\n")
+        git(self.repo, "add", ".gitignore")
+        git(self.repo, "commit", "-qm", "ignore logs")
+
+        def probe():
+            collector = GitCollector()
+            collector.collect([self.repo], probes=("dirty",))
+            return collector.get(self.repo, "dirty"), collector.probe_counts
+
+        (self.repo / "debug.log").write_text("x")
+        self.assertEqual(probe(), (False, {"in_process": 1, "cli": 1}))
+        (self.repo / "new.txt").write_text("x")
+        self.assertEqual(probe(), (True, {"in_process": 1, "cli": 1}))
+        (self.repo / "new.txt").unlink()
+        (self.repo / "f999.txt").write_text("changed")  # 排在前 LARGE_INDEX_ENTRIES 個 entry 之後
+        self.assertEqual(probe(), (True, {"in_process": 0, "cli": 1}))
+
+
+if __name__ == "__main__":
+    unittest.main()
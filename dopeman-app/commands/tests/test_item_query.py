@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+item_query：/api/items 的查詢參數檢查
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from item_query import ItemIndex, QueryError
+from scan_output import ScanDataSource, write_shards
+
+DATA = {
+    "last_scan": "2026-01-01T00:00:00",
+    "categories": {
+        "agents": {"count": 3, "items": [
+            {"name": "beta", "path": "/a/beta.md", "type": "worker", "depth": 2},
+            {"name": "alpha", "path": "/a/alpha.md", "type": "coordinator", "depth": 1},
+            {"name": "gamma", "path": "/a/gamma.md", "type": "worker"},
+        ]},
+    },
+}
+
+
+class ItemQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_shards(DATA, Path(self.tmp.name))
+        self.index = ItemIndex(ScanDataSource(shard_dir=Path(self.tmp.name)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def names(self, **params):
+        return [item["name"] for item in self.index.query("agents", **params)["items"]]
+
+    def test_sort_by_alias_and_raw_field(self):
+        self.assertEqual(self.names(sort="name"), ["alpha", "beta", "gamma"])
+        self.assertEqual(self.names(sort="-name"), ["gamma", "beta", "alpha"])
+        self.assertEqual(self.names(sort="depth"), ["alpha", "beta", "gamma"])
+
+    def test_unknown_sort_field_rejected(self):
+        with self.assertRaisesRegex(QueryError, "排序欄位"):
+            self.index.query("agents", sort="nosuchfield")
+        with self.assertRaisesRegex(QueryError, "排序欄位"):
+            self.index.query("agents", sort="-nosuchfield")
+
+    def test_unknown_filter_field_rejected(self):
+        with self.assertRaisesRegex(QueryError, "篩選欄位"):
+            self.index.query("agents", nosuchfield="x")
+
+
+if __name__ == "__main__":
+    unittest.main()
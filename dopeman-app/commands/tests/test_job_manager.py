@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+job_manager：同時送出的相同請求只建立一個工作
+"""
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from job_manager import JobManager
+
+
+class JobManagerDedupTest(unittest.TestCase):
+    def setUp(self):
+        # 頻繁切換執行緒，讓查詢與建立之間的競爭容易出現
+        self.interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+
+    def test_concurrent_submissions_share_one_job(self):
+        manager = JobManager(max_workers=2, limits={"fix": 1})
+        release = threading.Event()
+        try:
+            # 佔住 fix 的執行名額，之後的請求都會排隊
+            manager.submit("fix", lambda: release.wait(10) and {"success": True}, key="first")
+
+            for attempt in range(20):
+                threads, results = 16, []
+                barrier = threading.Barrier(threads)
+
+                def submit():
+                    barrier.wait()
+                    results.append(manager.submit("fix", lambda: {"success": True}, key=f"same-{attempt}"))
+
+                workers = [threading.Thread(target=submit) for _ in range(threads)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+
+                self.assertEqual(len({job["id"] for job in results}), 1)
+                self.assertEqual(sum(1 for job in results if not job.get("deduplicated")), 1)
+                self.assertEqual(len(manager.queued()), 1)
+                manager.cancel(results[0]["id"])
+        finally:
+            release.set()
+            manager.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
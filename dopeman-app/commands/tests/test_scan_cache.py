@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ScanCache：沿用 project_info 的專案不會在完整掃描後被 prune 刪除衍生快取項目；
+子目錄中的技術棧檔案變動會讓技術棧與 project_info 快取失效
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+COMMANDS_DIR = Path(__file__).resolve().parent.parent
+
+# 在暫存 HOME 中執行一次完整掃描，印出沿用的專案數、各專案技術棧與快取路徑
+CHILD = textwrap.dedent("""
+    import importlib.util, json
+    from scan_cache import DEFAULT_CACHE_PATH
+
+    spec = importlib.util.spec_from_file_location("scan_real_data", "scan-real-data.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    scanner = module.run_full_scan(output_file=DEFAULT_CACHE_PATH.parent / "out.json",
+                                   shard_dir=DEFAULT_CACHE_PATH.parent / "scan-data")
+    print(json.dumps({
+        "reused": scanner.data["scan_stats"]["projects"]["reused"],
+        "stacks": {p["name"]: p["tech_stack"] for p in scanner.data["categories"]["dev_projects"]["items"]},
+        "cache": str(DEFAULT_CACHE_PATH),
+    }))
+""")
+
+
+def git(cwd: Path, *args: str):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+class FullScanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.TemporaryDirectory()
+        self.project = Path(self.home.name) / "DEV" / "demo"
+        (self.project / "src" / "App").mkdir(parents=True)
+        (self.project / "README.md").write_text("Demo project\n", encoding="utf-8")
+        (self.project / "package.json").write_text("{}\n", encoding="utf-8")
+        (self.project / "src" / "App" / "Program.cs").write_text("\n", encoding="utf-8")
+        git(self.project, "init", "-q")
+        git(self.project, "add", ".")
+        git(self.project, "commit", "-q", "-m", "init")
+
+    def tearDown(self):
+        self.home.cleanup()
+
+    def scan(self) -> dict:
+        env = dict(os.environ, HOME=self.home.name, PYTHONDONTWRITEBYTECODE="1")
+        result = subprocess.run([sys.executable, "-c", CHILD], cwd=COMMANDS_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_reused_project_keeps_dependent_rows(self):
+        self.assertEqual(self.scan()["reused"], 0)
+        result = self.scan()
+        self.assertEqual(result["reused"], 1)
+
+        conn = sqlite3.connect(result["cache"])
+        try:
+            rows = set(conn.execute("SELECT path, kind FROM entries WHERE kind IN ('tech_stack', 'readme_summary')"))
+        finally:
+            conn.close()
+        self.assertEqual(rows, {(str(self.project), "tech_stack"),
+                                (str(self.project / "README.md"), "readme_summary")})
+
+    def test_subdirectory_manifest_invalidates_tech_stack(self):
+        self.assertEqual(self.scan()["stacks"], {"demo": ["Node.js"]})
+
+        # 專案根目錄不變，只在第二層子目錄新增 .csproj
+        (self.project / "src" / "App" / "App.csproj").write_text("<Project />\n", encoding="utf-8")
+        result = self.scan()
+        self.assertEqual((result["reused"], result["stacks"]), (0, {"demo": [".NET/C#", "Node.js"]}))
+        self.assertEqual(self.scan()["reused"], 1)
+
+        (self.project / "src" / "App" / "App.csproj").unlink()
+        result = self.scan()
+        self.assertEqual((result["reused"], result["stacks"]), (0, {"demo": ["Node.js"]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
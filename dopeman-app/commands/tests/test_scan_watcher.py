@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+LiveScan：常駐的掃描器不長時間佔住掃描快取的寫入鎖，同時執行的其他掃描仍可使用快取；
+專案根目錄只有影響位置索引的名稱會觸發索引更新
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+COMMANDS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(COMMANDS_DIR))
+
+from scan_watcher import PROJECT_PHASES, REPO_FILE_PHASES, REPO_PHASES, watch_targets
+
+# 在暫存 HOME 中啟動 LiveScan，初次掃描與一次增量更新後開啟第二個 ScanCache
+CHILD = textwrap.dedent("""
+    import asyncio, time
+    from scan_cache import DEFAULT_CACHE_PATH, ScanCache
+    from scan_watcher import ALL_PHASES, LiveScan
+
+    def second_cache():
+        started = time.monotonic()
+        cache = ScanCache(DEFAULT_CACHE_PATH)
+        enabled = cache.enabled  # 等不到寫入鎖時會停用快取
+        cache.put(DEFAULT_CACHE_PATH, "probe", 1)
+        cache.close()
+        return enabled, time.monotonic() - started
+
+    async def main():
+        live = LiveScan(DEFAULT_CACHE_PATH.parent / "out.json", shard_dir=DEFAULT_CACHE_PATH.parent / "scan-data")
+        await live.start()
+        try:
+            for step in ("initial", "refresh"):
+                if step == "refresh":
+                    await live._run(live._refresh, set(ALL_PHASES), set(), True)
+                enabled, seconds = await asyncio.to_thread(second_cache)
+                print(step, enabled and seconds < 2.0, round(seconds, 3))
+        finally:
+            await live.stop()
+
+    asyncio.run(main())
+""")
+
+
+class LiveScanCacheTest(unittest.TestCase):
+    def test_second_cache_while_live_scan_running(self):
+        with tempfile.TemporaryDirectory() as home:
+            skill = Path(home) / ".claude" / "skills" / "demo"
+            skill.mkdir(parents=True)
+            (skill / "SKILL.md").write_text("---\nname: demo\ndescription: d\n---\n", encoding="utf-8")
+            env = dict(os.environ, HOME=home, PYTHONDONTWRITEBYTECODE="1")
+            result = subprocess.run([sys.executable, "-c", CHILD], cwd=COMMANDS_DIR, env=env,
+                                    capture_output=True, text=True, timeout=120)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            lines = [line.split() for line in result.stdout.splitlines() if line.startswith(("initial", "refresh"))]
+            self.assertEqual([line[:2] for line in lines], [["initial", "True"], ["refresh", "True"]], result.stdout)
+
+
+class RepoRootTargetTest(unittest.TestCase):
+    def test_only_indexed_names_reindex(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = Path(tmp) / "demo"
+            for path in (repo / ".git", repo / "libs" / "sub" / ".git", repo / "tools" / ".claude"):
+                path.mkdir(parents=True)
+            scanner = SimpleNamespace(
+                project_git_dirs=[repo / ".git", repo / "libs" / "sub" / ".git"],
+                project_claude_dirs=[repo / "tools" / ".claude"],
+                skill_md_paths=[], claude_dir_skill_mds={},
+            )
+            target = watch_targets(scanner)[str(repo)]
+
+            full = (REPO_PHASES | PROJECT_PHASES, True)
+            for name in (".claude", ".git", "SKILL.md", "libs", "tools", ""):
+                self.assertEqual(target.match(name), full, name)
+            for name in ("README.md", "dist", "notes.txt"):
+                self.assertEqual(target.match(name), (REPO_FILE_PHASES, False), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,196 +1,243 @@
 #!/usr/bin/env python3
 """
 DopeMAN WebSocket Server
-提供即時任務進度監控
+提供即時任務進度監控，並監看檔案系統即時推送掃描結果的變動（scan_delta：各分類新增 / 移除 / 更新的項目）。
+客戶端以 get_scan 帶上目前的 epoch / version 取得錯過的 delta，落後太多時取得完整的掃描模型。
+任務送進排程器（JobManager）：每種類型有同時執行上限、依優先順序排隊、回報排隊位置，可取消。
+任務事件帶有遞增的 seq 並寫入記錄檔（task_log.py），重新連線時以 ?since=<seq> 只取得錯過的事件
 """
 
+import time
+
+STARTED_AT = time.time()  # 啟動時間量測起點（其餘 import 之前）
+
 import asyncio
 import json
 import subprocess
 import sys
 import argparse
+from http import HTTPStatus
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import parse_qs, urlparse
 import websockets
 
-# 存儲所有連接的客戶端
-connected_clients = set()
+import metrics
+from job_manager import DEFAULT_JOB_WORKERS, PRIORITIES, JobManager
+from scan_output import DEFAULT_OUTPUT_FORMAT, LEGACY_FILE, OUTPUT_FORMATS
+from scan_watcher import DEFAULT_POLL_INTERVAL, LiveScan
+from send_queue import DEFAULT_MAX_QUEUE, DEFAULT_PROGRESS_RATE, DEFAULT_SLOW_TIMEOUT, Broadcaster
+from single_flight import SingleFlight
+from startup_timing import StartupTimer
+from task_log import DEFAULT_CAPACITY, LOG_FILE, TaskLog
+from task_runner import TaskRunner
+
+DATA_FILE = LEGACY_FILE
+
+# 所有連接的客戶端與其送出佇列（main() 依 --progress-rate 等參數重新設定）
+broadcaster = Broadcaster()
+
+# 任務事件記錄與任務狀態（main() 依 --task-log 等參數重新設定並由記錄檔重建）
+task_log = TaskLog(None)
+
+# process 內執行各工具（main() 依 --subprocess / --no-single-flight 重新設定）
+task_runner = TaskRunner(flights=SingleFlight())
+
+# 任務排程（main() 以 attach_jobs 設定；dopeman-server 改用與 /api/* 共用的 JobManager）
+jobs = None
+
+# WebSocket 送出的任務（使用者點擊）預設優先於背景更新
+DEFAULT_TASK_PRIORITY = 'interactive'
+
+# 啟動時間分解（main() 建立）
+startup = None
+
+# 即時掃描模型（監看檔案系統時由 main() / dopeman-server 設定；未監看時 get_scan 回覆 available: false）
+live_scan = None
+
+def _task_counts():
+    counts = {}
+    for task in list(task_log.tasks.values()):
+        key = (task['type'], task['status'])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+metrics.gauge('dopeman_websocket_clients', '已連線的 WebSocket 客戶端數', callback=lambda: len(broadcaster.channels))
+metrics.gauge('dopeman_websocket_tasks', 'WebSocket 任務數（依類型與狀態）', ('type', 'status'), callback=_task_counts)
+BROADCAST_SECONDS = metrics.histogram('dopeman_websocket_broadcast_seconds',
+                                      '廣播一則訊息（編碼並放入所有客戶端的佇列）的時間（秒）', ('type',))
+SCAN_SYNCS = metrics.counter('dopeman_websocket_scan_syncs_total',
+                             'get_scan 的回覆方式（deltas：補送錯過的 delta、full：完整模型、unavailable：沒有即時模型）', ('mode',))
+
+# WebSocket 任務類型 → (TaskRunner 任務, 顯示名稱)
+TASK_TYPES = {
+    'scan': ('scan', '掃描'),
+    'health-check': ('health-check', '健康檢查'),
+    'fix': ('fix', '修復'),
+    'update-info-stream': ('update-data', '資料更新'),
+}
+
+def attach_jobs(manager):
+    """使用 manager 排程任務，並把排隊位置 / 開始執行轉播給客戶端（需在 event loop 中呼叫）"""
+    global jobs
+    jobs = manager
+    loop = asyncio.get_running_loop()
+    manager.subscribe(lambda event, job: loop.call_soon_threadsafe(on_job_event, event, job))
+
+def on_job_event(event, job):
+    """排程器的狀態變化（event loop 中執行）：排隊位置、開始執行"""
+    task_id = job['id']
+    task = task_log.tasks.get(task_id)
+    if task is None or task['status'] not in ('queued', 'running'):
+        return
+    if event in ('queued', 'position'):
+        broadcast_queued(task_id, job)
+    elif event == 'started':
+        publish_progress(task_id, 0, f"開始執行 {task['type']}...")
+
+def start_task(task_type, priority, channel):
+    """送進排程器；同類任務已在執行（single-flight）或相同的任務已在排隊時，回覆既有的 task_id"""
+    if task_type not in TASK_TYPES:
+        channel.send(json.dumps({
+            'type': 'error',
+            'message': f'未知任務類型: {task_type}'
+        }, ensure_ascii=False))
+        return
+    task, label = TASK_TYPES[task_type]
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def on_progress(event):
+        # 工作執行緒：交回 event loop，維持事件順序
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    job = jobs.submit(task, task_runner.run, task, on_progress, coalesce=task_runner.coalesces(task),
+                      priority=priority, key=task, cancellable=True)
+    task_id = job['id']
+    joined = job.get('coalesced') or job.get('deduplicated')
+    if joined:
+        channel.send(json.dumps({
+            'type': 'task_joined',
+            'task_id': task_id,
+            'task_type': task_type,
+            'status': job['state'],
+            'position': job['position'],
+            'message': f"{label}已在{'排隊' if job['state'] == 'queued' else '執行'}中，沿用同一個任務"
+        }, ensure_ascii=False))
+        if task_id in task_log.tasks:
+            return
+        # 由 /api/* 送出的工作（dopeman-server 共用排程器）：之後由 listener 取得進度
 
-# 當前任務狀態
-current_tasks = {}
+    task_log.track(task_id, task_type, status=job['state'], priority=job['priority'], position=job['position'],
+                   queued_at=job['submitted_at'], started_at=job['started_at'])
+    asyncio.create_task(follow_task(task_id, task_type, label, events, listen=task if joined else None))
 
-async def execute_task(task_type, websocket):
-    """執行任務並回報進度"""
-    task_id = f"{task_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+async def follow_task(task_id, task_type, label, events, listen=None):
+    """依序轉播任務的進度事件（階段、已處理數、目前路徑、ETA），結束時廣播結果
 
-    current_tasks[task_id] = {
-        'type': task_type,
-        'status': 'running',
-        'progress': 0,
-        'started_at': datetime.now().isoformat()
-    }
+    listen 為任務名稱時，改以 TaskRunner 的 listener 取得進度（合併到不是由這裡送出的工作）
+    """
+    loop = asyncio.get_running_loop()
 
-    try:
-        # 發送開始訊息
-        await broadcast_progress(task_id, 0, f"開始執行 {task_type}...")
-
-        if task_type == 'scan':
-            await execute_scan(task_id, websocket)
-        elif task_type == 'health-check':
-            await execute_health_check(task_id, websocket)
-        elif task_type == 'fix':
-            await execute_fix(task_id, websocket)
-        elif task_type == 'update-info-stream':
-            await execute_update_info_stream(task_id, websocket)
-        else:
-            await broadcast_progress(task_id, 0, f"未知任務類型: {task_type}", error=True)
-            return
+    async def relay():
+        while True:
+            event = await events.get()
+            if event is None:
+                return
+            await broadcast_task_progress(task_id, event)
 
-        # 任務完成
-        current_tasks[task_id]['status'] = 'completed'
-        current_tasks[task_id]['progress'] = 100
-        current_tasks[task_id]['completed_at'] = datetime.now().isoformat()
+    def on_progress(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    relaying = asyncio.create_task(relay())
+    try:
+        with task_runner.listening(listen, on_progress if listen else None):
+            job = await asyncio.to_thread(jobs.wait, task_id)
+    finally:
+        # 任務結束前送出的事件都已排在前面
+        events.put_nowait(None)
+        await relaying
 
+    result = job['result'] or {}
+    if job['state'] == 'cancelled':
+        await broadcast_message({
+            'type': 'task_cancelled',
+            'task_id': task_id,
+            'task_type': task_type,
+            'message': f'{label}已取消'
+        })
+    elif job['state'] == 'succeeded':
+        await broadcast_progress(task_id, 100, f"{label}完成")
         await broadcast_message({
             'type': 'task_completed',
             'task_id': task_id,
             'task_type': task_type,
-            'message': f'{task_type} 執行完成'
+            'message': f'{task_type} 執行完成',
+            # 與進行中（或剛完成）的同類任務共用結果時的來源資訊
+            'single_flight': result.get('single_flight')
         })
-
-    except Exception as e:
-        current_tasks[task_id]['status'] = 'failed'
-        current_tasks[task_id]['error'] = str(e)
-
+    else:
+        error = f"{label}失敗: {result.get('stderr') or result.get('error') or job['error'] or ''}"
         await broadcast_message({
             'type': 'task_failed',
             'task_id': task_id,
             'task_type': task_type,
-            'error': str(e)
+            'error': error
         })
 
-async def execute_scan(task_id, websocket):
-    """執行掃描任務"""
-    await broadcast_progress(task_id, 10, "掃描全域 Skills...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 30, "掃描專案 Skills...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 50, "掃描 Agents...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 70, "掃描 Commands...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 90, "生成資料檔案...")
-
-    # 實際執行掃描
-    process = await asyncio.create_subprocess_exec(
-        'python3', 'scan-real-data.py',
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        cwd=Path(__file__).parent
-    )
-
-    stdout, stderr = await process.communicate()
-
-    if process.returncode != 0:
-        raise Exception(f"掃描失敗: {stderr.decode()}")
-
-    await broadcast_progress(task_id, 100, "掃描完成")
-
-async def execute_health_check(task_id, websocket):
-    """執行健康檢查"""
-    await broadcast_progress(task_id, 20, "檢查 Skills 目錄...")
-    await asyncio.sleep(0.3)
-
-    await broadcast_progress(task_id, 40, "檢查 Symlinks...")
-    await asyncio.sleep(0.3)
-
-    await broadcast_progress(task_id, 60, "檢查 Skill 結構...")
-    await asyncio.sleep(0.3)
-
-    await broadcast_progress(task_id, 80, "生成報告...")
-
-    # 實際執行健康檢查
-    process = await asyncio.create_subprocess_exec(
-        'python3', 'health-check.py',
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        cwd=Path(__file__).parent
-    )
-
-    stdout, stderr = await process.communicate()
-
-    if process.returncode != 0:
-        raise Exception(f"健康檢查失敗: {stderr.decode()}")
-
-    await broadcast_progress(task_id, 100, "健康檢查完成")
-
-async def execute_fix(task_id, websocket):
-    """執行自動修復"""
-    await broadcast_progress(task_id, 20, "備份當前配置...")
-    await asyncio.sleep(0.3)
-
-    await broadcast_progress(task_id, 40, "檢查損壞的連結...")
-    await asyncio.sleep(0.3)
-
-    await broadcast_progress(task_id, 60, "修復 Symlinks...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 80, "驗證修復結果...")
-
-    # 實際執行修復
-    process = await asyncio.create_subprocess_exec(
-        'python3', 'fix.py',
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        cwd=Path(__file__).parent
-    )
-
-    stdout, stderr = await process.communicate()
-
-    if process.returncode != 0:
-        raise Exception(f"修復失敗: {stderr.decode()}")
-
-    await broadcast_progress(task_id, 100, "修復完成")
-
-async def execute_update_info_stream(task_id, websocket):
-    """更新個人資訊匯流資料"""
-    await broadcast_progress(task_id, 10, "爬取 PTT 熱門文章...")
-    await asyncio.sleep(1)
-
-    await broadcast_progress(task_id, 30, "取得台股漲幅資料...")
-    await asyncio.sleep(1)
-
-    await broadcast_progress(task_id, 50, "取得台股跌幅資料...")
-    await asyncio.sleep(1)
-
-    await broadcast_progress(task_id, 70, "取得加權指數...")
-    await asyncio.sleep(0.5)
-
-    await broadcast_progress(task_id, 90, "儲存資料...")
-
-    # 實際執行更新
-    process = await asyncio.create_subprocess_exec(
-        'python3', 'fetch-ptt-stocks-v2.py',
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        cwd=Path(__file__).parent
-    )
-
-    stdout, stderr = await process.communicate()
-
-    if process.returncode != 0:
-        raise Exception(f"資料更新失敗: {stderr.decode()}")
-
-    await broadcast_progress(task_id, 100, "資料更新完成")
-
-async def broadcast_progress(task_id, progress, message, error=False):
-    """廣播進度更新"""
-    # 從 current_tasks 取得 task_type
-    task_type = current_tasks.get(task_id, {}).get('type', 'unknown')
+def cancel_task(task_id, channel):
+    """取消任務：排隊中的直接移除，執行中的結束子程序（程式內執行時於下一次回報進度時結束）"""
+    job = jobs.cancel(task_id)
+    if job is None:
+        message = f'找不到任務 {task_id}'
+    elif job['state'] not in ('queued', 'running', 'cancelled'):
+        message = f'任務已結束（{job["state"]}）'
+    elif job['state'] == 'running' and not job['cancel_requested']:
+        message = f'任務 {task_id} 無法取消'
+    else:
+        if job['state'] == 'running':
+            publish_progress(task_id, task_log.tasks.get(task_id, {}).get('progress', 0), '取消中...')
+        return
+    channel.send(json.dumps({
+        'type': 'error',
+        'message': message
+    }, ensure_ascii=False))
+
+def broadcast_queued(task_id, job):
+    """廣播排隊位置"""
+    publish({
+        'type': 'task_queued',
+        'task_id': task_id,
+        'task_type': task_log.tasks[task_id]['type'],
+        'priority': job['priority'],
+        'position': job['position'],
+        'queue_length': job.get('queue_length'),
+        'message': f"排隊中（第 {job['position']} 位）",
+        'timestamp': datetime.now().isoformat()
+    })
+
+def describe_progress(event):
+    """進度事件的顯示文字"""
+    label = event.get('label') or '執行中'
+    if event['event'] == 'phase_finished':
+        return f"{label}完成"
+    if event['event'] == 'finished':
+        return "整理結果..."
+    if event.get('total'):
+        return f"{label}（{event['done']}/{event['total']}）..."
+    return f"{label}..."
+
+async def broadcast_task_progress(task_id, event):
+    """轉播工具的進度事件（記錄後重新連線的客戶端可取得目前進度）"""
+    await broadcast_progress(task_id, event['progress'], describe_progress(event), details=event)
+
+async def broadcast_progress(task_id, progress, message, error=False, details=None):
+    """廣播進度更新（details 為工具的進度事件：event、phase、done / total、path、elapsed、eta 等）"""
+    publish_progress(task_id, progress, message, error, details)
+
+def publish_progress(task_id, progress, message, error=False, details=None):
+    # 從任務狀態取得 task_type
+    task_type = task_log.tasks.get(task_id, {}).get('type', 'unknown')
 
     data = {
         'type': 'progress',
@@ -201,30 +248,89 @@ async def broadcast_progress(task_id, progress, message, error=False):
         'error': error,
         'timestamp': datetime.now().isoformat()
     }
+    if details:
+        data.update({key: value for key, value in details.items() if key not in data})
 
-    await broadcast_message(data)
+    publish(data)
 
 async def broadcast_message(data):
     """廣播訊息給所有連接的客戶端"""
-    if connected_clients:
-        message = json.dumps(data, ensure_ascii=False)
-        await asyncio.gather(
-            *[client.send(message) for client in connected_clients],
-            return_exceptions=True
-        )
+    publish(data)
+
+def publish(data):
+    # 任務事件先記錄（指派 seq；沒有客戶端也要記錄）
+    if data.get('task_id') is not None:
+        task_log.record(data)
+    # 只放進各客戶端的佇列，不等待送出（慢速客戶端不影響其他人與任務本身）
+    if broadcaster.channels:
+        with BROADCAST_SECONDS.time(type=data.get('type', 'unknown')):
+            broadcaster.publish(data)
+
+def process_request(connection, request):
+    """一般 HTTP 的 GET /api/ready：就緒狀態與啟動時間分解（?warm=1 時預熱完成前回 503）、
+    GET /metrics：Prometheus 指標；其餘請求照常進行 WebSocket 握手"""
+    url = urlparse(request.path)
+    if url.path == '/metrics':
+        response = connection.respond(HTTPStatus.OK, metrics.render())
+        del response.headers['Content-Type']
+        response.headers['Content-Type'] = metrics.CONTENT_TYPE
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    if url.path != '/api/ready' or startup is None:
+        return None
+    report = startup.report()
+    want_warm = parse_qs(url.query).get('warm', ['0'])[0] in ('1', 'true')
+    status = HTTPStatus.SERVICE_UNAVAILABLE if want_warm and not report['warm'] else HTTPStatus.OK
+    response = connection.respond(status, json.dumps(dict(report, success=status == HTTPStatus.OK),
+                                                     ensure_ascii=False))
+    del response.headers['Content-Type']
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+def parse_since(value):
+    """since=<seq>：客戶端最後收到的事件序號（沒有或格式錯誤時為 None）"""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def task_state_message(since=None):
+    """任務狀態：有 since 時只送之後的事件（task_events）；事件已不完整或沒有 since 時送完整的 current_tasks"""
+    if since is not None:
+        events = task_log.since(since)
+        if events is not None:
+            return {'type': 'task_events', 'since': since, 'seq': task_log.seq, 'events': events}
+    return dict(task_log.snapshot(), type='current_tasks')
+
+def scan_state_message(epoch=None, version=None):
+    """掃描模型：客戶端的 epoch / version 仍在 delta 歷史內時只送之後的 delta（scan_deltas），
+    否則送完整模型（scan_model）"""
+    if live_scan is None or not live_scan.version:
+        SCAN_SYNCS.inc(mode='unavailable')
+        return {'type': 'scan_model', 'available': False}
+    if version is not None:
+        deltas = live_scan.since(epoch, version)
+        if deltas is not None:
+            SCAN_SYNCS.inc(mode='deltas')
+            return {'type': 'scan_deltas', 'epoch': epoch, 'since': version, 'deltas': deltas}
+    epoch, version, data = live_scan.model()
+    SCAN_SYNCS.inc(mode='full')
+    return {'type': 'scan_model', 'available': True, 'epoch': epoch, 'version': version, 'data': data}
 
 async def handle_client(websocket):
-    """處理客戶端連接"""
-    # 註冊客戶端
-    connected_clients.add(websocket)
-    print(f"✅ 客戶端已連接 ({len(connected_clients)} 個連接)")
+    """處理客戶端連接（連線網址可帶 ?since=<seq> 接續之前收到的事件）"""
+    # 註冊客戶端（回覆與廣播都經由同一個送出佇列，維持順序）
+    channel = broadcaster.add(websocket)
+    print(f"✅ 客戶端已連接 ({len(broadcaster.channels)} 個連接)")
+    request = getattr(websocket, 'request', None)
+    query = parse_qs(urlparse(request.path).query) if request is not None else {}
 
     try:
-        # 發送當前任務狀態
-        await websocket.send(json.dumps({
-            'type': 'current_tasks',
-            'tasks': current_tasks
-        }, ensure_ascii=False))
+        # 發送當前任務狀態（或錯過的事件）
+        channel.send(json.dumps(task_state_message(parse_since(query.get('since', [None])[0])),
+                                ensure_ascii=False))
 
         # 處理客戶端訊息
         async for message in websocket:
@@ -235,44 +341,68 @@ async def handle_client(websocket):
                 if command == 'start_task':
                     task_type = data.get('task_type')
                     if task_type:
-                        # 在背景執行任務
-                        asyncio.create_task(execute_task(task_type, websocket))
+                        # 送進排程器（背景執行，依優先順序排隊）
+                        start_task(task_type, data.get('priority', DEFAULT_TASK_PRIORITY), channel)
                     else:
-                        await websocket.send(json.dumps({
+                        channel.send(json.dumps({
                             'type': 'error',
                             'message': '缺少 task_type 參數'
                         }))
 
+                elif command == 'cancel_task':
+                    task_id = data.get('task_id')
+                    if task_id:
+                        cancel_task(task_id, channel)
+                    else:
+                        channel.send(json.dumps({
+                            'type': 'error',
+                            'message': '缺少 task_id 參數'
+                        }))
+
                 elif command == 'get_status':
-                    await websocket.send(json.dumps({
-                        'type': 'current_tasks',
-                        'tasks': current_tasks
-                    }, ensure_ascii=False))
+                    channel.send(json.dumps(task_state_message(parse_since(data.get('since'))),
+                                            ensure_ascii=False))
+
+                elif command == 'get_scan':
+                    channel.send(json.dumps(scan_state_message(data.get('epoch'), parse_since(data.get('version'))),
+                                            ensure_ascii=False))
 
                 else:
-                    await websocket.send(json.dumps({
+                    channel.send(json.dumps({
                         'type': 'error',
                         'message': f'未知命令: {command}'
                     }))
 
             except json.JSONDecodeError:
-                await websocket.send(json.dumps({
+                channel.send(json.dumps({
                     'type': 'error',
                     'message': '無效的 JSON 格式'
                 }))
             except Exception as e:
-                await websocket.send(json.dumps({
+                channel.send(json.dumps({
                     'type': 'error',
                     'message': str(e)
                 }))
 
     finally:
         # 移除客戶端
-        connected_clients.remove(websocket)
-        print(f"❌ 客戶端已斷線 ({len(connected_clients)} 個連接)")
-
-async def main(port=8892):
+        await broadcaster.remove(websocket)
+        print(f"❌ 客戶端已斷線 ({len(broadcaster.channels)} 個連接)")
+
+async def main(port=8892, watch=True, watch_poll=False, poll_interval=DEFAULT_POLL_INTERVAL,
+               in_process=True, single_flight=True, output_format=DEFAULT_OUTPUT_FORMAT, ready_fd=None,
+               progress_rate=DEFAULT_PROGRESS_RATE, client_queue=DEFAULT_MAX_QUEUE,
+               slow_timeout=DEFAULT_SLOW_TIMEOUT, job_workers=DEFAULT_JOB_WORKERS,
+               task_log_file=LOG_FILE, task_history=DEFAULT_CAPACITY):
     """啟動 WebSocket 伺服器"""
+    global task_runner, startup, broadcaster, task_log, live_scan
+    startup = StartupTimer('websocket-server', STARTED_AT)
+    task_runner = TaskRunner(in_process=in_process, flights=SingleFlight() if single_flight else None)
+    broadcaster = Broadcaster(progress_rate=progress_rate, max_queue=client_queue, slow_timeout=slow_timeout)
+    attach_jobs(JobManager(max_workers=job_workers))
+    task_log = TaskLog(task_log_file, capacity=task_history)
+    restored = task_log.load()
+    startup.mark('init')
     print("🚀 DopeMAN WebSocket Server")
     print("=" * 60)
     print(f"📍 WebSocket URL: ws://localhost:{port}")
@@ -281,17 +411,79 @@ async def main(port=8892):
     print("   - health-check: 健康檢查")
     print("   - fix: 自動修復")
     print("   - update-info-stream: 更新資訊匯流資料")
+    print(f"   start_task 可指定 priority（{' / '.join(PRIORITIES)}，預設 {DEFAULT_TASK_PRIORITY}）；"
+          "cancel_task 取消排隊中或執行中的任務")
+    print("   GET /api/ready（一般 HTTP）: 就緒狀態與啟動時間分解")
+    print("   GET /metrics（一般 HTTP）: Prometheus 指標")
+    print(f"   ?since=<seq>: 只取得錯過的任務事件（記錄 {task_log_file or '停用'}，"
+          f"已載入 {restored} 則，保留最近 {task_history} 則）")
+    if watch:
+        print("   get_scan（epoch / version）: 錯過的 scan_delta，或完整的掃描模型")
     print("\n按 Ctrl+C 停止伺服器\n")
 
-    async with websockets.serve(handle_client, "localhost", port):
-        await asyncio.Future()  # 永久運行
+    async with websockets.serve(handle_client, "localhost", port, process_request=process_request):
+        startup.mark('bind')
+        startup.warming(*(['tasks', 'model'] if watch else ['tasks']))
+        startup.set_ready(ready_fd, port=port)
+        print(startup.describe())
+
+        # 背景預先載入各工具模組，第一個任務不需等待 import
+        asyncio.get_running_loop().run_in_executor(None, startup.warm, 'tasks', task_runner.warm_up)
+
+        live = None
+        if watch:
+            live = live_scan = LiveScan(DATA_FILE, on_delta=broadcast_message,
+                                        force_polling=watch_poll, poll_interval=poll_interval,
+                                        output_format=output_format)
+            started = time.time()
+            try:
+                await live.start()
+            finally:
+                startup.warmed('model', time.time() - started)
+            # 掃描任務直接更新記憶體模型（推送 scan_delta），不另外重掃整份資料
+            task_runner.overrides['scan'] = live.rescan_threadsafe
+        try:
+            await asyncio.Future()  # 永久運行
+        finally:
+            if live:
+                await live.stop()
+            jobs.shutdown()
+            task_log.close()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='DopeMAN WebSocket Server')
     parser.add_argument('--port', type=int, default=8892, help='WebSocket 端口 (預設: 8892)')
+    parser.add_argument('--no-watch', action='store_true', help='不監看檔案系統（不推送 scan_delta）')
+    parser.add_argument('--watch-poll', action='store_true', help='以輪詢取代 inotify 監看')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'輪詢間隔秒數 (預設: {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--subprocess', action='store_true', help='每個任務啟動獨立的 python3（不在 process 內執行）')
+    parser.add_argument('--no-single-flight', action='store_true', help='不合併重複的任務請求')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMAT,
+                        help=f'即時監看的掃描結果輸出格式 (預設: {DEFAULT_OUTPUT_FORMAT})')
+    parser.add_argument('--ready-fd', type=int, help='就緒時寫入一行 JSON（含啟動時間分解）到此 fd 後關閉')
+    parser.add_argument('--progress-rate', type=float, default=DEFAULT_PROGRESS_RATE,
+                        help=f'每個任務每秒最多送出幾則 progress，0 為不限制 (預設: {DEFAULT_PROGRESS_RATE:g})')
+    parser.add_argument('--client-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f'每個客戶端的送出佇列上限 (預設: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--slow-timeout', type=float, default=DEFAULT_SLOW_TIMEOUT,
+                        help=f'佇列持續滿載或送出卡住幾秒後中斷該客戶端 (預設: {DEFAULT_SLOW_TIMEOUT:g})')
+    parser.add_argument('--job-workers', type=int, default=DEFAULT_JOB_WORKERS,
+                        help=f'任務並行數 (預設: {DEFAULT_JOB_WORKERS})')
+    parser.add_argument('--task-log', type=Path, default=LOG_FILE, help=f'任務事件記錄檔 (預設: {LOG_FILE})')
+    parser.add_argument('--no-task-log', action='store_true', help='任務事件只保留在記憶體中（不寫入記錄檔）')
+    parser.add_argument('--task-history', type=int, default=DEFAULT_CAPACITY,
+                        help=f'保留幾則任務事件供重新連線的客戶端接續 (預設: {DEFAULT_CAPACITY})')
     args = parser.parse_args()
 
     try:
-        asyncio.run(main(args.port))
+        asyncio.run(main(args.port, watch=not args.no_watch, watch_poll=args.watch_poll,
+                         poll_interval=args.poll_interval, in_process=not args.subprocess,
+                         single_flight=not args.no_single_flight,
+                         output_format=args.output_format, ready_fd=args.ready_fd,
+                         progress_rate=args.progress_rate, client_queue=args.client_queue,
+                         slow_timeout=args.slow_timeout, job_workers=args.job_workers,
+                         task_log_file=None if args.no_task_log else args.task_log,
+                         task_history=args.task_history))
     except KeyboardInterrupt:
         print("\n\n⏹️  伺服器已停止")
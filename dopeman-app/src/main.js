@@ -30,13 +30,13 @@ if (!gotTheLock) {
       // 自動偵測可用端口
       console.log('🔍 偵測可用端口...');
       httpPort = await findAvailablePort(8891, 8999);
-      wsPort = await findAvailablePort(httpPort + 1, 9000);
+      // WebSocket 與 HTTP 由同一個 dopeman-server.py 在同一個 port 提供
+      wsPort = httpPort;
 
-      console.log(`✅ HTTP Port: ${httpPort}`);
-      console.log(`✅ WebSocket Port: ${wsPort}`);
+      console.log(`✅ HTTP / WebSocket Port: ${httpPort}`);
 
       // 啟動 Python 伺服器
-      serverManager = new PythonServerManager(httpPort, wsPort);
+      serverManager = new PythonServerManager(httpPort);
       await serverManager.start();
 
       // 建立主視窗
@@ -2,33 +2,43 @@ const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
 
+// 等待伺服器就緒通知的上限
+const READY_TIMEOUT_MS = 30000;
+
 class PythonServerManager {
-  constructor(httpPort, wsPort) {
-    this.httpPort = httpPort;
-    this.wsPort = wsPort;
-    this.httpProcess = null;
-    this.wsProcess = null;
+  constructor(port) {
+    // HTTP API、WebSocket 與靜態檔案共用同一個 port
+    this.port = port;
+    this.serverProcess = null;
+    // 就緒通知內容（含啟動時間分解）
+    this.startup = null;
     this.commandsPath = this.getCommandsPath();
   }
 
   /**
    * 取得 commands 目錄路徑（開發模式 vs 打包後）
+   * 以含有 dopeman-server.py 的目錄為準（repo 根目錄的 commands/ 是舊版工具，沒有伺服器）
    */
   getCommandsPath() {
-    // 開發模式：使用專案原始路徑
-    const devPath = path.join(__dirname, '../../commands');
-    if (fs.existsSync(devPath)) {
-      return devPath;
+    const candidates = [
+      // 開發模式：dopeman-app/commands
+      path.join(__dirname, '../commands'),
+      path.join(__dirname, '../../commands'),
+    ];
+    try {
+      // 打包後：使用應用程式資源路徑
+      const { app } = require('electron');
+      candidates.push(path.join(app.getAppPath(), 'commands'));
+    } catch (error) {
+      // 非 Electron 環境（例如單獨測試）
     }
 
-    // 打包後：使用應用程式資源路徑
-    const { app } = require('electron');
-    const prodPath = path.join(app.getAppPath(), 'commands');
-    if (fs.existsSync(prodPath)) {
-      return prodPath;
+    const found = candidates.find(dir => fs.existsSync(path.join(dir, 'dopeman-server.py')));
+    if (found) {
+      return found;
     }
 
-    throw new Error('❌ 找不到 commands 目錄');
+    throw new Error(`❌ 找不到含有 dopeman-server.py 的 commands 目錄（已檢查: ${candidates.join(', ')}）`);
   }
 
   /**
@@ -39,11 +49,7 @@ class PythonServerManager {
     console.log(`📂 Commands 路徑: ${this.commandsPath}`);
 
     try {
-      // 啟動 HTTP Server
-      await this.startHttpServer();
-
-      // 啟動 WebSocket Server
-      await this.startWebSocketServer();
+      await this.startServer();
 
       console.log('✅ Python 伺服器啟動完成');
       return true;
@@ -55,140 +61,98 @@ class PythonServerManager {
   }
 
   /**
-   * 啟動 HTTP Server
+   * 啟動 DopeMAN Server（dopeman-server.py：單一 process / port 提供 API、WebSocket 與靜態檔案）
+   * 伺服器開始接受連線時會在 fd 3 寫入一行 JSON（含啟動時間分解），收到即視為就緒
    */
-  startHttpServer() {
+  startServer() {
     return new Promise((resolve, reject) => {
-      console.log(`🌐 啟動 HTTP Server (port ${this.httpPort})...`);
-
-      this.httpProcess = spawn('python3', [
-        '-m', 'http.server',
-        this.httpPort.toString()
-      ], {
-        cwd: this.commandsPath,
-        stdio: ['ignore', 'pipe', 'pipe']
-      });
+      console.log(`🌐 啟動 DopeMAN Server (port ${this.port})...`);
 
-      this.httpProcess.stdout.on('data', (data) => {
-        console.log(`[HTTP] ${data.toString().trim()}`);
-      });
+      const serverScript = path.join(this.commandsPath, 'dopeman-server.py');
 
-      this.httpProcess.stderr.on('data', (data) => {
-        const message = data.toString().trim();
-        console.error(`[HTTP Error] ${message}`);
+      if (!fs.existsSync(serverScript)) {
+        reject(new Error(`找不到 dopeman-server.py: ${serverScript}`));
+        return;
+      }
 
-        // 檢查是否啟動成功
-        if (message.includes('Serving HTTP')) {
-          resolve();
+      let ready = false;
+      const timer = setTimeout(() => {
+        if (!ready) {
+          reject(new Error(`DopeMAN Server 啟動超時（${READY_TIMEOUT_MS / 1000} 秒內未就緒）`));
         }
-      });
+      }, READY_TIMEOUT_MS);
 
-      this.httpProcess.on('error', (error) => {
-        console.error('❌ HTTP Server 錯誤:', error);
-        reject(error);
+      this.serverProcess = spawn('python3', [
+        serverScript,
+        '--port', this.port.toString(),
+        '--ready-fd', '3'
+      ], {
+        cwd: this.commandsPath,
+        // spawn 時間：伺服器以此計算包含直譯器啟動的完整冷啟動時間
+        env: { ...process.env, DOPEMAN_SPAWNED_AT: Date.now().toString() },
+        stdio: ['ignore', 'pipe', 'pipe', 'pipe']
       });
 
-      this.httpProcess.on('exit', (code) => {
-        if (code !== 0 && code !== null) {
-          console.error(`❌ HTTP Server 異常退出 (code: ${code})`);
+      let readyLine = '';
+      this.serverProcess.stdio[3].on('data', (data) => {
+        readyLine += data.toString();
+        if (ready || !readyLine.includes('\n')) {
+          return;
         }
-      });
-
-      // 等待 1 秒確認啟動
-      setTimeout(() => {
-        if (this.httpProcess && !this.httpProcess.killed) {
-          console.log(`✅ HTTP Server 已啟動 (PID: ${this.httpProcess.pid})`);
-          resolve();
-        } else {
-          reject(new Error('HTTP Server 啟動超時'));
+        ready = true;
+        clearTimeout(timer);
+        try {
+          this.startup = JSON.parse(readyLine);
+          const phases = Object.entries(this.startup.phases_ms)
+            .map(([name, ms]) => `${name} ${Math.round(ms)}`)
+            .join(' / ');
+          console.log(`✅ DopeMAN Server 已就緒 (PID: ${this.serverProcess.pid}, ${Math.round(this.startup.ready_ms)} ms: ${phases} ms)`);
+        } catch (error) {
+          console.log(`✅ DopeMAN Server 已就緒 (PID: ${this.serverProcess.pid})`);
         }
-      }, 1000);
-    });
-  }
-
-  /**
-   * 啟動 WebSocket Server
-   */
-  startWebSocketServer() {
-    return new Promise((resolve, reject) => {
-      console.log(`📡 啟動 WebSocket Server (port ${this.wsPort})...`);
-
-      const wsScript = path.join(this.commandsPath, 'websocket-server.py');
-
-      if (!fs.existsSync(wsScript)) {
-        reject(new Error(`找不到 websocket-server.py: ${wsScript}`));
-        return;
-      }
-
-      this.wsProcess = spawn('python3', [
-        wsScript,
-        '--port', this.wsPort.toString()
-      ], {
-        cwd: this.commandsPath,
-        stdio: ['ignore', 'pipe', 'pipe']
+        resolve(this.startup);
       });
 
-      this.wsProcess.stdout.on('data', (data) => {
-        const message = data.toString().trim();
-        console.log(`[WS] ${message}`);
-
-        // 檢查是否啟動成功
-        if (message.includes('WebSocket Server') || message.includes('listening')) {
-          resolve();
-        }
+      this.serverProcess.stdout.on('data', (data) => {
+        console.log(`[Server] ${data.toString().trim()}`);
       });
 
-      this.wsProcess.stderr.on('data', (data) => {
-        console.error(`[WS Error] ${data.toString().trim()}`);
+      this.serverProcess.stderr.on('data', (data) => {
+        console.error(`[Server Error] ${data.toString().trim()}`);
       });
 
-      this.wsProcess.on('error', (error) => {
-        console.error('❌ WebSocket Server 錯誤:', error);
+      this.serverProcess.on('error', (error) => {
+        console.error('❌ DopeMAN Server 錯誤:', error);
+        clearTimeout(timer);
         reject(error);
       });
 
-      this.wsProcess.on('exit', (code) => {
+      this.serverProcess.on('exit', (code) => {
         if (code !== 0 && code !== null) {
-          console.error(`❌ WebSocket Server 異常退出 (code: ${code})`);
+          console.error(`❌ DopeMAN Server 異常退出 (code: ${code})`);
         }
-      });
-
-      // 等待 2 秒確認啟動
-      setTimeout(() => {
-        if (this.wsProcess && !this.wsProcess.killed) {
-          console.log(`✅ WebSocket Server 已啟動 (PID: ${this.wsProcess.pid})`);
-          resolve();
-        } else {
-          reject(new Error('WebSocket Server 啟動超時'));
+        if (!ready) {
+          clearTimeout(timer);
+          reject(new Error(`DopeMAN Server 就緒前結束 (code: ${code})`));
         }
-      }, 2000);
+      });
     });
   }
 
   /**
-   * 停止所有 Python 伺服器
+   * 停止 Python 伺服器
    */
   stop() {
     console.log('🛑 停止 Python 伺服器...');
 
-    if (this.httpProcess) {
-      try {
-        this.httpProcess.kill();
-        console.log('✅ HTTP Server 已停止');
-      } catch (error) {
-        console.error('❌ 停止 HTTP Server 失敗:', error);
-      }
-      this.httpProcess = null;
-    }
-
-    if (this.wsProcess) {
+    if (this.serverProcess) {
       try {
-        this.wsProcess.kill();
-        console.log('✅ WebSocket Server 已停止');
+        this.serverProcess.kill();
+        console.log('✅ DopeMAN Server 已停止');
       } catch (error) {
-        console.error('❌ 停止 WebSocket Server 失敗:', error);
+        console.error('❌ 停止 DopeMAN Server 失敗:', error);
       }
-      this.wsProcess = null;
+      this.serverProcess = null;
     }
   }
 